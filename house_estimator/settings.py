@@ -1,8 +1,14 @@
 import os
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Deployment settings come from the environment or a .env file next to
+# manage.py (see .env.example).
+load_dotenv(BASE_DIR / '.env')
+
 SECRET_KEY = 'django-insecure-your-secret-key-here'
 
 DEBUG = True
@@ -20,6 +26,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Removes itself unless INSTRUMENTATION['ENABLED'] (see below).
+    'materiais.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,6 +50,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'materiais.catalogue.context',
             ],
         },
     },
@@ -49,11 +58,76 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'house_estimator.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) or postgresql.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    # Needs psycopg (pip install "psycopg[binary]"). Connections are kept
+    # open between requests and health-checked before reuse; put PgBouncer
+    # in front when there are more workers than the server has connections.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'house_estimator'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked".
+                'timeout': float(os.environ.get('SQLITE_TIMEOUT', '20')),
+            },
+        }
+    }
+
+# Run on every new SQLite connection (materiais.signals). WAL lets readers
+# work alongside the single writer; NORMAL sync is safe under WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': 'normal',
+    'busy_timeout': int(float(os.environ.get('SQLITE_TIMEOUT', '20')) * 1000),
+    'temp_store': 'memory',
+    'cache_size': -64000,  # KiB
+    'mmap_size': 268435456,
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Memoized material requirement results (materiais.result_cache).
+    # LocMemCache evicts least-recently-used entries past MAX_ENTRIES.
+    'estimates': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'estimates',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+# Seconds a process reuses the catalogue/rooms/wiring change counters it
+# read from the database (materiais.versions) before reading them again.
+DATA_VERSION_CHECK_INTERVAL = 1.0
+
+# Request metrics at /metrics/ and cProfile dumps of slow requests
+# (materiais.instrumentation). A sampled fraction of requests is profiled
+# and kept if slower than the threshold.
+INSTRUMENTATION = {
+    'ENABLED': os.environ.get('INSTRUMENTATION', '') == '1',
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    'PROFILE_SLOWER_THAN_MS': 500,
+    'PROFILE_DIR': 'profiles',
+    # Bearer token for /metrics/ scrapers; staff users can always read it.
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN', ''),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
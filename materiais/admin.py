@@ -1,24 +1,47 @@
 from django.contrib import admin
+from .forms import RoomForm
 from .models import (
     Room, Tile, TileCalculation,
     Plywood, PlywoodCalculation,
-    ElectricComponent, ElectricalCalculation
+    ElectricComponent, ElectricalCalculation, WiringRule, EstimateJob,
+    Building, Floor, FloorUnit, UnitTemplate
 )
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
+    form = RoomForm
+    fields = ('name', 'room_type', 'quantity', 'length', 'width', 'polygon', 'unit_template',
+              'floor_area', 'floor_perimeter')
+    readonly_fields = ('floor_area', 'floor_perimeter')
     list_display = ('name', 'length', 'width', 'quantity', 'area')
+    list_filter = ('room_type', 'unit_template')
     search_fields = ('name',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_area()
+
+    @admin.display(description='Area', ordering='total_area')
+    def area(self, obj):
+        return obj.total_area
+
+class CalculationAdmin(admin.ModelAdmin):
+    # Calculation tables grow to millions of rows: foreign key filters would
+    # list every room and material, and the unfiltered total is a second
+    # full COUNT. Filter by date (indexed) instead.
+    list_filter = ('calculation_date',)
+    ordering = ('-pk',)
+    show_full_result_count = False
+
 @admin.register(Tile)
 class TileAdmin(admin.ModelAdmin):
     list_display = ('name', 'length', 'width', 'pieces_per_box', 'price_per_box')
     search_fields = ('name',)
 
 @admin.register(TileCalculation)
-class TileCalculationAdmin(admin.ModelAdmin):
-    list_display = ('room', 'tile', 'total_boxes', 'total_pieces', 'total_cost')
-    list_filter = ('room', 'tile')
+class TileCalculationAdmin(CalculationAdmin):
+    list_display = ('room', 'tile', 'total_boxes', 'total_pieces', 'total_cost', 'calculation_date')
+    list_select_related = ('room', 'tile')
+    raw_id_fields = ('room', 'tile')
 
 @admin.register(Plywood)
 class PlywoodAdmin(admin.ModelAdmin):
@@ -26,9 +49,10 @@ class PlywoodAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(PlywoodCalculation)
-class PlywoodCalculationAdmin(admin.ModelAdmin):
-    list_display = ('room', 'plywood', 'total_sheets', 'total_cost')
-    list_filter = ('room', 'plywood')
+class PlywoodCalculationAdmin(CalculationAdmin):
+    list_display = ('room', 'plywood', 'total_sheets', 'total_cost', 'calculation_date')
+    list_select_related = ('room', 'plywood')
+    raw_id_fields = ('room', 'plywood')
 
 @admin.register(ElectricComponent)
 class ElectricComponentAdmin(admin.ModelAdmin):
@@ -36,6 +60,54 @@ class ElectricComponentAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(ElectricalCalculation)
-class ElectricalCalculationAdmin(admin.ModelAdmin):
-    list_display = ('room', 'component', 'quantity', 'total_cost')
-    list_filter = ('room', 'component') 
\ No newline at end of file
+class ElectricalCalculationAdmin(CalculationAdmin):
+    list_display = ('room', 'component', 'quantity', 'total_cost', 'calculation_date')
+    list_select_related = ('room', 'component')
+    raw_id_fields = ('room', 'component')
+
+@admin.register(WiringRule)
+class WiringRuleAdmin(admin.ModelAdmin):
+    list_display = ('room_type', 'component_type', 'fixed_length', 'perimeter_factor', 'area_factor', 'default_count')
+    list_editable = ('fixed_length', 'perimeter_factor', 'area_factor', 'default_count')
+    list_filter = ('room_type', 'component_type')
+
+@admin.register(EstimateJob)
+class EstimateJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'room_count', 'total_chunks', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('error',)
+
+class TemplateRoomInline(admin.TabularInline):
+    model = Room
+    fields = ('name', 'length', 'width', 'quantity', 'room_type')
+    extra = 1
+
+@admin.register(UnitTemplate)
+class UnitTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+    inlines = [TemplateRoomInline]
+
+class FloorInline(admin.TabularInline):
+    model = Floor
+    fields = ('name', 'repeat')
+    show_change_link = True
+    extra = 1
+
+@admin.register(Building)
+class BuildingAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+    inlines = [FloorInline]
+
+class FloorUnitInline(admin.TabularInline):
+    model = FloorUnit
+    autocomplete_fields = ('unit_template',)
+    extra = 1
+
+@admin.register(Floor)
+class FloorAdmin(admin.ModelAdmin):
+    list_display = ('name', 'building', 'repeat')
+    list_filter = ('building',)
+    list_select_related = ('building',)
+    inlines = [FloorUnitInline]
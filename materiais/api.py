@@ -0,0 +1,318 @@
+"""Async JSON API.
+
+These views are coroutines and use Django's async ORM, so under an ASGI
+server (``house_estimator.asgi``) one worker serves many concurrent quote
+requests without a thread each. The estimate endpoint takes many rooms per
+call and prices them with the batch engine in ``estimation``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import jobs, scenarios, wiring
+from .catalogue import conditional
+from .estimation import bill_of_materials, cents_to_decimal, requirement_matrices
+from .forms import RoomForm
+from .models import (
+    ROOM_TYPES, ElectricComponent, ElectricalCalculation, EstimateJob, Plywood, PlywoodCalculation, Room, Tile,
+    TileCalculation,
+)
+
+MAX_ROOMS = 5000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+CATALOGUES = {
+    'tiles': (Tile, ['id', 'name', 'length', 'width', 'pieces_per_box', 'price_per_box',
+                     'waste_percentage', 'joint_width', 'orientation']),
+    'plywoods': (Plywood, ['id', 'name', 'length', 'width', 'price_per_sheet', 'waste_percentage']),
+    'components': (ElectricComponent, ['id', 'name', 'unit_price', 'unit', 'component_type',
+                                       'default_quantity']),
+}
+
+HISTORY = {
+    'tiles': (TileCalculation, ['id', 'room_id', 'tile_id', 'total_boxes', 'total_pieces',
+                                'total_cost', 'waste_percentage', 'calculation_date']),
+    'plywoods': (PlywoodCalculation, ['id', 'room_id', 'plywood_id', 'total_sheets', 'total_cost',
+                                      'waste_percentage', 'calculation_date']),
+    'components': (ElectricalCalculation, ['id', 'room_id', 'component_id', 'quantity', 'total_cost',
+                                           'calculation_date']),
+}
+
+
+class BadRequest(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _error(errors, status=400):
+    return JsonResponse({'errors': errors}, status=status)
+
+
+def _ids(payload, key):
+    values = payload.get(key) or []
+    if not isinstance(values, list) or not all(isinstance(value, int) for value in values):
+        raise BadRequest({key: 'Expected a list of integer ids.'})
+    return values
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest({'limit': 'Expected an integer.'})
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _cursor(request, name):
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest({name: 'Expected an integer.'})
+
+
+async def _fetch(model, ids, key):
+    """Fetch ``ids`` in one query, keeping the requested order."""
+    found = {obj.pk: obj async for obj in model.objects.filter(pk__in=ids)}
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        raise BadRequest({key: f'Unknown ids: {missing}'})
+    return [found[pk] for pk in ids]
+
+
+async def _rooms(payload):
+    entries = payload.get('rooms')
+    if not isinstance(entries, list) or not entries:
+        raise BadRequest({'rooms': 'Expected a non-empty list of rooms.'})
+    if len(entries) > MAX_ROOMS:
+        raise BadRequest({'rooms': f'At most {MAX_ROOMS} rooms per request.'})
+    stored_ids = [entry['id'] for entry in entries if isinstance(entry, dict) and 'id' in entry]
+    if not all(isinstance(pk, int) for pk in stored_ids):
+        raise BadRequest({'rooms': 'Room ids must be integers.'})
+    stored = {room.pk: room for room in await _fetch(Room, stored_ids, 'rooms')} if stored_ids else {}
+    rooms = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise BadRequest({f'rooms[{index}]': 'Expected an object.'})
+        if 'id' in entry:
+            rooms.append(stored[entry['id']])
+            continue
+        # Rooms sent inline are validated like the room form but not saved.
+        form = RoomForm(data={'name': f'Room {index + 1}', 'quantity': 1, **entry})
+        if not form.is_valid():
+            raise BadRequest({f'rooms[{index}]': form.errors.get_json_data()})
+        rooms.append(form.save(commit=False))
+    return rooms
+
+
+async def _choices(payload):
+    """Resolve ``{"<room type>": {"tiles": [ids], "plywoods": [ids]}}`` to materials."""
+    entries = payload.get('choices')
+    if not isinstance(entries, dict) or not entries:
+        raise BadRequest({'choices': 'Expected an object of room types.'})
+    room_types = {value for value, _ in ROOM_TYPES} | {scenarios.ANY_ROOM_TYPE}
+    ids = {'tiles': [], 'plywoods': []}
+    for room_type, entry in entries.items():
+        if room_type not in room_types:
+            raise BadRequest({'choices': f'Unknown room type {room_type!r}.'})
+        if not isinstance(entry, dict):
+            raise BadRequest({f'choices.{room_type}': 'Expected an object.'})
+        for key in ids:
+            ids[key] += _ids(entry, key)
+    # One query per material kind, however many room types share them.
+    tiles = {tile.pk: tile for tile in await _fetch(Tile, list(dict.fromkeys(ids['tiles'])), 'tiles')}
+    plywoods = {
+        plywood.pk: plywood
+        for plywood in await _fetch(Plywood, list(dict.fromkeys(ids['plywoods'])), 'plywoods')
+    }
+    return {
+        room_type: {
+            'tile': [tiles[pk] for pk in dict.fromkeys(entry.get('tiles') or [])],
+            'plywood': [plywoods[pk] for pk in dict.fromkeys(entry.get('plywoods') or [])],
+        }
+        for room_type, entry in entries.items()
+    }
+
+
+def _room_label(room):
+    return {'id': room.pk, 'name': room.name, 'room_type': room.room_type}
+
+
+@csrf_exempt
+@require_POST
+async def estimate(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return _error({'body': 'Invalid JSON.'})
+    if not isinstance(payload, dict):
+        return _error({'body': 'Expected a JSON object.'})
+    try:
+        rooms = await _rooms(payload)
+        tiles = await _fetch(Tile, _ids(payload, 'tiles'), 'tiles')
+        plywoods = await _fetch(Plywood, _ids(payload, 'plywoods'), 'plywoods')
+        components = await _fetch(ElectricComponent, _ids(payload, 'components'), 'components')
+    except BadRequest as exc:
+        return _error(exc.errors)
+
+    rules = await wiring.arule_table() if components else None
+    matrices = requirement_matrices(rooms, tiles, plywoods, components, rules)
+    results = [{'room': _room_label(room), 'tiles': [], 'plywoods': [], 'components': []} for room in rooms]
+    if tiles:
+        matrix = matrices['tile']
+        for i, result in enumerate(results):
+            result['tiles'] = [
+                {
+                    'id': tile.pk,
+                    'total_pieces': int(matrix['total_pieces'][i, j]),
+                    'total_boxes': int(matrix['total_boxes'][i, j]),
+                    'total_cost': cents_to_decimal(matrix['total_cost_cents'][i, j]),
+                }
+                for j, tile in enumerate(tiles)
+            ]
+    if plywoods:
+        matrix = matrices['plywood']
+        for i, result in enumerate(results):
+            result['plywoods'] = [
+                {
+                    'id': plywood.pk,
+                    'total_sheets': int(matrix['total_sheets'][i, j]),
+                    'total_cost': cents_to_decimal(matrix['total_cost_cents'][i, j]),
+                }
+                for j, plywood in enumerate(plywoods)
+            ]
+    if components:
+        matrix = matrices['electrical']
+        for i, result in enumerate(results):
+            result['components'] = [
+                {
+                    'id': component.pk,
+                    'quantity': (float if matrix['is_cable'][i, j] else int)(matrix['quantity'][i, j]),
+                    'total_cost': cents_to_decimal(matrix['total_cost_cents'][i, j]),
+                }
+                for j, component in enumerate(components)
+            ]
+    return JsonResponse({
+        'estimates': results,
+        'bill_of_materials': bill_of_materials(rooms, tiles, plywoods, components, matrices),
+    })
+
+
+@csrf_exempt
+@require_POST
+async def compare_scenarios(request):
+    """Rank material combinations per room type by total cost.
+
+    Takes ``rooms`` and ``components`` like ``estimate``, ``choices`` as
+    ``{"<room type>": {"tiles": [ids], "plywoods": [ids]}}`` (``"*"`` for
+    any other room type) and an optional ``limit``. Nothing is saved.
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return _error({'body': 'Invalid JSON.'})
+    if not isinstance(payload, dict):
+        return _error({'body': 'Expected a JSON object.'})
+    limit = payload.get('limit', scenarios.DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool):
+        return _error({'limit': 'Expected an integer.'})
+    try:
+        rooms = await _rooms(payload)
+        choices = await _choices(payload)
+        components = await _fetch(ElectricComponent, _ids(payload, 'components'), 'components')
+    except BadRequest as exc:
+        return _error(exc.errors)
+
+    rules = await wiring.arule_table() if components else None
+    return JsonResponse(scenarios.compare(rooms, choices, components, rules, limit))
+
+
+@csrf_exempt
+@require_POST
+async def submit_job(request):
+    """Queue a large estimate for ``run_estimate_workers``.
+
+    Takes the same material lists as ``estimate`` and stored room ids, or
+    ``"rooms": "all"``. Results are saved as calculation records.
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return _error({'body': 'Invalid JSON.'})
+    if not isinstance(payload, dict):
+        return _error({'body': 'Expected a JSON object.'})
+    try:
+        if payload.get('rooms') == 'all':
+            room_ids = [pk async for pk in Room.objects.order_by('pk').values_list('pk', flat=True)]
+        else:
+            room_ids = [room.pk for room in await _fetch(Room, _ids(payload, 'rooms'), 'rooms')]
+        tile_ids = [tile.pk for tile in await _fetch(Tile, _ids(payload, 'tiles'), 'tiles')]
+        plywood_ids = [plywood.pk for plywood in await _fetch(Plywood, _ids(payload, 'plywoods'), 'plywoods')]
+        component_ids = [
+            component.pk
+            for component in await _fetch(ElectricComponent, _ids(payload, 'components'), 'components')
+        ]
+    except BadRequest as exc:
+        return _error(exc.errors)
+    job = await sync_to_async(jobs.submit)(room_ids, tile_ids, plywood_ids, component_ids)
+    return JsonResponse(await sync_to_async(jobs.progress)(job), status=202)
+
+
+@require_GET
+async def job_status(request, pk):
+    try:
+        job = await EstimateJob.objects.aget(pk=pk)
+    except EstimateJob.DoesNotExist:
+        return _error({'job': f'Unknown job {pk}.'}, status=404)
+    return JsonResponse(await sync_to_async(jobs.progress)(job))
+
+
+@require_GET
+@conditional
+async def catalogue(request, kind):
+    if kind not in CATALOGUES:
+        return _error({'kind': f'Unknown catalogue {kind!r}.'}, status=404)
+    model, fields = CATALOGUES[kind]
+    try:
+        limit = _page_size(request)
+        after = _cursor(request, 'after')
+    except BadRequest as exc:
+        return _error(exc.errors)
+    queryset = model.objects.order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    items = [item async for item in queryset.values(*fields)[:limit]]
+    return JsonResponse({
+        'results': items,
+        'next': items[-1]['id'] if len(items) == limit else None,
+    })
+
+
+@require_GET
+async def calculation_history(request, kind):
+    if kind not in HISTORY:
+        return _error({'kind': f'Unknown calculation type {kind!r}.'}, status=404)
+    model, fields = HISTORY[kind]
+    try:
+        limit = _page_size(request)
+        before = _cursor(request, 'before')
+        room = _cursor(request, 'room')
+    except BadRequest as exc:
+        return _error(exc.errors)
+    queryset = model.objects.order_by('-pk')
+    if before is not None:
+        queryset = queryset.filter(pk__lt=before)
+    if room is not None:
+        queryset = queryset.filter(room_id=room)
+    items = [item async for item in queryset.values(*fields)[:limit]]
+    return JsonResponse({
+        'results': items,
+        'next': items[-1]['id'] if len(items) == limit else None,
+    })
@@ -0,0 +1,235 @@
+"""Benchmarks for the estimation math, forms, list views and admin.
+
+``build_dataset`` fills the database with a synthetic catalogue (seeded, so
+every run prices the same rooms and materials) and ``run`` times each case,
+counting queries and recording the peak Python memory of one extra call.
+Every timed call starts with an empty tile layout cache, so the
+requirement cases measure the layout work rather than cache hits.
+Results are plain dicts, so they can be written as JSON and compared with
+a stored baseline by ``compare``. The ``benchmark`` command runs all of
+this against a throwaway test database.
+"""
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from . import jobs
+from .forms import ElectricalCalculationForm, PlywoodCalculationForm, TileCalculationForm
+from .layout import ORIENTATIONS, tile_layout
+from .models import COMPONENT_TYPES, ROOM_TYPES, ElectricComponent, Plywood, Room, Tile
+
+SIZES = {'rooms': 200, 'tiles': 2000, 'plywoods': 500, 'components': 200, 'calculations': 20000}
+
+# Materials whose calculate_requirements is timed over every room.
+PRICED_MATERIALS = 5
+
+# A case is slower than its baseline if its median time grows by more than
+# this fraction; any extra query is a regression.
+TOLERANCE = 0.2
+
+BATCH_SIZE = 1000
+
+
+def build_dataset(seed=0, **sizes):
+    """Create rooms, materials and stored calculations; returns the sizes used."""
+    sizes = {**SIZES, **sizes}
+    rng = random.Random(seed)
+    rooms = [
+        Room(
+            name=f'Room {i}',
+            length=round(rng.uniform(2, 12), 2),
+            width=round(rng.uniform(2, 8), 2),
+            quantity=rng.choice((1, 1, 1, 2, 3)),
+            room_type=rng.choice(ROOM_TYPES)[0],
+        )
+        for i in range(sizes['rooms'])
+    ]
+    # bulk_create() skips save(), which stores the geometry.
+    for room in rooms:
+        room.update_geometry()
+    Room.objects.bulk_create(rooms, batch_size=BATCH_SIZE)
+    Tile.objects.bulk_create([
+        Tile(
+            name=f'Tile {i}',
+            length=rng.choice((20, 30, 45, 60, 80, 120)),
+            width=rng.choice((20, 30, 45, 60)),
+            pieces_per_box=rng.randint(4, 20),
+            price_per_box=Decimal(rng.randint(500, 20000)) / 100,
+            waste_percentage=rng.choice((3, 5, 10)),
+            joint_width=rng.choice((2, 3, 5)),
+            orientation=rng.choice(ORIENTATIONS)[0],
+        )
+        for i in range(sizes['tiles'])
+    ], batch_size=BATCH_SIZE)
+    Plywood.objects.bulk_create([
+        Plywood(
+            name=f'Plywood {i}',
+            length=rng.choice((2.44, 2.5, 3.05)),
+            width=rng.choice((1.22, 1.25, 1.53)),
+            price_per_sheet=Decimal(rng.randint(1500, 12000)) / 100,
+            waste_percentage=rng.choice((5, 10)),
+        )
+        for i in range(sizes['plywoods'])
+    ], batch_size=BATCH_SIZE)
+    ElectricComponent.objects.bulk_create([
+        ElectricComponent(
+            name=f'Component {i}',
+            unit_price=Decimal(rng.randint(50, 5000)) / 100,
+            unit='m' if kind == 'cable' else 'pcs',
+            component_type=kind,
+            default_quantity=rng.randint(1, 4),
+        )
+        for i, kind in ((i, rng.choice(COMPONENT_TYPES)[0]) for i in range(sizes['components']))
+    ], batch_size=BATCH_SIZE)
+
+    # Stored calculations go through the job pipeline, a third per kind.
+    per_kind = sizes['calculations'] // 3
+    if per_kind:
+        room_ids = list(Room.objects.order_by('pk').values_list('pk', flat=True))
+        materials = max(1, min(10, per_kind // max(1, len(room_ids))))
+        rooms = max(1, per_kind // materials)
+        jobs.submit(
+            room_ids[:rooms],
+            tile_ids=Tile.objects.order_by('pk').values_list('pk', flat=True)[:materials],
+            plywood_ids=Plywood.objects.order_by('pk').values_list('pk', flat=True)[:materials],
+            component_ids=ElectricComponent.objects.order_by('pk').values_list('pk', flat=True)[:materials],
+        )
+        jobs.work(burst=True)
+    return sizes
+
+
+def _requirements(model):
+    rooms = list(Room.objects.all())
+    materials = list(model.objects.order_by('pk')[:PRICED_MATERIALS])
+
+    def case():
+        for material in materials:
+            for room in rooms:
+                material.calculate_requirements(room)
+    return case
+
+
+def _form(form_class):
+    # A submitted calculation: the first room and material, results left
+    # for the form to recompute.
+    data = {
+        name: form_class.base_fields[name].queryset.order_by('pk').values_list('pk', flat=True).first()
+        for name in ('room', form_class.material_field)
+    }
+
+    def case():
+        form = form_class(data=data)
+        if not form.is_valid():
+            raise RuntimeError(f'{form_class.__name__} rejected {data}: {form.errors.as_json()}')
+    return case
+
+
+def _get(client, url, cold=False):
+    def case():
+        if cold:
+            # Render the page: no cached page, fragments or totals.
+            cache.clear()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {url} returned {response.status_code}')
+    return case
+
+
+def cases():
+    """Benchmark cases by name, ready to be called repeatedly."""
+    client = Client()
+    admin = Client()
+    user, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True, 'is_superuser': True},
+    )
+    admin.force_login(user)
+    result = {
+        'requirements.tile': _requirements(Tile),
+        'requirements.plywood': _requirements(Plywood),
+        'requirements.electrical': _requirements(ElectricComponent),
+        'form.tile_calculation': _form(TileCalculationForm),
+        'form.plywood_calculation': _form(PlywoodCalculationForm),
+        'form.electrical_calculation': _form(ElectricalCalculationForm),
+    }
+    for name in ('room_list', 'tile_list', 'plywood_list', 'electric_component_list'):
+        result[f'view.{name}'] = _get(client, reverse(f'materiais:{name}'), cold=True)
+        result[f'view.{name}.cached'] = _get(client, reverse(f'materiais:{name}'))
+    for model in ('room', 'tile', 'tilecalculation', 'plywood', 'plywoodcalculation',
+                  'electriccomponent', 'electricalcalculation', 'wiringrule'):
+        result[f'admin.{model}'] = _get(admin, reverse(f'admin:materiais_{model}_changelist'))
+    return result
+
+
+class _QueryCounter:
+    """Database wrapper counting executed statements.
+
+    ``connection.queries`` cannot be used: the test client's
+    ``request_started`` signal empties it at the start of every request.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(case, repeat=5):
+    """Median and best wall time (ms), queries per call and peak memory (KiB)."""
+    case()  # warm up lazy imports
+    timings = []
+    for _ in range(repeat):
+        tile_layout.cache_clear()
+        gc.collect()
+        queries = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            case()
+        timings.append((time.perf_counter() - started) * 1000)
+    tile_layout.cache_clear()
+    tracemalloc.start()
+    try:
+        case()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'queries': queries.count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(repeat=5, only=None):
+    """Measure every case whose name starts with one of ``only``."""
+    results = {}
+    for name, case in cases().items():
+        if only and not name.startswith(tuple(only)):
+            continue
+        results[name] = measure(case, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Regressions of ``results`` against ``baseline`` as ``(case, message)`` pairs."""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['median_ms'] > before['median_ms'] * (1 + tolerance):
+            regressions.append((name, f"{before['median_ms']:.1f} ms -> {current['median_ms']:.1f} ms"))
+        if current['queries'] > before['queries']:
+            regressions.append((name, f"{before['queries']} -> {current['queries']} queries"))
+    return regressions
@@ -0,0 +1,69 @@
+"""Estimates for buildings made of repeated unit templates.
+
+A building's floors place unit templates (``FloorUnit``), and a floor can
+itself repeat. The number of units of each template is one aggregate
+query. Each template's rooms are then priced once by the batch engine and
+weighted by that count, so estimating a tower costs the same as
+estimating its distinct layouts.
+"""
+from django.db.models import F, Sum
+
+from .estimation import bill_of_materials, cents_to_decimal, to_cents
+from .models import FloorUnit, Room
+
+
+def unit_counts(building):
+    """Units of each template in ``building``, as ``{template_id: count}``."""
+    rows = (
+        FloorUnit.objects.filter(floor__building=building)
+        .values('unit_template')
+        .annotate(units=Sum(F('quantity') * F('floor__repeat')))
+        .values_list('unit_template', 'units')
+    )
+    return dict(rows)
+
+
+def building_units(template_ids):
+    """Units of each template per building, as ``{(building_id, template_id): count}``."""
+    rows = (
+        FloorUnit.objects.filter(unit_template__in=template_ids)
+        .values('floor__building', 'unit_template')
+        .annotate(units=Sum(F('quantity') * F('floor__repeat')))
+        .values_list('floor__building', 'unit_template', 'units')
+    )
+    return {(building_id, template_id): units for building_id, template_id, units in rows}
+
+
+def estimate(building, tiles=(), plywoods=(), components=()):
+    """``bill_of_materials`` for a whole building, with a per-template breakdown."""
+    counts = unit_counts(building)
+    rooms = list(
+        Room.objects.filter(unit_template__in=counts).select_related('unit_template')
+        .order_by('unit_template', 'pk')
+    )
+    multipliers = [counts[room.unit_template_id] for room in rooms]
+    result = bill_of_materials(rooms, tiles, plywoods, components, multipliers=multipliers)
+
+    templates = {}
+    for room, units, line in zip(rooms, multipliers, result['rooms']):
+        line['units'] = units
+        template = templates.setdefault(room.unit_template_id, {
+            'id': room.unit_template_id,
+            'name': room.unit_template.name,
+            'units': units,
+            'rooms': 0,
+            'unit_cost_cents': 0,
+        })
+        template['rooms'] += room.quantity
+        # Room totals are exact multiples of the per-unit cost.
+        template['unit_cost_cents'] += to_cents(line['total_cost']) // units
+    result['templates'] = []
+    for template in templates.values():
+        cents = template.pop('unit_cost_cents')
+        template['unit_cost'] = cents_to_decimal(cents)
+        template['total_cost'] = cents_to_decimal(cents * template['units'])
+        result['templates'].append(template)
+    result['units'] = sum(counts.values())
+    # A room row stands for ``quantity`` identical rooms of its unit.
+    result['room_count'] = sum(room.quantity * units for room, units in zip(rooms, multipliers))
+    return result
@@ -0,0 +1,112 @@
+"""Catalogue version counter and the page caching built on it.
+
+Saving or deleting a tile, plywood or electric component (or importing a
+catalogue) bumps the catalogue counter in ``versions``, which lives in the
+database and is shared by every process. Cached pages, template fragments
+and ETags include its token, so a catalogue change makes them all stale at
+once without having to find and delete them, whichever process made it.
+
+``cached_page`` serves a view's rendered GET responses from the cache and
+answers conditional GETs (``If-None-Match``/``If-Modified-Since``) with
+304 before the view or its queries run. ``conditional`` only does the
+latter and also wraps the async API views.
+"""
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import versions
+
+# Seconds a rendered page stays cached; a version bump retires it sooner.
+PAGE_TIMEOUT = 60 * 60
+
+
+def version():
+    """Token of the current catalogue state."""
+    return versions.token(versions.CATALOGUE)
+
+
+def last_modified():
+    """When the catalogue last changed, or ``None`` if it never has."""
+    updated_at = versions.current(versions.CATALOGUE)[1]
+    return updated_at.replace(microsecond=0) if updated_at else None
+
+
+def bump_version():
+    versions.bump(versions.CATALOGUE)
+
+
+def _state(request):
+    # Async views read the counter beforehand (``condition`` calls these
+    # functions synchronously, where the ORM may not be used).
+    state = getattr(request, '_catalogue_state', None)
+    return state if state is not None else (version(), last_modified())
+
+
+def _etag(request, *args, **kwargs):
+    return f'catalogue-{_state(request)[0]}'
+
+
+def _last_modified(request, *args, **kwargs):
+    return _state(request)[1]
+
+
+def _revalidate(response):
+    # Browsers must revalidate, which is a cheap 304 while unchanged.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional(view):
+    """Answer conditional GETs with 304 while the catalogue is unchanged."""
+    wrapped = condition(etag_func=_etag, last_modified_func=_last_modified)(view)
+    if iscoroutinefunction(wrapped):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            updated_at = (await versions.acurrent(versions.CATALOGUE))[1]
+            request._catalogue_state = (
+                await versions.atoken(versions.CATALOGUE),
+                updated_at.replace(microsecond=0) if updated_at else None,
+            )
+            return _revalidate(await wrapped(request, *args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return _revalidate(wrapped(*args, **kwargs))
+    return wrapper
+
+
+def _page_key(request):
+    path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f'catalogue:page:{version()}:{path}'
+
+
+def cached_page(view):
+    """Serve GET responses of ``view`` from the cache for the current catalogue version."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key = _page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            cache.set(key, (response.content, response['Content-Type']), PAGE_TIMEOUT)
+        return response
+    return conditional(wrapper)
+
+
+def context(request):
+    """Template context processor: ``catalogue_version`` for ``{% cache %}`` keys."""
+    return {'catalogue_version': version()}
@@ -0,0 +1,287 @@
+"""Guillotine cutting-stock solver for plywood sheets.
+
+Each room's ceiling is split into sheet-sized panels: whole sheets, strips
+along the far edges and a corner panel. Whole sheets need no cutting; the
+partial panels of every room (and every ``quantity`` copy) are packed
+together onto as few sheets as possible, so offcuts from one room are used
+in another. Every sheet is cut with edge-to-edge (guillotine) cuts only.
+
+A best-fit heuristic runs first, with several piece orderings, until the
+time budget is spent or the area lower bound is reached. Small jobs then
+fall back to an exact branch and bound within the remaining budget.
+Dimensions are handled in whole millimetres. A room with an outline is
+panelled as the rectangle with the same area and perimeter.
+"""
+import itertools
+import math
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from . import geometry
+
+# Jobs with at most this many partial panels are solved exactly.
+EXACT_LIMIT = 8
+DEFAULT_TIME_LIMIT = 0.5
+
+_ORDERINGS = [
+    lambda piece: (-piece[0] * piece[1], -max(piece[0], piece[1])),
+    lambda piece: (-max(piece[0], piece[1]), -piece[0] * piece[1]),
+    lambda piece: (-(piece[0] + piece[1]), -piece[0] * piece[1]),
+    lambda piece: (-piece[1], -piece[0]),
+    lambda piece: (-piece[0], -piece[1]),
+]
+
+
+def _mm(metres):
+    return int(round(metres * 1000))
+
+
+def room_panels(length, width, sheet_length, sheet_width):
+    """Split a length x width ceiling (mm) into full sheets and partial panels.
+
+    Returns ``(full_sheets, [(w, h), ...])``, using whichever grid
+    orientation leaves more whole sheets.
+    """
+    best = None
+    for along, across in ((sheet_length, sheet_width), (sheet_width, sheet_length)):
+        nx, rx = divmod(length, along)
+        ny, ry = divmod(width, across)
+        panels = [(rx, across)] * (ny if rx else 0) + [(along, ry)] * (nx if ry else 0)
+        if rx and ry:
+            panels.append((rx, ry))
+        if best is None or nx * ny > best[0]:
+            best = (nx * ny, panels)
+    return best
+
+
+class _Packer:
+    """Best-area-fit guillotine packing with free rectangles kept in arrays."""
+
+    def __init__(self, sheet_w, sheet_h, capacity):
+        self.sheet_w, self.sheet_h = sheet_w, sheet_h
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.w = np.zeros(capacity, dtype=np.int64)
+        self.h = np.zeros(capacity, dtype=np.int64)
+        self.sheet = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self.sheets = []
+
+    def _add_free(self, sheet, x, y, w, h):
+        if w > 0 and h > 0:
+            index = self.size
+            self.x[index], self.y[index], self.w[index], self.h[index] = x, y, w, h
+            self.sheet[index] = sheet
+            self.size += 1
+
+    def _new_sheet(self):
+        self.sheets.append([])
+        self._add_free(len(self.sheets) - 1, 0, 0, self.sheet_w, self.sheet_h)
+
+    def place(self, piece_id, pw, ph):
+        for attempt in range(2):
+            w, h = self.w[:self.size], self.h[:self.size]
+            upright = (w >= pw) & (h >= ph)
+            rotated = (w >= ph) & (h >= pw)
+            candidates = np.flatnonzero(upright | rotated)
+            if len(candidates):
+                break
+            self._new_sheet()
+        else:
+            raise ValueError(f'Panel {pw}x{ph} does not fit on a {self.sheet_w}x{self.sheet_h} sheet')
+        index = candidates[np.argmin(w[candidates] * h[candidates])]
+        fx, fy, fw, fh, sheet = (int(self.x[index]), int(self.y[index]), int(self.w[index]),
+                                 int(self.h[index]), int(self.sheet[index]))
+        turn = False
+        if rotated[index] and (not upright[index] or min(fw - ph, fh - pw) < min(fw - pw, fh - ph)):
+            pw, ph, turn = ph, pw, True
+        # Remove the used rectangle by moving the last one into its slot.
+        last = self.size - 1
+        for column in (self.x, self.y, self.w, self.h, self.sheet):
+            column[index] = column[last]
+        self.size = last
+        # Guillotine split, keeping the larger leftover rectangle whole.
+        if fw - pw < fh - ph:
+            self._add_free(sheet, fx + pw, fy, fw - pw, ph)
+            self._add_free(sheet, fx, fy + ph, fw, fh - ph)
+        else:
+            self._add_free(sheet, fx + pw, fy, fw - pw, fh)
+            self._add_free(sheet, fx, fy + ph, pw, fh - ph)
+        self.sheets[sheet].append((piece_id, fx, fy, pw, ph, turn))
+
+
+def _heuristic(pieces, sheet_w, sheet_h, lower_bound, deadline):
+    best = None
+    for ordering in _ORDERINGS:
+        order = sorted(range(len(pieces)), key=lambda i: ordering(pieces[i]))
+        packer = _Packer(sheet_w, sheet_h, 3 * len(pieces) + 2)
+        for i in order:
+            packer.place(i, *pieces[i])
+        if best is None or len(packer.sheets) < len(best):
+            best = packer.sheets
+        if len(best) <= lower_bound or time.perf_counter() > deadline:
+            break
+    return best
+
+
+def _sums(pieces, limit):
+    """Cut positions worth trying: sums of piece sides up to ``limit``."""
+    sums = {0}
+    for w, h in pieces:
+        sums |= {s + d for s in sums for d in (w, h) if s + d <= limit}
+    return sorted(sums - {0})
+
+
+@lru_cache(maxsize=65536)
+def _guillotine_fit(pieces, width, height):
+    """Exact check: can ``pieces`` be guillotine-cut from width x height?
+
+    ``pieces`` is a sorted tuple of (w, h). Returns placements
+    ``(x, y, w, h)`` aligned with ``pieces`` or ``None``.
+    """
+    if sum(w * h for w, h in pieces) > width * height:
+        return None
+    if len(pieces) == 1:
+        w, h = pieces[0]
+        if w <= width and h <= height:
+            return ((0, 0, w, h),)
+        if h <= width and w <= height:
+            return ((0, 0, h, w),)
+        return None
+    indices = range(len(pieces))
+    for size in range(1, len(pieces)):
+        for first in itertools.combinations(indices, size):
+            if 0 not in first:
+                continue
+            rest = [i for i in indices if i not in first]
+            part = tuple(pieces[i] for i in first)
+            other = tuple(pieces[i] for i in rest)
+            for vertical in (True, False):
+                span = width if vertical else height
+                for cut in _sums(part, span):
+                    if vertical:
+                        head = _guillotine_fit(part, cut, height)
+                        tail = head and _guillotine_fit(other, width - cut, height)
+                    else:
+                        head = _guillotine_fit(part, width, cut)
+                        tail = head and _guillotine_fit(other, width, height - cut)
+                    if head is None:
+                        continue
+                    if not tail:
+                        break
+                    placements = [None] * len(pieces)
+                    for i, spot in zip(first, head):
+                        placements[i] = spot
+                    for i, (x, y, w, h) in zip(rest, tail):
+                        placements[i] = (x + cut, y, w, h) if vertical else (x, y + cut, w, h)
+                    return tuple(placements)
+    return None
+
+
+def _sheet_layout(pieces, ids, sheet_w, sheet_h):
+    order = sorted(range(len(ids)), key=lambda i: pieces[ids[i]])
+    fit = _guillotine_fit(tuple(pieces[ids[i]] for i in order), sheet_w, sheet_h)
+    if fit is None:
+        return None
+    return [
+        (ids[i], x, y, w, h, (w, h) != pieces[ids[i]])
+        for i, (x, y, w, h) in zip(order, fit)
+    ]
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _exact(pieces, sheet_w, sheet_h, upper_bound, lower_bound, deadline):
+    """Branch and bound over assignments of pieces to sheets.
+
+    Returns ``(plans, proven)``: the cut plans of the best solution using
+    fewer than ``upper_bound`` sheets (``None`` if none was found) and
+    whether the search finished before ``deadline``.
+    """
+    order = sorted(range(len(pieces)), key=lambda i: -pieces[i][0] * pieces[i][1])
+    best = {'bins': None, 'count': upper_bound}
+
+    def assign(position, bins):
+        if best['count'] <= lower_bound:
+            return
+        if time.perf_counter() > deadline:
+            raise _Timeout
+        if position == len(order):
+            best['bins'] = [list(b) for b in bins]
+            best['count'] = len(bins)
+            return
+        piece = order[position]
+        for b in bins:
+            b.append(piece)
+            if _sheet_layout(pieces, b, sheet_w, sheet_h) is not None:
+                assign(position + 1, bins)
+            b.pop()
+        if len(bins) + 1 < best['count']:
+            bins.append([piece])
+            assign(position + 1, bins)
+            bins.pop()
+
+    proven = True
+    try:
+        assign(0, [])
+    except _Timeout:
+        proven = False
+    if best['bins'] is None:
+        return None, proven
+    return [_sheet_layout(pieces, b, sheet_w, sheet_h) for b in best['bins']], proven
+
+
+def optimize(rooms, plywood, time_limit=DEFAULT_TIME_LIMIT):
+    """Pack the ceiling panels of ``rooms`` onto ``plywood`` sheets.
+
+    Returns a dict with the sheet count (whole plus cut sheets), the cut
+    plans for the cut sheets, the utilization of all sheets, the total
+    cost and whether the packing is proven optimal (``exact``).
+    """
+    deadline = time.perf_counter() + time_limit
+    sheet_w, sheet_h = _mm(plywood.length), _mm(plywood.width)
+    full_sheets = 0
+    pieces, owners = [], []
+    for room in rooms:
+        length, width = geometry.layout_dimensions(room)
+        full, panels = room_panels(_mm(length), _mm(width), sheet_w, sheet_h)
+        full_sheets += full * room.quantity
+        for _ in range(room.quantity):
+            pieces.extend(panels)
+            owners.extend([room.pk] * len(panels))
+
+    sheet_area = sheet_w * sheet_h
+    used_area = sum(w * h for w, h in pieces)
+    lower_bound = math.ceil(used_area / sheet_area) if pieces else 0
+    sheets = _heuristic(pieces, sheet_w, sheet_h, lower_bound, deadline) if pieces else []
+    exact = len(sheets) <= lower_bound
+    if not exact and len(pieces) <= EXACT_LIMIT:
+        solved, exact = _exact(pieces, sheet_w, sheet_h, len(sheets), lower_bound, deadline)
+        if solved is not None:
+            sheets = solved
+
+    total_sheets = full_sheets + len(sheets)
+    return {
+        'total_sheets': total_sheets,
+        'full_sheets': full_sheets,
+        'cut_sheets': len(sheets),
+        'utilization': (
+            (full_sheets * sheet_area + used_area) / (total_sheets * sheet_area) if total_sheets else 0.0
+        ),
+        'total_cost': total_sheets * plywood.price_per_sheet,
+        'exact': exact,
+        'plans': [
+            {
+                'panels': [
+                    {'room': owners[piece], 'x': x, 'y': y, 'length': w, 'width': h, 'rotated': turned}
+                    for piece, x, y, w, h, turned in sheet
+                ],
+                'utilization': sum(w * h for _, _, _, w, h, _ in sheet) / sheet_area,
+            }
+            for sheet in sheets
+        ],
+    }
@@ -0,0 +1,424 @@
+"""Batch estimation engine for material requirements.
+
+Every function works on whole arrays of rooms and materials at once, so a
+full room x material matrix is a single NumPy pass. The models'
+``calculate_requirements`` methods delegate to the scalar helpers at the
+bottom of this module, which run the same integer arithmetic on Python
+ints (no arrays for a single pair) and so give identical results.
+
+Rooms and materials can be passed either as sequences of model instances
+(or any object with the same attributes) or as dicts of column arrays, as
+returned by the ``*_columns`` helpers. ``room_columns`` also takes a room
+queryset, which it reads with ``values_list`` instead of building model
+instances. Plywood and electrical requirements use a room's stored floor
+area and perimeter, so outlined rooms are priced by their real shape;
+tiles are laid out over ``length`` x ``width``, which for an outlined room
+is the rectangle with the same area and perimeter
+(``geometry.layout_dimensions``), not the dimensions stored on the room.
+
+Costs are integer cents throughout and are converted to ``Decimal`` only at
+the edges (``cents_to_decimal``). Whatever feeds a price or a rounded-up
+count is made integer first: lengths and areas in millimetres, wiring
+rule factors in thousandths, waste percentages in hundredths of a
+percent. So the batch and scalar paths,
+and any later recomputation, give identical results, and totals over any
+number of rows are exact sums.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import BooleanField, ExpressionWrapper, Q, QuerySet
+
+from . import geometry
+from .layout import tile_layout, tile_layout_arrays
+
+
+def to_cents(price):
+    return int((Decimal(price) * 100).to_integral_value())
+
+
+def cents_to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _scaled(values, factor):
+    """``values * factor`` rounded half to even: an int for a scalar, else an int64 array."""
+    if np.ndim(values) == 0:
+        return round(float(values) * factor)
+    return np.rint(np.asarray(values, dtype=np.float64) * factor).astype(np.int64)
+
+
+def to_millimetres(metres):
+    return _scaled(metres, 1000)
+
+
+def _thousandths(values):
+    return _scaled(values, 1000)
+
+
+def _basis_points(percentage):
+    return _scaled(percentage, 100)
+
+
+def _square_millimetres(area):
+    return _scaled(area, 1e6)
+
+
+def with_waste(count, waste_percentage):
+    """``ceil(count * (1 + waste_percentage / 100))`` in integer arithmetic."""
+    scaled = np.asarray(count, dtype=np.int64) * (10000 + _basis_points(waste_percentage))
+    return -(-scaled // 10000)
+
+
+def _column(objects, attr, dtype):
+    return np.fromiter((getattr(obj, attr) for obj in objects), dtype=dtype, count=len(objects))
+
+
+ROOM_FIELDS = ('length', 'width', 'quantity', 'room_type', 'floor_area', 'floor_perimeter')
+
+
+def _geometry(length, width, area, perimeter):
+    """Stored area (m²) and perimeter (m) of one room, as float columns.
+
+    Rooms without stored geometry (``None``, read as NaN), such as
+    unsaved ones, are rectangles.
+    """
+    missing = np.isnan(area) | np.isnan(perimeter)
+    if missing.any():
+        length_mm, width_mm = to_millimetres(length), to_millimetres(width)
+        area = np.where(missing, length_mm * width_mm / 1e6, area)
+        perimeter = np.where(missing, 2 * (length_mm + width_mm) / 1000, perimeter)
+    return area, perimeter
+
+
+def _room_geometry(room):
+    """``_geometry()`` for one room, in Python floats."""
+    area, perimeter = getattr(room, 'floor_area', None), getattr(room, 'floor_perimeter', None)
+    if area is None or perimeter is None:
+        length, width = geometry.layout_dimensions(room)
+        length_mm, width_mm = to_millimetres(length), to_millimetres(width)
+        area, perimeter = length_mm * width_mm / 1e6, 2 * (length_mm + width_mm) / 1000
+    return area, perimeter
+
+
+def _layout_rectangles(dimensions, outlined):
+    """Replace outlined rooms' length and width with their layout rectangle."""
+    for index in np.flatnonzero(outlined):
+        dimensions[0:2, index] = geometry.equivalent_rectangle(dimensions[2, index], dimensions[3, index])
+
+
+def room_columns(rooms):
+    if isinstance(rooms, QuerySet):
+        has_outline = ExpressionWrapper(Q(polygon__isnull=False), output_field=BooleanField())
+        rows = list(rooms.values_list(*ROOM_FIELDS, has_outline))
+        length, width, quantity, room_type, area, perimeter, outlined = (
+            zip(*rows) if rows else ((),) * (len(ROOM_FIELDS) + 1)
+        )
+        dimensions = np.array([length, width, area, perimeter], dtype=np.float64)
+        _layout_rectangles(dimensions, np.array(outlined, dtype=bool))
+    else:
+        rooms = list(rooms)
+        # One array for the float attributes; None (no stored geometry) reads as NaN.
+        dimensions = np.array([
+            (*geometry.layout_dimensions(room),
+             getattr(room, 'floor_area', None), getattr(room, 'floor_perimeter', None))
+            for room in rooms
+        ], dtype=np.float64).reshape(-1, 4).T
+        quantity = [room.quantity for room in rooms]
+        room_type = [room.room_type for room in rooms]
+    columns = {
+        'length': dimensions[0],
+        'width': dimensions[1],
+        'quantity': np.array(quantity, dtype=np.int64),
+        'room_type': np.array(room_type, dtype=str),
+    }
+    columns['area'], columns['perimeter'] = _geometry(columns['length'], columns['width'], dimensions[2], dimensions[3])
+    return columns
+
+
+def tile_columns(tiles):
+    tiles = list(tiles)
+    return {
+        'length': _column(tiles, 'length', np.float64),
+        'width': _column(tiles, 'width', np.float64),
+        'pieces_per_box': _column(tiles, 'pieces_per_box', np.int64),
+        'price_cents': np.array([to_cents(tile.price_per_box) for tile in tiles], dtype=np.int64),
+        'waste_percentage': _column(tiles, 'waste_percentage', np.float64),
+        'joint_width': _column(tiles, 'joint_width', np.float64),
+        'orientation': np.array([tile.orientation for tile in tiles], dtype=str),
+    }
+
+
+def plywood_columns(plywoods):
+    plywoods = list(plywoods)
+    return {
+        'length': _column(plywoods, 'length', np.float64),
+        'width': _column(plywoods, 'width', np.float64),
+        'price_cents': np.array([to_cents(plywood.price_per_sheet) for plywood in plywoods], dtype=np.int64),
+        'waste_percentage': _column(plywoods, 'waste_percentage', np.float64),
+    }
+
+
+def component_columns(components):
+    components = list(components)
+    return {
+        'component_type': np.array([c.component_type for c in components], dtype=str),
+        'price_cents': np.array([to_cents(c.unit_price) for c in components], dtype=np.int64),
+        'default_quantity': _column(components, 'default_quantity', np.int64),
+    }
+
+
+def _as_columns(items, builder):
+    if isinstance(items, dict):
+        return items
+    return builder(items)
+
+
+def _outer(rooms, materials):
+    """Reshape room columns to (R, 1) and material columns to (1, M)."""
+    return (
+        {key: value[:, None] for key, value in rooms.items()},
+        {key: value[None, :] for key, value in materials.items()},
+    )
+
+
+def _tile(rooms, tiles):
+    layout = tile_layout_arrays(
+        rooms['length'], rooms['width'], rooms['quantity'],
+        tiles['length'], tiles['width'], tiles['joint_width'], tiles['orientation'],
+    )
+    # The layout covers cutting; waste_percentage only adds a breakage allowance.
+    total_pieces = with_waste(layout['pieces'], tiles['waste_percentage'])
+    total_boxes = -(-total_pieces // tiles['pieces_per_box'])
+    return {
+        'full_pieces': layout['full_pieces'],
+        'cut_pieces': layout['cut_pieces'],
+        'total_pieces': total_pieces,
+        'total_boxes': total_boxes,
+        'total_cost_cents': total_boxes * tiles['price_cents'],
+    }
+
+
+def _plywood(rooms, plywoods):
+    # Areas in mm²: ceil(room_area * (1 + waste) / sheet_area) without floats.
+    # Only operators, so scalar rooms and plywoods give Python ints.
+    room_area = _square_millimetres(rooms['area']) * rooms['quantity']
+    plywood_area = to_millimetres(plywoods['length']) * to_millimetres(plywoods['width'])
+    needed = room_area * (10000 + _basis_points(plywoods['waste_percentage']))
+    total_sheets = -(-needed // (plywood_area * 10000))
+    return {
+        'total_sheets': total_sheets,
+        'total_cost_cents': total_sheets * plywoods['price_cents'],
+    }
+
+
+def _rules(rules):
+    if rules is None:
+        from .wiring import rule_table
+        rules = rule_table()
+    return rules
+
+
+def _wiring_amounts(rule, quantity, perimeter, area, base_count):
+    """Cable length in mm and item count for a room, from its wiring rule.
+
+    Works on arrays and on scalars (giving Python ints) alike.
+    """
+    # In billionths of a metre or item: factors in thousandths times the
+    # perimeter in mm (x 1000) and the area in mm², all integers.
+    scaled = (_thousandths(rule['perimeter_factor']) * to_millimetres(perimeter) * 1000
+              + _thousandths(rule['area_factor']) * _square_millimetres(area))
+    cable_mm = (to_millimetres(rule['fixed_length']) * 1000000 + scaled + 500000) // 1000000 * quantity
+    count = -(-(_thousandths(base_count) * 1000000 + scaled) // 1000000000) * quantity
+    return cable_mm, count
+
+
+def _cable_cost(cable_mm, price_cents):
+    # Cable is priced per metre: round the mm x cents/m product half up.
+    return (cable_mm * price_cents + 500) // 1000
+
+
+def _electrical(rooms, components, rules):
+    from .wiring import lookup
+    rule = lookup(rules, rooms['room_type'], components['component_type'])
+    base_count = np.where(np.isnan(rule['default_count']), components['default_quantity'], rule['default_count'])
+    cable_mm, count = _wiring_amounts(rule, rooms['quantity'], rooms['perimeter'], rooms['area'], base_count)
+    is_cable = components['component_type'] == 'cable'
+    cable_cost = _cable_cost(cable_mm, components['price_cents'])
+    # Quantities in thousandths (mm of cable, items x 1000) sum exactly.
+    quantity_milli = np.where(is_cable, cable_mm, count * 1000)
+    return {
+        'quantity': quantity_milli / 1000,
+        'quantity_milli': quantity_milli,
+        'is_cable': np.broadcast_to(is_cable, quantity_milli.shape),
+        'total_cost_cents': np.where(is_cable, cable_cost, count * components['price_cents']),
+    }
+
+
+def tile_matrix(rooms, tiles):
+    """Tile requirements for every room x tile pair, as (R, T) arrays."""
+    rooms = _as_columns(rooms, room_columns)
+    tiles = _as_columns(tiles, tile_columns)
+    return _tile(*_outer(rooms, tiles))
+
+
+def plywood_matrix(rooms, plywoods):
+    """Plywood requirements for every room x plywood pair, as (R, P) arrays."""
+    rooms = _as_columns(rooms, room_columns)
+    plywoods = _as_columns(plywoods, plywood_columns)
+    return _plywood(*_outer(rooms, plywoods))
+
+
+def electrical_matrix(rooms, components, rules=None):
+    """Electrical requirements for every room x component pair, as (R, C) arrays.
+
+    ``rules`` defaults to the current wiring rule table.
+    """
+    rooms = _as_columns(rooms, room_columns)
+    components = _as_columns(components, component_columns)
+    return _electrical(*_outer(rooms, components), _rules(rules))
+
+
+def tile_pairs(rooms, tiles):
+    """Tile requirements for aligned rooms[i] / tiles[i] pairs."""
+    return _tile(_as_columns(rooms, room_columns), _as_columns(tiles, tile_columns))
+
+
+def plywood_pairs(rooms, plywoods):
+    """Plywood requirements for aligned rooms[i] / plywoods[i] pairs."""
+    return _plywood(_as_columns(rooms, room_columns), _as_columns(plywoods, plywood_columns))
+
+
+def electrical_pairs(rooms, components, rules=None):
+    """Electrical requirements for aligned rooms[i] / components[i] pairs."""
+    return _electrical(
+        _as_columns(rooms, room_columns), _as_columns(components, component_columns), _rules(rules)
+    )
+
+
+def tile_requirements(room, tile):
+    # Same arithmetic as _tile(), on the memoized scalar layout.
+    length, width = geometry.layout_dimensions(room)
+    layout = tile_layout(
+        length, width, room.quantity,
+        tile.length, tile.width, tile.joint_width, tile.orientation,
+    )
+    total_pieces = int(with_waste(layout.pieces, tile.waste_percentage))
+    total_boxes = -(-total_pieces // tile.pieces_per_box)
+    return {
+        'full_pieces': layout.full_pieces,
+        'cut_pieces': layout.cut_pieces,
+        'total_pieces': total_pieces,
+        'total_boxes': total_boxes,
+        'total_cost': cents_to_decimal(total_boxes * to_cents(tile.price_per_box)),
+    }
+
+
+def plywood_requirements(room, plywood):
+    # _plywood() on scalars: the same integer arithmetic, in Python ints.
+    area, _ = _room_geometry(room)
+    result = _plywood(
+        {'area': area, 'quantity': room.quantity},
+        {'length': plywood.length, 'width': plywood.width,
+         'waste_percentage': plywood.waste_percentage, 'price_cents': to_cents(plywood.price_per_sheet)},
+    )
+    return {
+        'total_sheets': result['total_sheets'],
+        'total_cost': cents_to_decimal(result['total_cost_cents']),
+    }
+
+
+def electrical_requirements(room, component, rules=None):
+    # Same arithmetic as _electrical(), for one pair in Python ints.
+    from .wiring import rule_for
+    rule = rule_for(_rules(rules), room.room_type, component.component_type)
+    base_count = component.default_quantity if rule['default_count'] is None else rule['default_count']
+    area, perimeter = _room_geometry(room)
+    cable_mm, count = _wiring_amounts(rule, room.quantity, perimeter, area, base_count)
+    price_cents = to_cents(component.unit_price)
+    if component.component_type == 'cable':
+        return {'quantity': cable_mm / 1000, 'total_cost': cents_to_decimal(_cable_cost(cable_mm, price_cents))}
+    return {'quantity': count, 'total_cost': cents_to_decimal(count * price_cents)}
+
+
+def _line(kind, material, quantity, unit, cost_cents):
+    return {
+        'kind': kind,
+        'id': material.pk,
+        'name': material.name,
+        'quantity': quantity,
+        'unit': unit,
+        'total_cost': cents_to_decimal(cost_cents),
+    }
+
+
+def requirement_matrices(rooms, tiles=(), plywoods=(), components=(), rules=None):
+    """Requirement matrices for each material kind (``None`` when unused)."""
+    columns = room_columns(rooms)
+    return {
+        'tile': tile_matrix(columns, tiles) if tiles else None,
+        'plywood': plywood_matrix(columns, plywoods) if plywoods else None,
+        'electrical': electrical_matrix(columns, components, rules) if components else None,
+    }
+
+
+def bill_of_materials(rooms, tiles=(), plywoods=(), components=(), matrices=None, multipliers=None):
+    """Aggregate requirements for every room against the chosen materials.
+
+    Returns totals per SKU, per room and a grand total. Each material kind
+    is computed as one matrix, so the cost does not grow with per-pair
+    Python calls. Pass ``matrices`` from ``requirement_matrices`` to reuse
+    results the caller already has. ``multipliers`` says how many times
+    each room occurs (rooms of repeated unit templates); a room is priced
+    once and its results multiplied out.
+    """
+    rooms, tiles, plywoods, components = list(rooms), list(tiles), list(plywoods), list(components)
+    if matrices is None:
+        matrices = requirement_matrices(rooms, tiles, plywoods, components)
+    if multipliers is None:
+        weights = np.ones(len(rooms), dtype=np.int64)
+    else:
+        weights = np.asarray(multipliers, dtype=np.int64)
+    room_cents = np.zeros(len(rooms), dtype=np.int64)
+    items = []
+
+    def total(values):
+        return (values * weights[:, None]).sum(axis=0)
+
+    if tiles:
+        result = matrices['tile']
+        room_cents += result['total_cost_cents'].sum(axis=1) * weights
+        boxes = total(result['total_boxes'])
+        pieces = total(result['total_pieces'])
+        costs = total(result['total_cost_cents'])
+        for index, tile in enumerate(tiles):
+            line = _line('tile', tile, int(boxes[index]), 'box', costs[index])
+            line['pieces'] = int(pieces[index])
+            items.append(line)
+
+    if plywoods:
+        result = matrices['plywood']
+        room_cents += result['total_cost_cents'].sum(axis=1) * weights
+        sheets = total(result['total_sheets'])
+        costs = total(result['total_cost_cents'])
+        for index, plywood in enumerate(plywoods):
+            items.append(_line('plywood', plywood, int(sheets[index]), 'sheet', costs[index]))
+
+    if components:
+        result = matrices['electrical']
+        room_cents += result['total_cost_cents'].sum(axis=1) * weights
+        quantities = total(result['quantity_milli']) / 1000
+        costs = total(result['total_cost_cents'])
+        for index, component in enumerate(components):
+            quantity = quantities[index]
+            quantity = float(quantity) if component.component_type == 'cable' else int(quantity)
+            items.append(_line('electrical', component, quantity, component.unit, costs[index]))
+
+    return {
+        'items': items,
+        'rooms': [
+            {'id': room.pk, 'name': room.name, 'total_cost': cents_to_decimal(cents)}
+            for room, cents in zip(rooms, room_cents)
+        ],
+        'total_cost': cents_to_decimal(room_cents.sum()),
+    }
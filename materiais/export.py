@@ -0,0 +1,216 @@
+"""Streaming export of stored calculations.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)``, which uses
+server-side cursors where the database supports them, and room/material
+names come from the same joined query. Both writers are generators, so
+exports never hold more than one chunk in memory.
+
+Two formats are available:
+
+* ``csv`` - plain CSV with a header row.
+* ``columnar`` - a compact binary format with one block per column for
+  each row group (see ``columnar_chunks``), readable with ``read_columnar``.
+"""
+import csv
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .estimation import to_cents
+from .models import ElectricalCalculation, PlywoodCalculation, TileCalculation
+
+# (column name, lookup, type) per calculation kind.
+EXPORTS = {
+    'tile': (TileCalculation, [
+        ('id', 'id', 'int64'),
+        ('calculation_date', 'calculation_date', 'datetime'),
+        ('room_id', 'room_id', 'int64'),
+        ('room', 'room__name', 'string'),
+        ('tile_id', 'tile_id', 'int64'),
+        ('tile', 'tile__name', 'string'),
+        ('total_boxes', 'total_boxes', 'float64'),
+        ('total_pieces', 'total_pieces', 'int64'),
+        ('waste_percentage', 'waste_percentage', 'float64'),
+        ('total_cost', 'total_cost', 'decimal'),
+    ]),
+    'plywood': (PlywoodCalculation, [
+        ('id', 'id', 'int64'),
+        ('calculation_date', 'calculation_date', 'datetime'),
+        ('room_id', 'room_id', 'int64'),
+        ('room', 'room__name', 'string'),
+        ('plywood_id', 'plywood_id', 'int64'),
+        ('plywood', 'plywood__name', 'string'),
+        ('total_sheets', 'total_sheets', 'int64'),
+        ('waste_percentage', 'waste_percentage', 'float64'),
+        ('total_cost', 'total_cost', 'decimal'),
+    ]),
+    'electrical': (ElectricalCalculation, [
+        ('id', 'id', 'int64'),
+        ('calculation_date', 'calculation_date', 'datetime'),
+        ('room_id', 'room_id', 'int64'),
+        ('room', 'room__name', 'string'),
+        ('component_id', 'component_id', 'int64'),
+        ('component', 'component__name', 'string'),
+        ('quantity', 'quantity', 'float64'),
+        ('total_cost', 'total_cost', 'decimal'),
+    ]),
+}
+
+FORMATS = ('csv', 'columnar')
+
+MAGIC = b'HECOL1\n'
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def rows(kind, chunk_size=2000):
+    model, columns = EXPORTS[kind]
+    lookups = [lookup for _, lookup, _ in columns]
+    return model.objects.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_chunks(kind, chunk_size=2000):
+    _, columns = EXPORTS[kind]
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _, _ in columns])
+    batch = []
+    for row in rows(kind, chunk_size):
+        batch.append(writer.writerow(row))
+        if len(batch) >= chunk_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _encode_ints(values):
+    """Frame-of-reference encoding: int64 base plus the narrowest offsets."""
+    values = np.asarray(values, dtype=np.int64)
+    base = int(values.min()) if len(values) else 0
+    offsets = values - base
+    top = int(offsets.max()) if len(offsets) else 0
+    itemsize = next(size for size in (1, 2, 4, 8) if top < 2 ** (8 * size - 1))
+    return struct.pack('<qB', base, itemsize) + offsets.astype(f'<i{itemsize}').tobytes()
+
+
+def _decode_ints(data, count):
+    base, itemsize = struct.unpack('<qB', data[:9])
+    return np.frombuffer(data[9:], dtype=f'<i{itemsize}', count=count).astype(np.int64) + base
+
+
+def _encode_column(values, kind):
+    if kind == 'string':
+        # Dictionary encoding: room and material names repeat a lot.
+        dictionary, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+        encoded = [value.encode('utf-8') for value in dictionary]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        header = struct.pack('<I', len(encoded)) + offsets.tobytes() + b''.join(encoded)
+        return struct.pack('<Q', len(header)) + header + _encode_ints(codes)
+    if kind == 'decimal':
+        return _encode_ints([to_cents(value) for value in values])
+    if kind == 'datetime':
+        return _encode_ints([(value - _EPOCH) // _MICROSECOND for value in values])
+    if kind == 'int64':
+        return _encode_ints(values)
+    return np.array(values, dtype='<f8').tobytes()
+
+
+def _decode_column(data, kind, count):
+    if kind == 'string':
+        (header_length,) = struct.unpack('<Q', data[:8])
+        header = data[8:8 + header_length]
+        (size,) = struct.unpack('<I', header[:4])
+        offsets = np.frombuffer(header[4:4 + (size + 1) * 8], dtype='<i8')
+        blob = header[4 + (size + 1) * 8:]
+        dictionary = np.array(
+            [blob[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])],
+            dtype=object,
+        )
+        return dictionary[_decode_ints(data[8 + header_length:], count)]
+    if kind == 'float64':
+        return np.frombuffer(data, dtype='<f8', count=count)
+    return _decode_ints(data, count)
+
+
+def _row_group(columns, batch):
+    parts = [struct.pack('<I', len(batch))]
+    for index, (_, _, kind) in enumerate(columns):
+        data = _encode_column([row[index] for row in batch], kind)
+        parts.append(struct.pack('<Q', len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def columnar_chunks(kind, chunk_size=2000, row_group_size=65536):
+    """Yield the export in the columnar format.
+
+    Layout: ``MAGIC``, a little-endian uint32 length and a JSON schema, then
+    row groups of ``uint32 row count`` followed by ``uint64 length + data``
+    for each column. A row count of zero ends the file. Floats are raw
+    float64 arrays. Ints, decimals (as cents) and datetimes (as microseconds
+    since the epoch) store an int64 base, a one-byte item size and the
+    offsets from the base at that size. Strings are dictionary encoded: the
+    distinct values (uint32 count, int64 offsets, UTF-8 bytes) followed by
+    integer codes.
+    """
+    _, columns = EXPORTS[kind]
+    schema = json.dumps({
+        'kind': kind,
+        'columns': [{'name': name, 'type': column_type} for name, _, column_type in columns],
+    }).encode()
+    yield MAGIC + struct.pack('<I', len(schema)) + schema
+    batch = []
+    for row in rows(kind, chunk_size):
+        batch.append(row)
+        if len(batch) >= row_group_size:
+            yield _row_group(columns, batch)
+            batch = []
+    if batch:
+        yield _row_group(columns, batch)
+    yield struct.pack('<I', 0)
+
+
+def _read_exact(fp, size):
+    data = fp.read(size)
+    if len(data) != size:
+        raise ValueError('Truncated columnar file')
+    return data
+
+
+def read_columnar(fp):
+    """Yield each row group of a columnar export as a dict of NumPy arrays."""
+    if _read_exact(fp, len(MAGIC)) != MAGIC:
+        raise ValueError('Not a columnar export')
+    (schema_length,) = struct.unpack('<I', _read_exact(fp, 4))
+    schema = json.loads(_read_exact(fp, schema_length))
+    while True:
+        (count,) = struct.unpack('<I', _read_exact(fp, 4))
+        if count == 0:
+            return
+        group = {}
+        for column in schema['columns']:
+            (length,) = struct.unpack('<Q', _read_exact(fp, 8))
+            group[column['name']] = _decode_column(_read_exact(fp, length), column['type'], count)
+        yield group
+
+
+def content_type(fmt):
+    return 'text/csv' if fmt == 'csv' else 'application/octet-stream'
+
+
+def filename(kind, fmt):
+    return f"{kind}_calculations.{'csv' if fmt == 'csv' else 'hecol'}"
+
+
+def chunks(kind, fmt, chunk_size=2000):
+    if fmt == 'csv':
+        return csv_chunks(kind, chunk_size)
+    return columnar_chunks(kind, chunk_size)
@@ -0,0 +1,118 @@
+"""Bulk room intake from floor-plan files.
+
+A file lists rooms as CSV, a JSON array (or ``{"rooms": [...]}``) or JSON
+lines, with the room form's fields: ``name``, ``length``, ``width``,
+``quantity`` and ``room_type``. A room that is not a rectangle gives its
+outline instead of ``length`` and ``width``: ``polygon`` is a list of
+``[x, y]`` corners in metres, or in CSV the text ``"x y; x y; ..."``.
+
+Every row is validated like the room form, which also stores each room's
+area and perimeter (see ``Room.update_geometry``); the rooms are then
+created with ``bulk_create`` in one transaction, so a file is imported
+whole or not at all unless invalid rows are skipped.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from . import snapshot
+from .forms import RoomForm, RowValidator
+from .models import Room
+
+FORMATS = ('csv', 'json', 'jsonl')
+BATCH_SIZE = 1000
+
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` pairs from a text stream.
+
+    A row that cannot be decoded is yielded as the exception instead.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, exc
+    else:
+        try:
+            data = json.load(stream)
+        except json.JSONDecodeError as exc:
+            yield exc.lineno, exc
+            return
+        if isinstance(data, dict):
+            data = data.get('rooms')
+        if not isinstance(data, list):
+            yield 1, ValueError('Expected a list of rooms or {"rooms": [...]}.')
+            return
+        # JSON documents have no meaningful line per room; number the rooms.
+        yield from enumerate(data, start=1)
+
+
+def room_data(line_number, row):
+    """The room form's data for one file row."""
+    data = {key: value for key, value in row.items() if key and value not in ('', None)}
+    data.setdefault('name', f'Room {line_number}')
+    data.setdefault('quantity', 1)
+    return data
+
+
+def validate(rows):
+    """Unsaved rooms and ``(line_number, errors)`` for the rejected rows."""
+    validator = RowValidator(RoomForm)
+    rooms, rejected = [], []
+    for line_number, row in rows:
+        if isinstance(row, Exception):
+            rejected.append((line_number, {'__all__': [str(row)]}))
+            continue
+        if not isinstance(row, dict):
+            rejected.append((line_number, {'__all__': ['Expected an object.']}))
+            continue
+        room, errors = validator(room_data(line_number, row))
+        if errors:
+            rejected.append((line_number, errors))
+        else:
+            rooms.append(room)
+    return rooms, rejected
+
+
+def intake(rows, unit_template=None, skip_invalid=False, batch_size=BATCH_SIZE):
+    """Validate ``rows`` and create their rooms in one transaction.
+
+    Returns ``{'created': n, 'rejected': [(line_number, errors), ...]}``.
+    Nothing is created when a row is rejected, unless ``skip_invalid``.
+    """
+    rooms, rejected = validate(rows)
+    if rejected and not skip_invalid:
+        return {'created': 0, 'rejected': rejected}
+    for room in rooms:
+        room.unit_template = unit_template
+    with transaction.atomic():
+        Room.objects.bulk_create(rooms, batch_size=batch_size)
+    # bulk_create() does not send post_save, so retire the room snapshot by hand.
+    if rooms:
+        snapshot.bump_rooms_version()
+    return {'created': len(rooms), 'rejected': rejected}
+
+
+def intake_file(file, fmt=None, **kwargs):
+    """``intake`` for an uploaded (binary) file."""
+    fmt = fmt or guess_format(file.name)
+    stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        return intake(read_rows(stream, fmt), **kwargs)
+    finally:
+        stream.detach()
@@ -1,15 +1,107 @@
 from django import forms
+from django.core.exceptions import ValidationError
 from .models import (
-    Room, Tile, TileCalculation,
+    Building, Room, Tile, TileCalculation, UnitTemplate,
     Plywood, PlywoodCalculation,
     ElectricComponent, ElectricalCalculation
 )
+from . import geometry
+from .snapshot import requirements
+
+
+class RecalculatedForm(forms.ModelForm):
+    """Calculation form whose results are recomputed on the server.
+
+    The page fills the read-only result fields live from the preview
+    endpoint; ``clean()`` recomputes them from the chosen room, material
+    and waste percentage, so the posted values are never trusted.
+    """
+    material_field = None
+    result_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.result_fields:
+            self.fields[name].required = False
+        if 'waste_percentage' in self.fields:
+            self.fields['waste_percentage'].required = False
+            self.fields['waste_percentage'].help_text = "Leave empty to use the material's own"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        room, material = cleaned_data.get('room'), cleaned_data.get(self.material_field)
+        if room is None or material is None:
+            return cleaned_data
+        if 'waste_percentage' in self.fields and cleaned_data.get('waste_percentage') is None:
+            cleaned_data['waste_percentage'] = material.waste_percentage
+        result = requirements(room, material, cleaned_data.get('waste_percentage'))
+        for name in self.result_fields:
+            cleaned_data[name] = result[name]
+            self.errors.pop(name, None)
+        return cleaned_data
+
+
+class RowValidator:
+    """Apply a ModelForm's validation rules to many rows.
+
+    Equivalent to ``form_class(data=row).is_valid()`` minus the uniqueness
+    checks, but the form fields are built once instead of deep-copied for
+    every row.
+    """
+
+    def __init__(self, form_class):
+        self.model = form_class._meta.model
+        self.fields = form_class().fields
+
+    def __call__(self, data):
+        cleaned, errors = {}, {}
+        for name, field in self.fields.items():
+            try:
+                cleaned[name] = field.clean(data.get(name))
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        if errors:
+            return None, errors
+        instance = self.model(**cleaned)
+        # Like ModelForm, leave empty optional fields to the model's clean().
+        exclude = [name for name, field in self.fields.items()
+                   if not field.required and cleaned[name] in field.empty_values]
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+        except ValidationError as exc:
+            return None, exc.message_dict
+        return instance, None
+
+
+class PolygonField(forms.Field):
+    """Room outline typed as ``x y; x y; ...`` (or sent as a list of pairs)."""
+    widget = forms.Textarea
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return [list(point) for point in geometry.parse_polygon(value)]
+        except ValueError as exc:
+            raise ValidationError(str(exc), code='invalid')
+
+    def prepare_value(self, value):
+        if isinstance(value, list):
+            return '; '.join(f'{x:g} {y:g}' for x, y in value)
+        return value
 
 
 class RoomForm(forms.ModelForm):
+    polygon = PolygonField(
+        required=False,
+        help_text='Corners in meters, e.g. "0 0; 5 0; 5 2; 3 2; 3 4; 0 4". '
+                  'Leave empty for a rectangle; with an outline, length and width are optional.',
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+    )
+
     class Meta:
         model = Room
-        fields = ['name', 'length', 'width', 'quantity', 'room_type']
+        fields = ['name', 'length', 'width', 'quantity', 'room_type', 'polygon']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'length': forms.NumberInput(attrs={'class': 'form-control'}),
@@ -19,12 +111,30 @@ class RoomForm(forms.ModelForm):
         }
 
 
+class RoomImportForm(forms.Form):
+    FORMATS = [('', 'From the file extension'), ('csv', 'CSV'), ('json', 'JSON'), ('jsonl', 'JSON lines')]
+
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control'}))
+    format = forms.ChoiceField(
+        choices=FORMATS, required=False, widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    unit_template = forms.ModelChoiceField(
+        queryset=UnitTemplate.objects.all(), required=False,
+        help_text='Add the rooms to this unit layout',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    skip_invalid = forms.BooleanField(
+        required=False, label='Import the valid rows when some are rejected',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+
 class TileForm(forms.ModelForm):
     class Meta:
         model = Tile
         fields = [
             'name', 'length', 'width', 'pieces_per_box',
-            'price_per_box', 'waste_percentage'
+            'price_per_box', 'waste_percentage', 'joint_width', 'orientation'
         ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
@@ -33,10 +143,15 @@ class TileForm(forms.ModelForm):
             'pieces_per_box': forms.NumberInput(attrs={'class': 'form-control'}),
             'price_per_box': forms.NumberInput(attrs={'class': 'form-control'}),
             'waste_percentage': forms.NumberInput(attrs={'class': 'form-control'}),
+            'joint_width': forms.NumberInput(attrs={'class': 'form-control'}),
+            'orientation': forms.Select(attrs={'class': 'form-control'}),
         }
 
 
-class TileCalculationForm(forms.ModelForm):
+class TileCalculationForm(RecalculatedForm):
+    material_field = 'tile'
+    result_fields = ('total_boxes', 'total_pieces', 'total_cost')
+
     class Meta:
         model = TileCalculation
         fields = [
@@ -58,17 +173,6 @@ class TileCalculationForm(forms.ModelForm):
             'waste_percentage': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if 'room' in self.data and 'tile' in self.data:
-            room = Room.objects.get(pk=self.data['room'])
-            tile = Tile.objects.get(pk=self.data['tile'])
-            result = tile.calculate_requirements(room)
-            self.initial['total_boxes'] = result['total_boxes']
-            self.initial['total_pieces'] = result['total_pieces']
-            self.initial['total_cost'] = result['total_cost']
-            self.initial['waste_percentage'] = tile.waste_percentage
-
 
 class PlywoodForm(forms.ModelForm):
     class Meta:
@@ -83,7 +187,10 @@ class PlywoodForm(forms.ModelForm):
         }
 
 
-class PlywoodCalculationForm(forms.ModelForm):
+class PlywoodCalculationForm(RecalculatedForm):
+    material_field = 'plywood'
+    result_fields = ('total_sheets', 'total_cost')
+
     class Meta:
         model = PlywoodCalculation
         fields = ['room', 'plywood', 'total_sheets', 'total_cost', 'waste_percentage']
@@ -99,16 +206,6 @@ class PlywoodCalculationForm(forms.ModelForm):
             'waste_percentage': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if 'room' in self.data and 'plywood' in self.data:
-            room = Room.objects.get(pk=self.data['room'])
-            plywood = Plywood.objects.get(pk=self.data['plywood'])
-            result = plywood.calculate_requirements(room)
-            self.initial['total_sheets'] = result['total_sheets']
-            self.initial['total_cost'] = result['total_cost']
-            self.initial['waste_percentage'] = plywood.waste_percentage
-
 
 class ElectricComponentForm(forms.ModelForm):
     class Meta:
@@ -123,7 +220,10 @@ class ElectricComponentForm(forms.ModelForm):
         }
 
 
-class ElectricalCalculationForm(forms.ModelForm):
+class ElectricalCalculationForm(RecalculatedForm):
+    material_field = 'component'
+    result_fields = ('quantity', 'total_cost')
+
     class Meta:
         model = ElectricalCalculation
         fields = ['room', 'component', 'quantity', 'total_cost']
@@ -138,11 +238,118 @@ class ElectricalCalculationForm(forms.ModelForm):
             ),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if 'room' in self.data and 'component' in self.data:
-            room = Room.objects.get(pk=self.data['room'])
-            component = ElectricComponent.objects.get(pk=self.data['component'])
-            result = component.calculate_requirements(room)
-            self.initial['quantity'] = result['quantity']
-            self.initial['total_cost'] = result['total_cost'] 
\ No newline at end of file
+
+class PrimaryKeyMultipleChoiceField(forms.ModelMultipleChoiceField):
+    # The stock field builds a queryset per submitted value just to validate
+    # it; converting the keys directly keeps long selections cheap.
+    def _check_values(self, value):
+        pk_field = self.queryset.model._meta.pk
+        keys = set()
+        for pk in value:
+            try:
+                keys.add(pk_field.to_python(pk))
+            except ValidationError:
+                raise ValidationError(
+                    self.error_messages['invalid_pk_value'],
+                    code='invalid_pk_value',
+                    params={'pk': pk},
+                )
+        qs = self.queryset.filter(pk__in=keys)
+        missing = keys - {obj.pk for obj in qs}
+        if missing:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': sorted(missing)[0]},
+            )
+        return qs
+
+
+class HouseEstimateForm(forms.Form):
+    rooms = PrimaryKeyMultipleChoiceField(
+        queryset=Room.objects.all(),
+        widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 10}),
+    )
+    tile = forms.ModelChoiceField(
+        queryset=Tile.objects.all(), required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    plywood = forms.ModelChoiceField(
+        queryset=Plywood.objects.all(), required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    components = PrimaryKeyMultipleChoiceField(
+        queryset=ElectricComponent.objects.all(), required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-control'}),
+    )
+    optimize_plywood = forms.BooleanField(
+        required=False, label='Optimize plywood cutting across rooms',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+class BuildingEstimateForm(forms.Form):
+    building = forms.ModelChoiceField(
+        queryset=Building.objects.all(),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    tile = forms.ModelChoiceField(
+        queryset=Tile.objects.all(), required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    plywood = forms.ModelChoiceField(
+        queryset=Plywood.objects.all(), required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    components = PrimaryKeyMultipleChoiceField(
+        queryset=ElectricComponent.objects.all(), required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-control'}),
+    )
+
+
+class MaterialSearchForm(forms.Form):
+    KINDS = [('tile', 'Tiles'), ('plywood', 'Plywood')]
+
+    rooms = PrimaryKeyMultipleChoiceField(
+        queryset=Room.objects.all(),
+        widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 10}),
+    )
+    kind = forms.ChoiceField(choices=KINDS, widget=forms.Select(attrs={'class': 'form-control'}))
+    min_length = forms.FloatField(
+        required=False, min_value=0, help_text='Tiles in cm, plywood in m',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    max_length = forms.FloatField(
+        required=False, min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    min_width = forms.FloatField(
+        required=False, min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    max_width = forms.FloatField(
+        required=False, min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    max_price = forms.DecimalField(
+        required=False, min_value=0, decimal_places=2, help_text='Per box or per sheet',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    min_pieces_per_box = forms.IntegerField(
+        required=False, min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    max_pieces_per_box = forms.IntegerField(
+        required=False, min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    limit = forms.IntegerField(
+        initial=10, min_value=1, max_value=100, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+
+    def filters(self):
+        data = self.cleaned_data
+        names = ['min_length', 'max_length', 'min_width', 'max_width', 'max_price']
+        if data['kind'] == 'tile':
+            names += ['min_pieces_per_box', 'max_pieces_per_box']
+        return {name: data[name] for name in names}
@@ -0,0 +1,82 @@
+"""Floor geometry of rooms.
+
+A room is either a rectangle (``length`` x ``width``) or an outline of
+corners in metres. Area and perimeter are worked out here once, when the
+room is cleaned or saved, and stored on the room; the estimators read the
+stored values. The tile layout and cutting plans need a rectangle: for an
+outline they work on the one with the same area and perimeter
+(``layout_dimensions``), while the room keeps the length and width it was
+given, if any.
+
+Corners are rounded to the millimetre first, like every other length the
+estimators use, so the shoelace area is an exact number of mm².
+"""
+import math
+
+# Lengths are kept to the millimetre, like the estimation engine.
+PRECISION = 3
+
+
+def parse_polygon(value):
+    """Corners as ``[(x, y), ...]`` from a list of pairs or ``"x y; x y; ..."``."""
+    if isinstance(value, str):
+        value = [point.replace(',', ' ').split() for point in value.split(';') if point.strip()]
+    try:
+        points = [(float(x), float(y)) for x, y in value]
+    except (TypeError, ValueError):
+        raise ValueError('Expected a list of [x, y] corners.')
+    if not all(math.isfinite(coordinate) for point in points for coordinate in point):
+        raise ValueError('Corners must be finite numbers.')
+    points = [(round(x, PRECISION), round(y, PRECISION)) for x, y in points]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if len(points) < 3:
+        raise ValueError('A polygon needs at least three corners.')
+    return points
+
+
+def polygon_metrics(points):
+    """Area (m², shoelace formula) and perimeter (m) of a simple polygon."""
+    corners = [(round(x * 1000), round(y * 1000)) for x, y in points]
+    twice_area = 0
+    perimeter = 0.0
+    for (x1, y1), (x2, y2) in zip(corners, corners[1:] + corners[:1]):
+        twice_area += x1 * y2 - x2 * y1
+        perimeter += math.hypot(x2 - x1, y2 - y1)
+    return abs(twice_area) / 2 / 1e6, round(perimeter) / 1000
+
+
+def rectangle_metrics(length, width):
+    """Area (m²) and perimeter (m) of a ``length`` x ``width`` rectangle."""
+    length, width = round(length * 1000), round(width * 1000)
+    return length * width / 1e6, 2 * (length + width) / 1000
+
+
+def equivalent_rectangle(area, perimeter):
+    """``(length, width)`` with the given area and, where possible, perimeter.
+
+    Outlines too compact for such a rectangle (a hexagon, say) get the
+    square of the same area.
+    """
+    half = perimeter / 2
+    discriminant = half * half - 4 * area
+    if discriminant < 0:
+        side = math.sqrt(area)
+        return round(side, PRECISION), round(side, PRECISION)
+    length = (half + math.sqrt(discriminant)) / 2
+    width = area / length if length else 0.0
+    return round(length, PRECISION), round(width, PRECISION)
+
+
+def layout_dimensions(room):
+    """``(length, width)`` in metres that tiles and panels are laid out over.
+
+    A rectangle's own dimensions; for an outlined room, the rectangle with
+    the outline's area and perimeter, whatever length and width it has.
+    """
+    if not getattr(room, 'polygon', None):
+        return room.length, room.width
+    area, perimeter = room.floor_area, room.floor_perimeter
+    if area is None or perimeter is None:
+        area, perimeter = polygon_metrics(parse_polygon(room.polygon))
+    return equivalent_rectangle(area, perimeter)
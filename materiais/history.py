@@ -0,0 +1,133 @@
+"""Content-addressed calculation history.
+
+Every calculation row carries ``input_hash``, a SHA-1 of the inputs that
+determine its result: the room dimensions and type, the material
+attributes (``result_cache.INPUT_FIELDS``), the waste percentage of the
+calculation and, for electrical rows, the wiring rule for the room and
+component type. Submitting the same calculation again reuses the stored
+row instead of inserting a new one, and ``compact_calculations`` merges
+duplicates left over from before.
+
+Rows saved before hashing get a hash when compacted: the inputs hash if
+the stored result still matches what the current inputs give, otherwise
+a hash of the stored values whose first character is ``LEGACY`` (never a
+hex digit), so old results are never attributed to inputs that did not
+produce them.
+"""
+import hashlib
+from decimal import Decimal
+
+from .estimation import to_cents
+from .models import ElectricalCalculation, PlywoodCalculation, TileCalculation
+from .result_cache import INPUT_FIELDS
+
+# kind: (model, material field, stored result fields)
+CALCULATIONS = {
+    'tile': (TileCalculation, 'tile', ('total_boxes', 'total_pieces', 'total_cost', 'waste_percentage')),
+    'plywood': (PlywoodCalculation, 'plywood', ('total_sheets', 'total_cost', 'waste_percentage')),
+    'electrical': (ElectricalCalculation, 'component', ('quantity', 'total_cost')),
+}
+
+LEGACY = 'L'
+
+# Inputs added after rows were first hashed only count when they are set,
+# so a rectangular room keeps the hash it had before outlines existed.
+ADDED_INPUTS = {'room': ('polygon',)}
+
+
+def _canonical(value):
+    # Prices compare by cents, so '1.5' and '1.50' hash alike.
+    if isinstance(value, Decimal):
+        return to_cents(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _fields(instance, fields):
+    return tuple(_canonical(getattr(instance, field)) for field in fields)
+
+
+def kind_of(calculation):
+    for kind, (model, _, _) in CALCULATIONS.items():
+        if isinstance(calculation, model):
+            return kind
+    raise TypeError(f'Not a calculation: {calculation!r}')
+
+
+def material_of(calculation):
+    return getattr(calculation, CALCULATIONS[kind_of(calculation)][1])
+
+
+class Hasher:
+    """Computes input hashes, remembering the room and material parts.
+
+    ``rules`` defaults to the current wiring rule table and is only used
+    for electrical calculations.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules
+        self._parts = {}
+
+    def _part(self, instance):
+        key = (type(instance), instance.pk, id(instance) if instance.pk is None else None)
+        if key not in self._parts:
+            name = instance._meta.model_name
+            added = ADDED_INPUTS.get(name, ())
+            fields = [field for field in INPUT_FIELDS[name]
+                      if field not in added or getattr(instance, field) is not None]
+            self._parts[key] = _fields(instance, fields)
+        return self._parts[key]
+
+    def _rule(self, room, component):
+        from . import wiring
+        if self.rules is None:
+            self.rules = wiring.rule_table()
+        rule = wiring.lookup(self.rules, [room.room_type], [component.component_type])
+        return tuple(_canonical(float(values[0])) for _, values in sorted(rule.items()))
+
+    def inputs(self, kind, room, material, waste_percentage=None):
+        """Hash for a ``kind`` calculation of ``material`` over ``room``."""
+        payload = (
+            kind, self._part(room), self._part(material), _canonical(waste_percentage),
+            self._rule(room, material) if kind == 'electrical' else None,
+        )
+        return hashlib.sha1(repr(payload).encode()).hexdigest()
+
+    def __call__(self, calculation):
+        return self.inputs(
+            kind_of(calculation), calculation.room, material_of(calculation),
+            getattr(calculation, 'waste_percentage', None),
+        )
+
+
+def input_hash(calculation, rules=None):
+    return Hasher(rules)(calculation)
+
+
+def stored_hash(calculation):
+    """Hash of a row's stored result, for rows whose inputs are unknown."""
+    kind = kind_of(calculation)
+    payload = (kind, _fields(calculation, CALCULATIONS[kind][2]))
+    return LEGACY + hashlib.sha1(repr(payload).encode()).hexdigest()[1:]
+
+
+def stamp(calculations, rules=None):
+    """Fill ``input_hash`` on calculations that do not have one yet."""
+    hasher = Hasher(rules)
+    for calculation in calculations:
+        if not calculation.input_hash:
+            calculation.input_hash = hasher(calculation)
+    return calculations
+
+
+def existing(calculation):
+    """The stored row for the same room, material and inputs, if any."""
+    model, material_field, _ = CALCULATIONS[kind_of(calculation)]
+    stamp([calculation])
+    return model.objects.filter(
+        room_id=calculation.room_id,
+        **{f'{material_field}_id': getattr(calculation, f'{material_field}_id')},
+        input_hash=calculation.input_hash,
+    ).order_by('pk').first()
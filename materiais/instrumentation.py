@@ -0,0 +1,285 @@
+"""Opt-in request instrumentation.
+
+``InstrumentationMiddleware`` records, per view, a latency histogram, the
+number and total time of database queries and the time spent in code
+wrapped with ``timed`` (``calculate_requirements``). Estimate cache hits
+and misses come from ``result_cache``. ``render`` formats everything in the
+Prometheus text format, served at ``/metrics/`` to staff users and to
+scrapers sending ``METRICS_TOKEN`` as a bearer token.
+
+A sampled fraction of requests can run under cProfile; the profile is
+written to ``PROFILE_DIR`` only if the request turned out slower than
+``PROFILE_SLOWER_THAN_MS``. Under ASGI the middleware runs async, so
+async views are not pushed to a thread; a profile then covers only the
+event loop thread.
+
+Everything is configured by ``settings.INSTRUMENTATION``. When it is not
+enabled the middleware removes itself from the stack at startup and
+``timed`` costs one context variable lookup per call. Metrics are kept per
+process, like the local-memory caches.
+"""
+import cProfile
+import functools
+import hmac
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+DEFAULTS = {
+    'ENABLED': False,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_SLOWER_THAN_MS': 500,
+    'PROFILE_DIR': 'profiles',
+    'METRICS_TOKEN': '',
+}
+
+# Upper bounds (seconds) of the request latency histogram.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request = ContextVar('instrumented_request', default=None)
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+def enabled():
+    return bool(config()['ENABLED'])
+
+
+def can_read_metrics(request):
+    """Staff users, or a request with ``Authorization: Bearer <METRICS_TOKEN>``."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = config()['METRICS_TOKEN']
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        supplied.strip().encode(), token.encode(),
+    )
+
+
+class _RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.sections = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper (see ``connection.execute_wrapper``).
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+
+class Registry:
+    """Process-wide counters and histograms, labelled by view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.latency = defaultdict(lambda: [[0] * len(BUCKETS), 0.0, 0])
+            self.queries = defaultdict(int)
+            self.query_seconds = defaultdict(float)
+            self.section_calls = defaultdict(int)
+            self.section_seconds = defaultdict(float)
+            self.profiles = 0
+
+    def record(self, view, method, status, seconds, metrics):
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            buckets, _, _ = histogram = self.latency[(view,)]
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            self.queries[(view,)] += metrics.queries
+            self.query_seconds[(view,)] += metrics.query_seconds
+            for section, (calls, section_seconds) in metrics.sections.items():
+                self.section_calls[(view, section)] += calls
+                self.section_seconds[(view, section)] += section_seconds
+
+
+registry = Registry()
+
+
+def timed(section):
+    """Add the wrapped function's calls and time to the current request's ``section``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _request.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                totals = metrics.sections[section]
+                totals[0] += 1
+                totals[1] += time.perf_counter() - started
+        return wrapper
+    return decorator
+
+
+class InstrumentationMiddleware:
+    """Times each request and collects its query and section metrics."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = config()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = options['PROFILE_SAMPLE_RATE']
+        self.slower_than = options['PROFILE_SLOWER_THAN_MS'] / 1000
+        self.profile_dir = Path(settings.BASE_DIR, options['PROFILE_DIR'])
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = _RequestMetrics()
+        token = _request.set(metrics)
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self._wrap_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            _request.reset(token)
+        self._record(request, response, elapsed, metrics, profiler)
+        return response
+
+    async def __acall__(self, request):
+        metrics = _RequestMetrics()
+        token = _request.set(metrics)
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        # Connections are per thread: wrap those of the thread the
+        # request's sync code and ORM calls run in.
+        stack = ExitStack()
+        try:
+            await sync_to_async(self._wrap_queries)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            _request.reset(token)
+        self._record(request, response, elapsed, metrics, profiler)
+        return response
+
+    def _wrap_queries(self, stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def _record(self, request, response, elapsed, metrics, profiler):
+        view = _view_name(request)
+        registry.record(view, request.method, response.status_code, elapsed, metrics)
+        if profiler is not None and elapsed >= self.slower_than:
+            self._dump(profiler, view, elapsed)
+
+    def _start_profiler(self):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread.
+            return None
+        return profiler
+
+    def _dump(self, profiler, view, elapsed):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r'[^\w.-]', '_', view)
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S.%f')
+        profiler.dump_stats(self.profile_dir / f'{stamp}-{name}-{elapsed * 1000:.0f}ms.prof')
+        with registry._lock:
+            registry.profiles += 1
+
+
+def _view_name(request):
+    # URL names rather than paths keep the label set small.
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def _metric(lines, name, kind, help_text, samples, labels):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for key, value in sorted(samples.items()):
+        lines.append(f'{name}{_labels(labels, key)} {value}')
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    from . import result_cache
+    lines = []
+    with registry._lock:
+        _metric(lines, 'http_requests_total', 'counter', 'Requests by view, method and status.',
+                registry.requests, ('view', 'method', 'status'))
+        lines.append('# HELP http_request_duration_seconds Request latency by view.')
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        for (view,), (buckets, total, count) in sorted(registry.latency.items()):
+            for bound, observed in zip(BUCKETS, buckets):
+                lines.append(f'http_request_duration_seconds_bucket{_labels(("view", "le"), (view, bound))} {observed}')
+            lines.append(f'http_request_duration_seconds_bucket{_labels(("view", "le"), (view, "+Inf"))} {count}')
+            lines.append(f'http_request_duration_seconds_sum{_labels(("view",), (view,))} {total}')
+            lines.append(f'http_request_duration_seconds_count{_labels(("view",), (view,))} {count}')
+        _metric(lines, 'db_queries_total', 'counter', 'Database queries by view.',
+                registry.queries, ('view',))
+        _metric(lines, 'db_query_seconds_total', 'counter', 'Time spent in database queries by view.',
+                registry.query_seconds, ('view',))
+        _metric(lines, 'section_calls_total', 'counter', 'Calls of timed code sections by view.',
+                registry.section_calls, ('view', 'section'))
+        _metric(lines, 'section_seconds_total', 'counter', 'Time spent in timed code sections by view.',
+                registry.section_seconds, ('view', 'section'))
+        _metric(lines, 'profiles_written_total', 'counter', 'cProfile dumps of slow requests.',
+                {(): registry.profiles}, ())
+    stats = result_cache.stats()
+    _metric(lines, 'estimate_cache_hits_total', 'counter', 'Memoized requirement results served from cache.',
+            {(): stats['hits']}, ())
+    _metric(lines, 'estimate_cache_misses_total', 'counter', 'Requirement results computed on a cache miss.',
+            {(): stats['misses']}, ())
+    return '\n'.join(lines) + '\n'
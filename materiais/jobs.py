@@ -0,0 +1,247 @@
+"""Database-backed queue for large estimate jobs.
+
+A job prices a set of stored rooms against chosen tiles, plywoods and
+components. ``submit`` splits the rooms into chunks sized so each one is
+roughly ``TARGET_PAIRS`` room x material pairs; workers (see the
+``run_estimate_workers`` command) claim chunks with a conditional UPDATE,
+so any number of processes can share the queue without a broker or row
+locks; ``worker_pool`` starts such processes. Each chunk is priced with the batch engine and its calculation rows
+are written with ``bulk_create`` in the same transaction that marks the
+chunk done; results already stored for the same inputs (see ``history``)
+are skipped. A chunk whose worker died is reclaimed after ``STALE_AFTER``.
+"""
+import math
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import history, wiring
+from .estimation import cents_to_decimal, requirement_matrices
+from .models import (
+    ElectricComponent, ElectricalCalculation, EstimateChunk, EstimateJob,
+    Plywood, PlywoodCalculation, Room, Tile, TileCalculation,
+)
+
+TARGET_PAIRS = 20000
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)
+BATCH_SIZE = 1000
+
+
+def _chunk_rooms(material_count, chunk_size=None):
+    if chunk_size:
+        return chunk_size
+    return max(1, TARGET_PAIRS // max(1, material_count))
+
+
+def submit(room_ids, tile_ids=(), plywood_ids=(), component_ids=(), chunk_size=None):
+    """Queue an estimate job and return it.
+
+    ``chunk_size`` is the number of rooms per chunk; by default it is
+    derived from the number of materials.
+    """
+    room_ids, tile_ids = list(room_ids), list(tile_ids)
+    plywood_ids, component_ids = list(plywood_ids), list(component_ids)
+    size = _chunk_rooms(len(tile_ids) + len(plywood_ids) + len(component_ids), chunk_size)
+    with transaction.atomic():
+        job = EstimateJob.objects.create(
+            tile_ids=tile_ids,
+            plywood_ids=plywood_ids,
+            component_ids=component_ids,
+            room_count=len(room_ids),
+            total_chunks=math.ceil(len(room_ids) / size),
+        )
+        EstimateChunk.objects.bulk_create(
+            [
+                EstimateChunk(job=job, room_ids=room_ids[start:start + size])
+                for start in range(0, len(room_ids), size)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        if not room_ids:
+            job.status = 'done'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+    return job
+
+
+def _claimable(now):
+    return Q(status='pending') | Q(status='running', claimed_at__lt=now - STALE_AFTER)
+
+
+def claim():
+    """Claim the oldest available chunk, or return ``None``."""
+    now = timezone.now()
+    candidates = list(
+        EstimateChunk.objects.filter(_claimable(now)).order_by('pk').values_list('pk', flat=True)[:20]
+    )
+    for pk in candidates:
+        # Only one worker's UPDATE can match a still-claimable row.
+        claimed = EstimateChunk.objects.filter(_claimable(now), pk=pk).update(
+            status='running', claimed_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            chunk = EstimateChunk.objects.select_related('job').get(pk=pk)
+            EstimateJob.objects.filter(pk=chunk.job_id, status='pending').update(status='running')
+            return chunk
+    return None
+
+
+def _by_ids(model, ids):
+    return list(model.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _calculations(rooms, tiles, plywoods, components, matrices):
+    if tiles:
+        result = matrices['tile']
+        for i, room in enumerate(rooms):
+            for j, tile in enumerate(tiles):
+                yield TileCalculation(
+                    room=room,
+                    tile=tile,
+                    total_boxes=int(result['total_boxes'][i, j]),
+                    total_pieces=int(result['total_pieces'][i, j]),
+                    total_cost=cents_to_decimal(result['total_cost_cents'][i, j]),
+                    waste_percentage=tile.waste_percentage,
+                )
+    if plywoods:
+        result = matrices['plywood']
+        for i, room in enumerate(rooms):
+            for j, plywood in enumerate(plywoods):
+                yield PlywoodCalculation(
+                    room=room,
+                    plywood=plywood,
+                    total_sheets=int(result['total_sheets'][i, j]),
+                    total_cost=cents_to_decimal(result['total_cost_cents'][i, j]),
+                    waste_percentage=plywood.waste_percentage,
+                )
+    if components:
+        result = matrices['electrical']
+        for i, room in enumerate(rooms):
+            for j, component in enumerate(components):
+                yield ElectricalCalculation(
+                    room=room,
+                    component=component,
+                    quantity=float(result['quantity'][i, j]),
+                    total_cost=cents_to_decimal(result['total_cost_cents'][i, j]),
+                )
+
+
+def run(chunk):
+    """Price one claimed chunk and persist its calculations.
+
+    Returns ``False`` if the chunk was reclaimed by another worker in the
+    meantime, in which case nothing is written.
+    """
+    job = chunk.job
+    # Rooms deleted since submission are skipped.
+    rooms = _by_ids(Room, chunk.room_ids)
+    tiles = _by_ids(Tile, job.tile_ids)
+    plywoods = _by_ids(Plywood, job.plywood_ids)
+    components = _by_ids(ElectricComponent, job.component_ids)
+    # Workers are long-lived, so always price with the current rules.
+    rules = wiring.load_rule_table() if components else None
+    matrices = requirement_matrices(rooms, tiles, plywoods, components, rules)
+
+    by_model = {}
+    hasher = history.Hasher(rules)
+    for calculation in _calculations(rooms, tiles, plywoods, components, matrices):
+        calculation.input_hash = hasher(calculation)
+        by_model.setdefault(type(calculation), []).append(calculation)
+    room_ids = [room.pk for room in rooms]
+    for model, objects in by_model.items():
+        # Results already stored for the same inputs are not written again.
+        material_field = history.CALCULATIONS[history.kind_of(objects[0])][1] + '_id'
+        stored = set(model.objects.filter(
+            room_id__in=room_ids,
+            **{f'{material_field}__in': {getattr(obj, material_field) for obj in objects}},
+        ).values_list('room_id', material_field, 'input_hash'))
+        by_model[model] = [
+            obj for obj in objects
+            if (obj.room_id, getattr(obj, material_field), obj.input_hash) not in stored
+        ]
+    with transaction.atomic():
+        finished = EstimateChunk.objects.filter(
+            pk=chunk.pk, status='running', claimed_at=chunk.claimed_at,
+        ).update(status='done', finished_at=timezone.now())
+        if not finished:
+            return False
+        for model, objects in by_model.items():
+            model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    if not EstimateChunk.objects.filter(job=job).exclude(status='done').exists():
+        EstimateJob.objects.filter(pk=job.pk, status='running').update(
+            status='done', finished_at=timezone.now(),
+        )
+    return True
+
+
+def fail(chunk, error):
+    """Put a chunk back on the queue, or fail it and its job after ``MAX_ATTEMPTS``."""
+    if chunk.attempts < MAX_ATTEMPTS:
+        EstimateChunk.objects.filter(pk=chunk.pk, status='running').update(status='pending', error=error)
+        return
+    now = timezone.now()
+    EstimateChunk.objects.filter(pk=chunk.pk).update(status='failed', error=error, finished_at=now)
+    EstimateJob.objects.filter(pk=chunk.job_id).update(status='failed', error=error, finished_at=now)
+
+
+def work(burst=False, poll_interval=1.0):
+    """Worker loop: claim and run chunks until the queue is empty (``burst``) or forever.
+
+    Returns the number of chunks completed.
+    """
+    completed = 0
+    while True:
+        chunk = claim()
+        if chunk is None:
+            if burst:
+                return completed
+            time.sleep(poll_interval)
+            continue
+        try:
+            completed += run(chunk)
+        except Exception:
+            fail(chunk, traceback.format_exc())
+
+
+def init_worker():
+    # A forked child must not reuse the parent's database connections.
+    connections.close_all()
+
+
+def worker_pool(workers):
+    """Process pool for queue workers and other concurrent database writers.
+
+    Children are forked from this set-up process: a spawned child would
+    import this module, and with it the models, before ``django.setup()``.
+    """
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, mp_context=multiprocessing.get_context('fork'),
+    )
+
+
+def progress(job):
+    """Status of a job and its chunks as a JSON-ready dict."""
+    counts = dict(job.chunks.values_list('status').annotate(count=Count('pk')))
+    done = counts.get('done', 0)
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'rooms': job.room_count,
+        'total_chunks': job.total_chunks,
+        'done_chunks': done,
+        'running_chunks': counts.get('running', 0),
+        'pending_chunks': counts.get('pending', 0),
+        'failed_chunks': counts.get('failed', 0),
+        'progress': done / job.total_chunks if job.total_chunks else 1.0,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,110 @@
+"""Tile layout engine.
+
+Lays tiles out on a rectangular room in a grid starting from one corner:
+full tiles with grout joints, one strip of cut pieces along the far length
+edge, one along the far width edge and a corner piece. Cut pieces are
+taken from as few tiles as possible (several narrow strips per tile) and
+spare strips are trimmed into corner pieces. Cuts are pooled across the
+``quantity`` copies of a room, so offcuts from one copy serve the next.
+
+``tile_layout_arrays`` works on broadcastable NumPy arrays for the batch
+estimation path; ``tile_layout`` is the memoized scalar version.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+ORIENTATIONS = [
+    ('auto', 'Best fit'),
+    ('lengthwise', 'Tile length along room length'),
+    ('crosswise', 'Tile length across room length'),
+]
+
+# Leftover gaps narrower than this (mm) are absorbed by the grout joints.
+GAP_TOLERANCE = 0.5
+
+TileLayout = namedtuple('TileLayout', ['full_pieces', 'cut_pieces', 'pieces', 'orientation'])
+
+
+def _axis(span, size, joint):
+    """Full tiles along one axis and the width of the remaining cut strip."""
+    full = np.floor((span + joint) / (size + joint) + 1e-9)
+    rest = span - full * (size + joint)
+    return full, np.where(rest > GAP_TOLERANCE, rest, 0.0)
+
+
+def _per_tile(size, rest):
+    """How many strips of width ``rest`` one tile of ``size`` yields."""
+    if np.any(size <= 0):
+        # A zero-sized tile yields no strips, and its cut tile count divides by zero.
+        raise ValueError('Tile length and width must be greater than zero.')
+    has_rest = rest > 0
+    return np.where(has_rest, np.floor(size / np.where(has_rest, rest, 1)), 1)
+
+
+def _grid(length, width, quantity, along, across, joint):
+    if np.any(along <= 0) or np.any(across <= 0):
+        raise ValueError('Tile length and width must be greater than zero.')
+    nx, rx = _axis(length, along, joint)
+    ny, ry = _axis(width, across, joint)
+    kx = _per_tile(along, rx)
+    ky = _per_tile(across, ry)
+
+    edge_x = np.where(rx > 0, ny, 0) * quantity
+    edge_y = np.where(ry > 0, nx, 0) * quantity
+    corners = np.where((rx > 0) & (ry > 0), quantity, 0)
+    tiles_x = np.ceil(edge_x / kx)
+    tiles_y = np.ceil(edge_y / ky)
+    spare = (tiles_x * kx - edge_x) + (tiles_y * ky - edge_y)
+    tiles_corner = np.ceil(np.maximum(corners - spare, 0) / (kx * ky))
+
+    full = nx * ny * quantity
+    return {
+        'full_pieces': full.astype(np.int64),
+        'cut_pieces': (edge_x + edge_y + corners).astype(np.int64),
+        'pieces': (full + tiles_x + tiles_y + tiles_corner).astype(np.int64),
+    }
+
+
+def tile_layout_arrays(room_length, room_width, quantity, tile_length, tile_width,
+                       joint_width=0.0, orientation='auto'):
+    """Vectorized layout.
+
+    Room dimensions are in metres, tile dimensions in centimetres and the
+    joint in millimetres, matching the model fields. All arguments are
+    broadcast together; ``orientation`` may be an array of strings.
+    """
+    length = np.asarray(room_length, dtype=np.float64) * 1000
+    width = np.asarray(room_width, dtype=np.float64) * 1000
+    quantity = np.asarray(quantity, dtype=np.int64)
+    tile_length = np.asarray(tile_length, dtype=np.float64) * 10
+    tile_width = np.asarray(tile_width, dtype=np.float64) * 10
+    joint = np.asarray(joint_width, dtype=np.float64)
+    orientation = np.asarray(orientation, dtype=str)
+
+    lengthwise = _grid(length, width, quantity, tile_length, tile_width, joint)
+    crosswise = _grid(length, width, quantity, tile_width, tile_length, joint)
+    use_crosswise = (orientation == 'crosswise') | (
+        (orientation == 'auto') & (crosswise['pieces'] < lengthwise['pieces'])
+    )
+    result = {
+        key: np.where(use_crosswise, crosswise[key], lengthwise[key])
+        for key in lengthwise
+    }
+    result['orientation'] = np.where(use_crosswise, 'crosswise', 'lengthwise')
+    return result
+
+
+@lru_cache(maxsize=16384)
+def tile_layout(room_length, room_width, quantity, tile_length, tile_width,
+                joint_width=0.0, orientation='auto'):
+    result = tile_layout_arrays(
+        room_length, room_width, quantity, tile_length, tile_width, joint_width, orientation
+    )
+    return TileLayout(
+        full_pieces=int(result['full_pieces']),
+        cut_pieces=int(result['cut_pieces']),
+        pieces=int(result['pieces']),
+        orientation=str(result['orientation']),
+    )
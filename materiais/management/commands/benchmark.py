@@ -0,0 +1,76 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from materiais import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Time estimation, forms, list views and admin changelists on a synthetic dataset'
+
+    def add_arguments(self, parser):
+        for name, default in benchmarks.SIZES.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f'Synthetic {name} (default: {default})')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed calls per case')
+        parser.add_argument('--only', nargs='+', metavar='PREFIX',
+                            help='Only cases whose name starts with a prefix, e.g. requirements view.tile_list')
+        parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results to compare against; regressions fail the command')
+        parser.add_argument('--tolerance', type=float, default=benchmarks.TOLERANCE,
+                            help='Allowed relative slowdown of the median time (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fp:
+                baseline = json.load(fp)['results']
+
+        # The dataset lives in a test database that is dropped afterwards.
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            sizes = benchmarks.build_dataset(
+                seed=options['seed'], **{name: options[name] for name in benchmarks.SIZES}
+            )
+            self.stderr.write(f'Built the dataset in {time.perf_counter() - started:.2f}s')
+            results = benchmarks.run(repeat=options['repeat'], only=options['only'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<36} {result['median_ms']:>10.2f} ms  {result['queries']:>4} queries  "
+                f"{result['peak_kib']:>10.1f} KiB"
+            )
+        if options['output']:
+            document = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'sizes': sizes,
+                    'seed': options['seed'],
+                    'repeat': options['repeat'],
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump(document, fp, indent=2)
+        if baseline is not None:
+            regressions = benchmarks.compare(results, baseline, options['tolerance'])
+            for name, message in regressions:
+                self.stderr.write(f'REGRESSION {name}: {message}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stderr.write(f'No regressions against {options["baseline"]}')
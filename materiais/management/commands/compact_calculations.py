@@ -0,0 +1,161 @@
+import math
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from materiais import estimation, history
+
+
+def _with_stored_waste(columns, calculations):
+    # A row may override the material's waste; price it with its own.
+    columns['waste_percentage'] = np.array([c.waste_percentage for c in calculations], dtype=np.float64)
+    return columns
+
+
+def _matches(kind, calculations):
+    """Which rows still hold the result their current inputs give.
+
+    The inputs are the room and material as they are now, with the waste
+    percentage stored on the row, as ``history.Hasher`` hashes them.
+    """
+    material_field = history.CALCULATIONS[kind][1]
+    rooms = [calculation.room for calculation in calculations]
+    materials = [getattr(calculation, material_field) for calculation in calculations]
+    if kind == 'tile':
+        tiles = _with_stored_waste(estimation.tile_columns(materials), calculations)
+        result = estimation.tile_pairs(rooms, tiles)
+        return [
+            c.total_boxes == result['total_boxes'][i] and c.total_pieces == result['total_pieces'][i]
+            and estimation.to_cents(c.total_cost) == result['total_cost_cents'][i]
+            for i, c in enumerate(calculations)
+        ]
+    if kind == 'plywood':
+        plywoods = _with_stored_waste(estimation.plywood_columns(materials), calculations)
+        result = estimation.plywood_pairs(rooms, plywoods)
+        return [
+            c.total_sheets == result['total_sheets'][i]
+            and estimation.to_cents(c.total_cost) == result['total_cost_cents'][i]
+            for i, c in enumerate(calculations)
+        ]
+    result = estimation.electrical_pairs(rooms, materials)
+    return [
+        math.isclose(c.quantity, result['quantity'][i], abs_tol=1e-6)
+        and estimation.to_cents(c.total_cost) == result['total_cost_cents'][i]
+        for i, c in enumerate(calculations)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Hash, deduplicate and optionally prune stored calculations in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*',
+                            help=f"Calculation types to compact: {', '.join(sorted(history.CALCULATIONS))} (default: all)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prune-superseded', action='store_true',
+                            help='Also delete results for a room and material whose inputs have since changed')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count rows without changing anything (hashes are kept in memory)')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        unknown = set(options['kinds']) - set(history.CALCULATIONS)
+        if unknown:
+            raise CommandError(f"Unknown calculation type(s): {', '.join(sorted(unknown))}")
+        for kind in options['kinds'] or sorted(history.CALCULATIONS):
+            started = time.perf_counter()
+            hashed, pending = self.backfill(kind)
+            if self.dry_run:
+                duplicates, superseded = self.count_removable(kind, pending)
+                if not options['prune_superseded']:
+                    superseded = 0
+            else:
+                duplicates = self.delete_where(kind, self.duplicate_of_earlier(kind))
+                superseded = (
+                    self.delete_where(kind, self.superseded_by_later(kind)) if options['prune_superseded'] else 0
+                )
+            verb = 'would remove' if self.dry_run else 'removed'
+            self.stdout.write(
+                f'{kind}: hashed {hashed} rows, {verb} {duplicates} duplicates and {superseded} '
+                f'superseded rows in {time.perf_counter() - started:.2f}s'
+            )
+
+    def _batches(self, queryset):
+        """Yield primary keys in ascending batches; each batch is handled on its own."""
+        last = 0
+        while True:
+            pks = list(queryset.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            yield pks
+            last = pks[-1]
+
+    def backfill(self, kind):
+        """Hash unhashed rows; returns the count and, on a dry run, the hashes by pk."""
+        model, material_field, _ = history.CALCULATIONS[kind]
+        hasher = history.Hasher()
+        count = 0
+        pending = {}
+        for pks in self._batches(model.objects.filter(input_hash='')):
+            calculations = list(model.objects.filter(pk__in=pks).select_related('room', material_field))
+            for calculation, current in zip(calculations, _matches(kind, calculations)):
+                calculation.input_hash = hasher(calculation) if current else history.stored_hash(calculation)
+            count += len(calculations)
+            if self.dry_run:
+                pending.update((calculation.pk, calculation.input_hash) for calculation in calculations)
+            else:
+                model.objects.bulk_update(calculations, ['input_hash'], batch_size=1000)
+        return count, pending
+
+    def count_removable(self, kind, pending):
+        """Duplicates and superseded rows a real run would delete, for a dry run.
+
+        ``pending`` holds the hashes a real run would have written, which
+        the database does not have yet.
+        """
+        model, material_field, _ = history.CALCULATIONS[kind]
+        rows = model.objects.order_by('pk').values_list('pk', 'room_id', f'{material_field}_id', 'input_hash')
+        kept, pairs = set(), set()
+        duplicates = 0
+        for pk, room_id, material_id, input_hash in rows.iterator(chunk_size=self.batch_size):
+            key = (room_id, material_id, pending.get(pk, input_hash))
+            if key in kept:
+                duplicates += 1
+            else:
+                kept.add(key)
+                pairs.add(key[:2])
+        # Once deduplicated, every row but the last of its pair has a later,
+        # different result.
+        return duplicates, len(kept) - len(pairs)
+
+    def _same_pair(self, kind):
+        material_field = history.CALCULATIONS[kind][1]
+        return {'room': OuterRef('room'), material_field: OuterRef(material_field)}
+
+    def duplicate_of_earlier(self, kind):
+        model = history.CALCULATIONS[kind][0]
+        return Exists(model.objects.filter(
+            **self._same_pair(kind), input_hash=OuterRef('input_hash'), pk__lt=OuterRef('pk'),
+        ))
+
+    def superseded_by_later(self, kind):
+        model = history.CALCULATIONS[kind][0]
+        return Exists(model.objects.filter(**self._same_pair(kind), pk__gt=OuterRef('pk')).exclude(
+            input_hash=OuterRef('input_hash'),
+        ))
+
+    def delete_where(self, kind, condition):
+        model = history.CALCULATIONS[kind][0]
+        count = 0
+        # Walk the table by primary key so every DELETE is a short
+        # transaction over one range instead of a lock on the whole table.
+        for pks in self._batches(model.objects.all()):
+            doomed = model.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]).exclude(input_hash='').filter(condition)
+            with transaction.atomic():
+                count += model.objects.filter(pk__in=list(doomed.values_list('pk', flat=True))).delete()[0]
+        return count
@@ -0,0 +1,36 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from materiais import export
+
+
+class Command(BaseCommand):
+    help = 'Stream stored tile, plywood or electrical calculations to CSV or the columnar format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        started = time.perf_counter()
+        written = 0
+        if options['output']:
+            mode = 'w' if fmt == 'csv' else 'wb'
+            encoding = 'utf-8' if fmt == 'csv' else None
+            fp = open(options['output'], mode, encoding=encoding, newline='' if fmt == 'csv' else None)
+        else:
+            fp = sys.stdout if fmt == 'csv' else sys.stdout.buffer
+        try:
+            for chunk in export.chunks(options['kind'], fmt, options['chunk_size']):
+                fp.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                fp.close()
+        if options['output']:
+            self.stderr.write(f'Wrote {written} bytes in {time.perf_counter() - started:.2f}s')
@@ -0,0 +1,159 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from materiais import catalogue, repricing, result_cache
+from materiais.forms import ElectricComponentForm, PlywoodForm, RowValidator, TileForm
+
+FORMS = {
+    'tile': TileForm,
+    'plywood': PlywoodForm,
+    'electric': ElectricComponentForm,
+}
+
+# Calculation kind that depends on each catalogue.
+CALCULATION_KINDS = {
+    'tile': 'tile',
+    'plywood': 'plywood',
+    'electric': 'electrical',
+}
+
+
+def read_rows(path, fmt):
+    """Yield (line_number, row) pairs without loading the file in memory."""
+    with open(path, newline='', encoding='utf-8') as fp:
+        if fmt == 'csv':
+            reader = csv.DictReader(fp)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(fp, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_number, exc
+                    continue
+                yield line_number, row
+
+
+class Command(BaseCommand):
+    help = 'Stream a tile, plywood or electrical catalogue from CSV or JSONL and upsert it by name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(FORMS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='File format (default: guessed from the extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--rejects', help='Write rejected rows with their errors to this JSONL file')
+        parser.add_argument('--no-recompute', action='store_true',
+                            help='Leave stored calculations of updated materials as they are')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        self.verbosity = options['verbosity']
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        form_class = FORMS[options['kind']]
+        model = form_class._meta.model
+        fields = list(form_class._meta.fields)
+        validate = RowValidator(form_class)
+        defaults = {
+            name: model._meta.get_field(name).get_default()
+            for name in fields if model._meta.get_field(name).has_default()
+        }
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0}
+        self.repriced = set()
+        started = time.perf_counter()
+        chunk = {}
+        try:
+            for line_number, row in read_rows(path, fmt):
+                if isinstance(row, Exception):
+                    self._reject(rejects, line_number, None, {'__all__': [str(row)]})
+                    counts['rejected'] += 1
+                    continue
+                if not isinstance(row, dict):
+                    self._reject(rejects, line_number, row, {'__all__': ['Expected an object.']})
+                    counts['rejected'] += 1
+                    continue
+                data = {**defaults, **{key: value for key, value in row.items() if value not in ('', None)}}
+                instance, errors = validate(data)
+                if errors:
+                    self._reject(rejects, line_number, row, errors)
+                    counts['rejected'] += 1
+                    continue
+                # Later rows with the same name win within a chunk.
+                chunk[instance.name] = instance
+                if len(chunk) >= options['chunk_size']:
+                    self._flush(model, fields, chunk, counts)
+                    chunk = {}
+            if chunk:
+                self._flush(model, fields, chunk, counts)
+        finally:
+            if rejects:
+                rejects.close()
+
+        elapsed = time.perf_counter() - started
+        processed = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} rows in {elapsed:.2f}s "
+            f"({processed / elapsed if elapsed else 0:.0f} rows/s): "
+            f"{counts['created']} created, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged, {counts['rejected']} rejected"
+        ))
+        if self.repriced and not options['no_recompute']:
+            started = time.perf_counter()
+            report = repricing.recompute_materials(CALCULATION_KINDS[options['kind']], self.repriced)
+            self.stdout.write(
+                f"Recomputed {report['changed']} of {report['rows']} dependent calculations "
+                f"in {time.perf_counter() - started:.2f}s (total cost {report['delta']:+})"
+            )
+
+    def _flush(self, model, fields, chunk, counts):
+        with transaction.atomic():
+            existing = {}
+            for obj in model.objects.filter(name__in=list(chunk)).order_by('pk'):
+                existing.setdefault(obj.name, obj)
+            to_create, to_update = [], []
+            for name, instance in chunk.items():
+                obj = existing.get(name)
+                if obj is None:
+                    to_create.append(instance)
+                    continue
+                # bulk_update() is costly per row, so skip rows that match.
+                if all(getattr(obj, field) == getattr(instance, field) for field in fields):
+                    counts['unchanged'] += 1
+                    continue
+                inputs = result_cache.INPUT_FIELDS[model._meta.model_name]
+                if any(getattr(obj, field) != getattr(instance, field) for field in inputs):
+                    self.repriced.add(obj.pk)
+                for field in fields:
+                    setattr(obj, field, getattr(instance, field))
+                to_update.append(obj)
+            model.objects.bulk_create(to_create)
+            model.objects.bulk_update(to_update, [field for field in fields if field != 'name'])
+        # bulk_create() and bulk_update() do not send post_save, so
+        # invalidate by hand.
+        for obj in to_update:
+            result_cache.invalidate(obj)
+        if to_create or to_update:
+            catalogue.bump_version()
+        counts['created'] += len(to_create)
+        counts['updated'] += len(to_update)
+        if self.verbosity >= 2:
+            self.stdout.write(f"  chunk: {len(to_create)} created, {len(to_update)} updated")
+
+    def _reject(self, rejects, line_number, row, errors):
+        if rejects:
+            rejects.write(json.dumps({'line': line_number, 'row': row, 'errors': errors}) + '\n')
+        else:
+            self.stderr.write(f'line {line_number}: {json.dumps(errors)}')
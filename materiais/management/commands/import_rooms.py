@@ -0,0 +1,58 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from materiais import floorplan
+from materiais.models import UnitTemplate
+
+
+class Command(BaseCommand):
+    help = 'Create rooms in bulk from a CSV, JSON or JSONL floor-plan file (rectangles or polygon outlines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=floorplan.FORMATS,
+                            help='File format (default: guessed from the extension)')
+        parser.add_argument('--unit-template', type=int, help='Add the rooms to the unit template with this id')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Create the valid rooms when some rows are rejected')
+        parser.add_argument('--batch-size', type=int, default=floorplan.BATCH_SIZE)
+        parser.add_argument('--rejects', help='Write rejected rows with their errors to this JSONL file')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        unit_template = None
+        if options['unit_template'] is not None:
+            unit_template = UnitTemplate.objects.filter(pk=options['unit_template']).first()
+            if unit_template is None:
+                raise CommandError(f"Unknown unit template {options['unit_template']}")
+        fmt = options['format'] or floorplan.guess_format(path.name)
+
+        started = time.perf_counter()
+        with open(path, newline='', encoding='utf-8-sig') as fp:
+            report = floorplan.intake(
+                floorplan.read_rows(fp, fmt), unit_template=unit_template,
+                skip_invalid=options['skip_invalid'], batch_size=options['batch_size'],
+            )
+        elapsed = time.perf_counter() - started
+
+        if options['rejects']:
+            with open(options['rejects'], 'w', encoding='utf-8') as rejects:
+                for line_number, errors in report['rejected']:
+                    rejects.write(json.dumps({'line': line_number, 'errors': errors}) + '\n')
+        else:
+            for line_number, errors in report['rejected']:
+                self.stderr.write(f'line {line_number}: {json.dumps(errors)}')
+
+        if report['rejected'] and not options['skip_invalid']:
+            raise CommandError(
+                f"{len(report['rejected'])} rows rejected, no rooms created "
+                f"(use --skip-invalid to create the valid ones)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} rooms in {elapsed:.2f}s, {len(report['rejected'])} rejected"
+        ))
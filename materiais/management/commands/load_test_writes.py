@@ -0,0 +1,113 @@
+import os
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from materiais.history import CALCULATIONS
+from materiais.jobs import worker_pool
+
+# Model holding the catalogue each calculation kind is priced from.
+MATERIALS = {'tile': 'Tile', 'plywood': 'Plywood', 'electrical': 'ElectricComponent'}
+
+
+def _create(kind, room, material):
+    """Save one calculation the way the calculation create views do."""
+    from materiais import history
+    from materiais.result_cache import cached_requirements
+
+    model, material_field, fields = CALCULATIONS[kind]
+    result = cached_requirements(material, room)
+    calculation = model(room=room, **{material_field: material})
+    for field in fields:
+        if field == 'waste_percentage':
+            calculation.waste_percentage = material.waste_percentage
+        else:
+            setattr(calculation, field, result[field])
+    if history.existing(calculation) is not None:
+        return False
+    calculation.save()
+    return True
+
+
+def _writer(kind, room_ids, material_ids, duration, seed):
+    from materiais import models
+    rng = random.Random(seed)
+    rooms = models.Room.objects.in_bulk(room_ids)
+    materials = getattr(models, MATERIALS[kind]).objects.in_bulk(material_ids)
+    latencies, reused, locked = [], 0, 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            created = _create(kind, rooms[rng.choice(room_ids)], materials[rng.choice(material_ids)])
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            locked += 1
+            continue
+        if created:
+            latencies.append(time.perf_counter() - started)
+        else:
+            reused += 1
+    return latencies, reused, locked
+
+
+class Command(BaseCommand):
+    help = 'Measure write throughput of concurrent calculation creation on the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(CALCULATIONS), default='tile')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Concurrent writer processes (default: one per CPU)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds each writer runs')
+        parser.add_argument('--rooms', type=int, default=50, help='Rooms to sample from')
+        parser.add_argument('--materials', type=int, default=200, help='Materials to sample from')
+        parser.add_argument('--keep', action='store_true', help='Keep the calculations written by the test')
+
+    def handle(self, *args, **options):
+        from materiais import models
+        kind = options['kind']
+        model = CALCULATIONS[kind][0]
+        room_ids = list(models.Room.objects.order_by('pk').values_list('pk', flat=True)[:options['rooms']])
+        material_ids = list(getattr(models, MATERIALS[kind]).objects.order_by('pk')
+                            .values_list('pk', flat=True)[:options['materials']])
+        if not room_ids or not material_ids:
+            raise CommandError(f'Needs at least one room and one {MATERIALS[kind]}')
+        last_pk = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+            backend = f'sqlite ({journal_mode})'
+        else:
+            backend = connection.vendor
+
+        workers = max(1, options['workers'])
+        started = time.perf_counter()
+        with worker_pool(workers) as pool:
+            futures = [
+                pool.submit(_writer, kind, room_ids, material_ids, options['duration'], seed)
+                for seed in range(workers)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for result in results for latency in result[0])
+        reused = sum(result[1] for result in results)
+        locked = sum(result[2] for result in results)
+        self.stdout.write(f'{backend}, {workers} writers, {elapsed:.1f}s')
+        self.stdout.write(
+            f'  {len(latencies)} calculations written ({len(latencies) / elapsed:.0f}/s), '
+            f'{reused} reused, {locked} "database is locked" errors'
+        )
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f'  latency p50 {quantiles[49] * 1000:.1f} ms, p95 {quantiles[94] * 1000:.1f} ms, '
+                f'p99 {quantiles[98] * 1000:.1f} ms'
+            )
+        if not options['keep']:
+            deleted = model.objects.filter(pk__gt=last_pk).delete()[0]
+            self.stdout.write(f'  removed {deleted} test calculations')
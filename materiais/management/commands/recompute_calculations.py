@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from materiais import history, repricing
+from materiais.models import Building, Room
+
+
+class Command(BaseCommand):
+    help = ('Recompute stored calculations after catalogue or room changes, reporting the cost delta per room '
+            'and per building')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*',
+                            help=f"Calculation types to recompute: {', '.join(sorted(history.CALCULATIONS))} (default: all)")
+        parser.add_argument('--materials', type=int, nargs='+', metavar='ID',
+                            help='Only calculations of these tiles, plywoods or components')
+        parser.add_argument('--rooms', type=int, nargs='+', metavar='ID', help='Only calculations of these rooms')
+        parser.add_argument('--batch-size', type=int, default=repricing.BATCH_SIZE)
+        parser.add_argument('--top', type=int, default=20, help='Rooms and buildings to list by cost delta')
+        parser.add_argument('--dry-run', action='store_true', help='Report the delta without writing anything')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(history.CALCULATIONS)
+        if unknown:
+            raise CommandError(f"Unknown calculation type(s): {', '.join(sorted(unknown))}")
+        rooms, buildings = {}, {}
+        total = 0
+        for kind in options['kinds'] or sorted(history.CALCULATIONS):
+            filters = {}
+            if options['rooms']:
+                filters['room_id__in'] = options['rooms']
+            if options['materials']:
+                filters[f'{history.CALCULATIONS[kind][1]}_id__in'] = options['materials']
+            started = time.perf_counter()
+            report = repricing.recompute(
+                kind, dry_run=options['dry_run'], batch_size=options['batch_size'], **filters
+            )
+            verb = 'would change' if options['dry_run'] else 'changed'
+            self.stdout.write(
+                f"{kind}: checked {report['rows']} rows, {verb} {report['changed']} "
+                f"(total cost {report['delta']:+}) in {time.perf_counter() - started:.2f}s"
+            )
+            total += report['delta']
+            for room_id, delta in report['rooms'].items():
+                rooms[room_id] = rooms.get(room_id, 0) + delta
+            for building_id, delta in report['buildings'].items():
+                buildings[building_id] = buildings.get(building_id, 0) + delta
+
+        self.stdout.write(f'Total cost delta: {total:+}')
+        self.write_top(Room, rooms, options['top'])
+        if buildings:
+            self.stdout.write('By building:')
+            self.write_top(Building, buildings, options['top'])
+
+    def write_top(self, model, deltas, count):
+        top = sorted(deltas.items(), key=lambda item: -abs(item[1]))[:count]
+        names = model.objects.in_bulk([pk for pk, _ in top])
+        for pk, delta in top:
+            name = names[pk].name if pk in names else f'#{pk}'
+            self.stdout.write(f'  {name}: {delta:+}')
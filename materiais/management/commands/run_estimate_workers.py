@@ -0,0 +1,31 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from materiais import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of worker processes that price queued estimate jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: one per CPU)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of polling for new jobs')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        started = time.perf_counter()
+        with jobs.worker_pool(workers) as pool:
+            futures = [
+                pool.submit(jobs.work, burst=options['burst'], poll_interval=options['poll_interval'])
+                for _ in range(workers)
+            ]
+            completed = sum(future.result() for future in futures)
+        self.stderr.write(
+            f'{workers} workers completed {completed} chunks in {time.perf_counter() - started:.2f}s'
+        )
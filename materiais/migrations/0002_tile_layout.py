@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tile',
+            name='joint_width',
+            field=models.FloatField(default=3, help_text='Grout joint in millimeters', validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='tile',
+            name='orientation',
+            field=models.CharField(choices=[('auto', 'Best fit'), ('lengthwise', 'Tile length along room length'), ('crosswise', 'Tile length across room length')], default='auto', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='tile',
+            name='waste_percentage',
+            field=models.FloatField(default=3, help_text='Extra percentage for breakage (cuts come from the layout)'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:44
+
+import django.core.validators
+from django.db import migrations, models
+
+
+# Cable runs (switch to ceiling + ceiling to light) that used to be
+# hard-coded in ElectricComponent.calculate_requirements.
+INITIAL_RULES = [
+    ('bedroom', 'cable', 2 + 1.5),
+    ('living_room', 'cable', 2.5 + 2),
+]
+
+
+def create_initial_rules(apps, schema_editor):
+    WiringRule = apps.get_model('materiais', 'WiringRule')
+    WiringRule.objects.bulk_create([
+        WiringRule(room_type=room_type, component_type=component_type, fixed_length=length)
+        for room_type, component_type, length in INITIAL_RULES
+    ])
+
+
+def delete_initial_rules(apps, schema_editor):
+    WiringRule = apps.get_model('materiais', 'WiringRule')
+    for room_type, component_type, _ in INITIAL_RULES:
+        WiringRule.objects.filter(room_type=room_type, component_type=component_type).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0002_tile_layout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WiringRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('bedroom', 'Bedroom'), ('living_room', 'Living Room'), ('kitchen', 'Kitchen'), ('bathroom', 'Bathroom'), ('balcony', 'Balcony')], max_length=50)),
+                ('component_type', models.CharField(choices=[('cable', 'Cable'), ('switch', 'Switch'), ('socket', 'Socket'), ('light', 'Light'), ('other', 'Other')], max_length=50)),
+                ('fixed_length', models.FloatField(default=0, help_text='Cable length per room in meters')),
+                ('perimeter_factor', models.FloatField(default=0, help_text='Per meter of room perimeter (cable meters or item count)')),
+                ('area_factor', models.FloatField(default=0, help_text='Per square meter of floor area (cable meters or item count)')),
+                ('default_count', models.IntegerField(blank=True, help_text="Items per room; empty uses the component's default quantity", null=True, validators=[django.core.validators.MinValueValidator(0)])),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='wiringrule',
+            constraint=models.UniqueConstraint(fields=('room_type', 'component_type'), name='unique_wiring_rule'),
+        ),
+        migrations.RunPython(create_initial_rules, delete_initial_rules),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0004_estimate_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plywood',
+            index=models.Index(fields=['price_per_sheet'], name='plywood_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plywood',
+            index=models.Index(fields=['length', 'width'], name='plywood_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tile',
+            index=models.Index(fields=['price_per_box'], name='tile_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tile',
+            index=models.Index(fields=['length', 'width'], name='tile_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tile',
+            index=models.Index(fields=['pieces_per_box'], name='tile_pieces_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0005_material_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='electriccomponent',
+            name='component_type',
+            field=models.CharField(choices=[('cable', 'Cable'), ('switch', 'Switch'), ('socket', 'Socket'), ('light', 'Light'), ('other', 'Other')], db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='room_type',
+            field=models.CharField(choices=[('bedroom', 'Bedroom'), ('living_room', 'Living Room'), ('kitchen', 'Kitchen'), ('bathroom', 'Bathroom'), ('balcony', 'Balcony')], db_index=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='electricalcalculation',
+            index=models.Index(fields=['room', 'component'], name='elecalc_room_component_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='electricalcalculation',
+            index=models.Index(fields=['calculation_date'], name='elecalc_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plywoodcalculation',
+            index=models.Index(fields=['room', 'plywood'], name='plywoodcalc_room_plywood_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plywoodcalculation',
+            index=models.Index(fields=['calculation_date'], name='plywoodcalc_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tilecalculation',
+            index=models.Index(fields=['room', 'tile'], name='tilecalc_room_tile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tilecalculation',
+            index=models.Index(fields=['calculation_date'], name='tilecalc_date_idx'),
+        ),
+    ]
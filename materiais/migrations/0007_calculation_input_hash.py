@@ -0,0 +1,52 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0006_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='electricalcalculation',
+            name='elecalc_room_component_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='plywoodcalculation',
+            name='plywoodcalc_room_plywood_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tilecalculation',
+            name='tilecalc_room_tile_idx',
+        ),
+        migrations.AddField(
+            model_name='electricalcalculation',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='plywoodcalculation',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='tilecalculation',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name='electricalcalculation',
+            index=models.Index(fields=['room', 'component', 'input_hash'], name='elecalc_inputs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plywoodcalculation',
+            index=models.Index(fields=['room', 'plywood', 'input_hash'], name='plywoodcalc_inputs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tilecalculation',
+            index=models.Index(fields=['room', 'tile', 'input_hash'], name='tilecalc_inputs_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:07
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0007_calculation_input_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Building',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UnitTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Floor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('repeat', models.IntegerField(default=1, help_text='Number of identical floors with this layout', validators=[django.core.validators.MinValueValidator(1)])),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='floors', to='materiais.building')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FloorUnit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1, help_text='Units of this layout per floor', validators=[django.core.validators.MinValueValidator(1)])),
+                ('floor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='floor_units', to='materiais.floor')),
+                ('unit_template', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='materiais.unittemplate')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='floor',
+            name='units',
+            field=models.ManyToManyField(related_name='floors', through='materiais.FloorUnit', to='materiais.unittemplate'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='unit_template',
+            field=models.ForeignKey(blank=True, help_text='Unit layout this room belongs to; empty for a standalone room', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='materiais.unittemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='floorunit',
+            constraint=models.UniqueConstraint(fields=('floor', 'unit_template'), name='unique_floor_unit'),
+        ),
+    ]
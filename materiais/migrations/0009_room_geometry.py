@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def store_rectangle_geometry(apps, schema_editor):
+    # Existing rooms are rectangles; same arithmetic as geometry.rectangle_metrics.
+    Room = apps.get_model('materiais', 'Room')
+    rooms = Room.objects.filter(floor_area__isnull=True).order_by('pk')
+    last = 0
+    while True:
+        batch = list(rooms.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        for room in batch:
+            length, width = round(room.length * 1000), round(room.width * 1000)
+            room.floor_area, room.floor_perimeter = length * width / 1e6, 2 * (length + width) / 1000
+        Room.objects.bulk_update(batch, ['floor_area', 'floor_perimeter'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0008_buildings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='floor_area',
+            field=models.FloatField(editable=False, help_text='Area of one room in square meters', null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='floor_perimeter',
+            field=models.FloatField(editable=False, help_text='Perimeter of one room in meters', null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='polygon',
+            field=models.JSONField(blank=True, help_text='Outline corners [[x, y], ...] in meters; empty for a rectangular room', null=True),
+        ),
+        migrations.RunPython(store_rectangle_geometry, migrations.RunPython.noop),
+    ]
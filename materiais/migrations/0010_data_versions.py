@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:25
+
+from django.db import migrations, models
+from django.utils import timezone
+
+COUNTERS = ('catalogue', 'rooms', 'wiring')
+
+
+def create_counters(apps, schema_editor):
+    # Stamped with the creation time, so two databases never share a token.
+    DataVersion = apps.get_model('materiais', 'DataVersion')
+    now = timezone.now()
+    DataVersion.objects.bulk_create([DataVersion(name=name, value=1, updated_at=now) for name in COUNTERS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0009_room_geometry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0010_data_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plywood',
+            name='waste_percentage',
+            field=models.FloatField(default=5, help_text='Waste percentage for cutting', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='plywoodcalculation',
+            name='waste_percentage',
+            field=models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='tile',
+            name='waste_percentage',
+            field=models.FloatField(default=3, help_text='Extra percentage for breakage (cuts come from the layout)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='tilecalculation',
+            name='waste_percentage',
+            field=models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
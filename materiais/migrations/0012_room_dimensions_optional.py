@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0011_waste_percentage_range'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='room',
+            name='length',
+            field=models.FloatField(blank=True, help_text='Length in meters; optional for a room with an outline', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='width',
+            field=models.FloatField(blank=True, help_text='Width in meters; optional for a room with an outline', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+OLD_DEFAULT = 10
+NEW_DEFAULT = 3
+
+
+def move_tiles_to_new_default(apps, schema_editor):
+    # Tiles still at the old flat waste default were priced with cuts
+    # included; the layout now counts the cuts, so 10% would count them twice.
+    Tile = apps.get_model('materiais', 'Tile')
+    if Tile.objects.filter(waste_percentage=OLD_DEFAULT).update(waste_percentage=NEW_DEFAULT):
+        # update() sends no signals: retire cached catalogue pages by hand.
+        DataVersion = apps.get_model('materiais', 'DataVersion')
+        DataVersion.objects.filter(name='catalogue').update(value=F('value') + 1, updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0012_room_dimensions_optional'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_tiles_to_new_default, migrations.RunPython.noop),
+    ]
@@ -1,65 +1,264 @@
+import copy
+
 from django.db import models
-from django.core.validators import MinValueValidator
-from decimal import Decimal
-import math
+from django.db.models import ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from . import estimation, geometry
+from .instrumentation import timed
+from .layout import ORIENTATIONS
+
+# Waste allowances are percentages on top of the exact need.
+MAX_WASTE_PERCENTAGE = 100
+WASTE_VALIDATORS = [MinValueValidator(0), MaxValueValidator(MAX_WASTE_PERCENTAGE)]
+
+ROOM_TYPES = [
+    ('bedroom', 'Bedroom'),
+    ('living_room', 'Living Room'),
+    ('kitchen', 'Kitchen'),
+    ('bathroom', 'Bathroom'),
+    ('balcony', 'Balcony'),
+]
+
+COMPONENT_TYPES = [
+    ('cable', 'Cable'),
+    ('switch', 'Switch'),
+    ('socket', 'Socket'),
+    ('light', 'Light'),
+    ('other', 'Other'),
+]
+
+JOB_STATUSES = [
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
+class RoomQuerySet(models.QuerySet):
+    """SQL counterparts of ``Room.area`` and ``Room.perimeter``.
+
+    ``with_area()`` and ``with_perimeter()`` annotate ``total_area`` and
+    ``total_perimeter`` (quantity included, like the properties), so
+    filtering, ordering and totals run in the database. Rooms without
+    stored geometry count as rectangles.
+    """
+
+    def with_area(self):
+        return self.annotate(total_area=ExpressionWrapper(
+            Coalesce(F('floor_area'), F('length') * F('width')) * F('quantity'),
+            output_field=models.FloatField()
+        ))
+
+    def with_perimeter(self):
+        return self.annotate(total_perimeter=ExpressionWrapper(
+            Coalesce(F('floor_perimeter'), 2 * (F('length') + F('width'))) * F('quantity'),
+            output_field=models.FloatField()
+        ))
 
-class Room(models.Model):
+    def totals(self):
+        """Total area and perimeter of the rooms in one aggregate query."""
+        result = self.with_area().with_perimeter().aggregate(
+            area=Sum('total_area'), perimeter=Sum('total_perimeter')
+        )
+        return {key: value or 0.0 for key, value in result.items()}
+
+class TracksLoadedValues:
+    """Keeps the values a row was loaded with in ``_loaded_values``.
+
+    The repricing signals (``materiais.signals``) compare them with the
+    values being saved, so an edit is told apart from a no-op save
+    without reading the row again.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_values(field_names, values)
+        return instance
+
+    def remember_values(self, field_names, values):
+        # Lists and dicts (a polygon) are copied, so in-place edits show.
+        self._loaded_values = {
+            name: copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+            for name, value in zip(field_names, values)
+        }
+
+class UnitTemplate(models.Model):
+    """A unit layout (an apartment, an office) whose rooms are defined once.
+
+    Floors place a template any number of times (``FloorUnit``); estimates
+    price its rooms once and multiply by the number of units.
+    """
     name = models.CharField(max_length=100)
-    length = models.FloatField(help_text="Length in meters", validators=[MinValueValidator(0)])
-    width = models.FloatField(help_text="Width in meters", validators=[MinValueValidator(0)])
+
+    def __str__(self):
+        return self.name
+
+class Room(TracksLoadedValues, models.Model):
+    """A rectangular room, or one with a ``polygon`` outline.
+
+    Area and perimeter are computed from the outline (or the rectangle)
+    on clean and save and stored, so the estimators never redo the
+    geometry. An outlined room keeps the ``length`` and ``width`` it was
+    given (they are optional then); the tile layout and cutting plans use
+    the rectangle with the outline's area and perimeter instead
+    (``geometry.layout_dimensions``).
+    """
+    name = models.CharField(max_length=100)
+    length = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text="Length in meters; optional for a room with an outline",
+    )
+    width = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text="Width in meters; optional for a room with an outline",
+    )
     quantity = models.IntegerField(default=1, validators=[MinValueValidator(1)])
-    room_type = models.CharField(max_length=50, choices=[
-        ('bedroom', 'Bedroom'),
-        ('living_room', 'Living Room'),
-        ('kitchen', 'Kitchen'),
-        ('bathroom', 'Bathroom'),
-        ('balcony', 'Balcony'),
-    ])
+    room_type = models.CharField(max_length=50, choices=ROOM_TYPES, db_index=True)
+    unit_template = models.ForeignKey(
+        UnitTemplate, null=True, blank=True, on_delete=models.CASCADE, related_name='rooms',
+        help_text="Unit layout this room belongs to; empty for a standalone room"
+    )
+    polygon = models.JSONField(
+        null=True, blank=True,
+        help_text="Outline corners [[x, y], ...] in meters; empty for a rectangular room"
+    )
+    floor_area = models.FloatField(null=True, editable=False, help_text="Area of one room in square meters")
+    floor_perimeter = models.FloatField(null=True, editable=False, help_text="Perimeter of one room in meters")
+
+    objects = RoomQuerySet.as_manager()
+
+    # Set by update_geometry(), so saved along with any other field.
+    GEOMETRY_FIELDS = ('polygon', 'floor_area', 'floor_perimeter')
 
     def __str__(self):
+        if self.length is None or self.width is None:
+            return f"{self.name} ({self.floor_area}m²)"
         return f"{self.name} ({self.length}x{self.width}m)"
 
+    def update_geometry(self):
+        """Compute and set the stored area and perimeter."""
+        if self.polygon:
+            points = geometry.parse_polygon(self.polygon)
+            self.polygon = [list(point) for point in points]
+            self.floor_area, self.floor_perimeter = geometry.polygon_metrics(points)
+            if self.floor_area <= 0:
+                raise ValueError('The polygon has no area.')
+        else:
+            self.polygon = None
+            self.floor_area, self.floor_perimeter = geometry.rectangle_metrics(self.length, self.width)
+
+    def clean(self):
+        if not self.polygon and (self.length is None or self.width is None):
+            raise ValidationError({
+                name: 'Give the length and width, or a polygon outline.'
+                for name in ('length', 'width') if getattr(self, name) is None
+            })
+        try:
+            self.update_geometry()
+        except ValueError as exc:
+            raise ValidationError({'polygon': str(exc)})
+
+    def save(self, *args, **kwargs):
+        self.update_geometry()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.GEOMETRY_FIELDS}
+        super().save(*args, **kwargs)
+
     @property
     def area(self):
-        return self.length * self.width * self.quantity
+        area = self.length * self.width if self.floor_area is None else self.floor_area
+        return area * self.quantity
 
     @property
     def perimeter(self):
-        return 2 * (self.length + self.width) * self.quantity
+        perimeter = 2 * (self.length + self.width) if self.floor_perimeter is None else self.floor_perimeter
+        return perimeter * self.quantity
+
+class Building(models.Model):
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+class Floor(models.Model):
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='floors')
+    name = models.CharField(max_length=100)
+    repeat = models.IntegerField(
+        default=1, validators=[MinValueValidator(1)],
+        help_text="Number of identical floors with this layout"
+    )
+    units = models.ManyToManyField(UnitTemplate, through='FloorUnit', related_name='floors')
+
+    def __str__(self):
+        return f"{self.building} - {self.name}" + (f" (x{self.repeat})" if self.repeat > 1 else "")
+
+class FloorUnit(models.Model):
+    floor = models.ForeignKey(Floor, on_delete=models.CASCADE, related_name='floor_units')
+    unit_template = models.ForeignKey(UnitTemplate, on_delete=models.PROTECT)
+    quantity = models.IntegerField(default=1, validators=[MinValueValidator(1)], help_text="Units of this layout per floor")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['floor', 'unit_template'], name='unique_floor_unit'),
+        ]
+
+    def __str__(self):
+        return f"{self.floor}: {self.quantity} x {self.unit_template}"
 
-class Tile(models.Model):
+class Tile(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=100)
     length = models.FloatField(help_text="Length in centimeters", validators=[MinValueValidator(0)])
     width = models.FloatField(help_text="Width in centimeters", validators=[MinValueValidator(0)])
     pieces_per_box = models.IntegerField(validators=[MinValueValidator(1)])
     price_per_box = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
-    waste_percentage = models.FloatField(default=10, help_text="Waste percentage for cutting and breakage")
+    waste_percentage = models.FloatField(
+        default=3, validators=WASTE_VALIDATORS,
+        help_text="Extra percentage for breakage (cuts come from the layout)",
+    )
+    joint_width = models.FloatField(default=3, help_text="Grout joint in millimeters", validators=[MinValueValidator(0)])
+    orientation = models.CharField(max_length=20, choices=ORIENTATIONS, default='auto')
+
+    class Meta:
+        # Filters of the cheapest-material search (materiais.search).
+        indexes = [
+            models.Index(fields=['price_per_box'], name='tile_price_idx'),
+            models.Index(fields=['length', 'width'], name='tile_size_idx'),
+            models.Index(fields=['pieces_per_box'], name='tile_pieces_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.length}x{self.width}cm)"
 
+    def clean(self):
+        # The layout cannot place zero-sized tiles (materiais.layout).
+        errors = {name: 'Must be greater than zero.' for name in ('length', 'width') if getattr(self, name) == 0}
+        if errors:
+            raise ValidationError(errors)
+
     @property
     def area_per_piece(self):
         return (self.length * self.width) / 10000  # Convert to square meters
 
+    @timed('tile.calculate_requirements')
     def calculate_requirements(self, room):
-        room_area = room.area
-        tile_area = self.area_per_piece
-        total_pieces = math.ceil(room_area / tile_area * (1 + self.waste_percentage / 100))
-        total_boxes = math.ceil(total_pieces / self.pieces_per_box)
-        total_cost = total_boxes * self.price_per_box
-        return {
-            'total_pieces': total_pieces,
-            'total_boxes': total_boxes,
-            'total_cost': total_cost
-        }
+        return estimation.tile_requirements(room, self)
 
-class Plywood(models.Model):
+class Plywood(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=100)
     length = models.FloatField(help_text="Length in meters", validators=[MinValueValidator(0)])
     width = models.FloatField(help_text="Width in meters", validators=[MinValueValidator(0)])
     price_per_sheet = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
-    waste_percentage = models.FloatField(default=5, help_text="Waste percentage for cutting")
+    waste_percentage = models.FloatField(default=5, validators=WASTE_VALIDATORS, help_text="Waste percentage for cutting")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price_per_sheet'], name='plywood_price_idx'),
+            models.Index(fields=['length', 'width'], name='plywood_size_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.length}x{self.width}m)"
@@ -68,86 +267,137 @@ class Plywood(models.Model):
     def area(self):
         return self.length * self.width
 
+    @timed('plywood.calculate_requirements')
     def calculate_requirements(self, room):
-        room_area = room.area
-        plywood_area = self.area
-        total_sheets = math.ceil(room_area / plywood_area * (1 + self.waste_percentage / 100))
-        total_cost = total_sheets * self.price_per_sheet
-        return {
-            'total_sheets': total_sheets,
-            'total_cost': total_cost
-        }
+        return estimation.plywood_requirements(room, self)
 
-class ElectricComponent(models.Model):
+class ElectricComponent(TracksLoadedValues, models.Model):
     name = models.CharField(max_length=200)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     unit = models.CharField(max_length=50)
-    component_type = models.CharField(max_length=50, choices=[
-        ('cable', 'Cable'),
-        ('switch', 'Switch'),
-        ('socket', 'Socket'),
-        ('light', 'Light'),
-        ('other', 'Other'),
-    ])
+    component_type = models.CharField(max_length=50, choices=COMPONENT_TYPES, db_index=True)
     default_quantity = models.IntegerField(default=1, help_text="Default quantity per room")
 
     def __str__(self):
         return self.name
 
+    @timed('electrical.calculate_requirements')
     def calculate_requirements(self, room):
-        if self.component_type == 'cable':
-            # Cable calculation based on room dimensions and wiring paths
-            if room.room_type == 'bedroom':
-                switch_to_ceiling = 2  # meters
-                ceiling_to_light = 1.5  # meters
-                total_length = (switch_to_ceiling + ceiling_to_light) * room.quantity
-            elif room.room_type == 'living_room':
-                switch_to_ceiling = 2.5  # meters
-                ceiling_to_light = 2  # meters
-                total_length = (switch_to_ceiling + ceiling_to_light) * room.quantity
-            else:
-                total_length = room.perimeter * 0.5  # Default estimation
-            return {
-                'quantity': total_length,
-                'total_cost': total_length * self.unit_price
-            }
-        else:
-            # For other components, use default quantity
-            quantity = self.default_quantity * room.quantity
-            return {
-                'quantity': quantity,
-                'total_cost': quantity * self.unit_price
-            }
-
-class TileCalculation(models.Model):
+        return estimation.electrical_requirements(room, self)
+
+class WiringRule(models.Model):
+    room_type = models.CharField(max_length=50, choices=ROOM_TYPES)
+    component_type = models.CharField(max_length=50, choices=COMPONENT_TYPES)
+    fixed_length = models.FloatField(default=0, help_text="Cable length per room in meters")
+    perimeter_factor = models.FloatField(default=0, help_text="Per meter of room perimeter (cable meters or item count)")
+    area_factor = models.FloatField(default=0, help_text="Per square meter of floor area (cable meters or item count)")
+    default_count = models.IntegerField(
+        null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text="Items per room; empty uses the component's default quantity"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room_type', 'component_type'], name='unique_wiring_rule'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_room_type_display()} / {self.get_component_type_display()}"
+
+class ContentAddressed:
+    """Fills in ``input_hash`` on save (see ``materiais.history``)."""
+
+    def save(self, *args, **kwargs):
+        if not self.input_hash:
+            from . import history
+            history.stamp([self])
+        super().save(*args, **kwargs)
+
+class TileCalculation(ContentAddressed, models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     tile = models.ForeignKey(Tile, on_delete=models.CASCADE)
     total_boxes = models.FloatField()
     total_pieces = models.IntegerField()
     total_cost = models.DecimalField(max_digits=10, decimal_places=2)
-    waste_percentage = models.FloatField()
+    waste_percentage = models.FloatField(validators=WASTE_VALIDATORS)
     calculation_date = models.DateTimeField(auto_now_add=True)
+    input_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'tile', 'input_hash'], name='tilecalc_inputs_idx'),
+            models.Index(fields=['calculation_date'], name='tilecalc_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.room} - {self.tile}"
 
-class PlywoodCalculation(models.Model):
+class PlywoodCalculation(ContentAddressed, models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     plywood = models.ForeignKey(Plywood, on_delete=models.CASCADE)
     total_sheets = models.IntegerField()
     total_cost = models.DecimalField(max_digits=10, decimal_places=2)
-    waste_percentage = models.FloatField()
+    waste_percentage = models.FloatField(validators=WASTE_VALIDATORS)
     calculation_date = models.DateTimeField(auto_now_add=True)
+    input_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'plywood', 'input_hash'], name='plywoodcalc_inputs_idx'),
+            models.Index(fields=['calculation_date'], name='plywoodcalc_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.room} - {self.plywood}"
 
-class ElectricalCalculation(models.Model):
+class ElectricalCalculation(ContentAddressed, models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     component = models.ForeignKey(ElectricComponent, on_delete=models.CASCADE)
     quantity = models.FloatField()
     total_cost = models.DecimalField(max_digits=10, decimal_places=2)
     calculation_date = models.DateTimeField(auto_now_add=True)
+    input_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'component', 'input_hash'], name='elecalc_inputs_idx'),
+            models.Index(fields=['calculation_date'], name='elecalc_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.room} - {self.component}"
+
+class EstimateJob(models.Model):
+    status = models.CharField(max_length=20, choices=JOB_STATUSES, default='pending')
+    tile_ids = models.JSONField(default=list, blank=True)
+    plywood_ids = models.JSONField(default=list, blank=True)
+    component_ids = models.JSONField(default=list, blank=True)
+    room_count = models.IntegerField(default=0)
+    total_chunks = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Estimate job {self.pk} ({self.get_status_display()})"
+
+class EstimateChunk(models.Model):
+    job = models.ForeignKey(EstimateJob, on_delete=models.CASCADE, related_name='chunks')
+    room_ids = models.JSONField()
+    status = models.CharField(max_length=20, choices=JOB_STATUSES, default='pending', db_index=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Chunk {self.pk} of job {self.job_id}"
+
+class DataVersion(models.Model):
+    """A change counter shared by every process (see ``materiais.versions``)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
 
     def __str__(self):
-        return f"{self.room} - {self.component}" 
\ No newline at end of file
+        return f"{self.name} v{self.value}"
@@ -0,0 +1,199 @@
+"""Incremental recomputation of stored calculations.
+
+When a material's price, waste or dimensions change, or a room's
+dimensions, only the calculation rows that reference it are recomputed.
+Rows are read in primary-key batches as plain tuples and priced with the
+batch engine, keeping each row's own waste percentage. Only rows whose
+result actually changed are written, with one parameterized UPDATE per
+row sent through ``executemany``. The input hash is refreshed in the same
+statement (see ``history``).
+
+Rows whose inputs are unknown (saved before input hashing, or with a
+legacy hash) are left alone, since there is nothing to recompute them
+from.
+
+Reports give the cost delta in total, per room and per building, where a
+room counts once for every unit of its template the building holds.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import connection, transaction
+
+from . import buildings, estimation, history
+from .models import ElectricComponent, Plywood, Room, Tile
+
+BATCH_SIZE = 5000
+
+# Stored result columns per kind, compared and rewritten.
+RESULT_FIELDS = {
+    'tile': ('total_boxes', 'total_pieces', 'total_cost'),
+    'plywood': ('total_sheets', 'total_cost'),
+    'electrical': ('quantity', 'total_cost'),
+}
+
+MATERIAL_MODELS = {'tile': Tile, 'plywood': Plywood, 'electrical': ElectricComponent}
+
+KINDS_FOR_MODEL = {
+    Room: ('tile', 'plywood', 'electrical'),
+    Tile: ('tile',),
+    Plywood: ('plywood',),
+    ElectricComponent: ('electrical',),
+}
+
+
+def _new_results(kind, rooms, materials, waste, rules):
+    if kind == 'tile':
+        columns = estimation.tile_columns(materials)
+        columns['waste_percentage'] = waste
+        result = estimation.tile_pairs(estimation.room_columns(rooms), columns)
+        return [
+            (float(boxes), int(pieces), estimation.cents_to_decimal(cents))
+            for boxes, pieces, cents in zip(result['total_boxes'], result['total_pieces'], result['total_cost_cents'])
+        ], result['total_cost_cents']
+    if kind == 'plywood':
+        columns = estimation.plywood_columns(materials)
+        columns['waste_percentage'] = waste
+        result = estimation.plywood_pairs(estimation.room_columns(rooms), columns)
+        return [
+            (int(sheets), estimation.cents_to_decimal(cents))
+            for sheets, cents in zip(result['total_sheets'], result['total_cost_cents'])
+        ], result['total_cost_cents']
+    result = estimation.electrical_pairs(rooms, materials, rules)
+    return [
+        (float(quantity), estimation.cents_to_decimal(cents))
+        for quantity, cents in zip(result['quantity'], result['total_cost_cents'])
+    ], result['total_cost_cents']
+
+
+def building_deltas(room_deltas):
+    """Cost delta per building from ``{room_id: delta}``.
+
+    Rooms outside any building only count in the room and total deltas.
+    """
+    rooms = Room.objects.filter(unit_template__isnull=False).only('unit_template').in_bulk(list(room_deltas))
+    templates = defaultdict(list)
+    for room in rooms.values():
+        templates[room.unit_template_id].append(room.pk)
+    deltas = defaultdict(int)
+    for (building_id, template_id), units in buildings.building_units(list(templates)).items():
+        for room_id in templates[template_id]:
+            deltas[building_id] += room_deltas[room_id] * units
+    return {building_id: delta for building_id, delta in deltas.items() if delta}
+
+
+def _update_sql(model, fields):
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(model._meta.get_field(name).column)} = %s' for name in fields)
+    return f'UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s'
+
+
+def recompute(kind, dry_run=False, batch_size=BATCH_SIZE, rules=None, **filters):
+    """Recompute the ``kind`` calculations matching ``filters``.
+
+    ``filters`` are queryset lookups on the calculation model, e.g.
+    ``tile_id__in=[...]`` or ``room__room_type='bedroom'``. Returns a report
+    with the number of rows checked and changed, the total cost delta and
+    the delta per room and per building. With ``dry_run`` nothing is
+    written.
+    """
+    from . import wiring
+    model, material_field, _ = history.CALCULATIONS[kind]
+    if kind == 'electrical' and rules is None:
+        rules = wiring.rule_table()
+    hasher = history.Hasher(rules)
+    has_waste = kind != 'electrical'
+    result_fields = RESULT_FIELDS[kind]
+    columns = (
+        'pk', 'room_id', f'{material_field}_id', 'input_hash',
+        *(('waste_percentage',) if has_waste else ()), *result_fields,
+    )
+    queryset = (
+        model.objects.filter(**filters)
+        .exclude(input_hash='')
+        .exclude(input_hash__startswith=history.LEGACY)
+    )
+    write_fields = (*result_fields, 'input_hash')
+    sql = _update_sql(model, write_fields)
+    prepare = [model._meta.get_field(name) for name in write_fields]
+    materials = {}
+    report = {'kind': kind, 'rows': 0, 'changed': 0, 'delta': 0, 'rooms': defaultdict(int)}
+
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').values_list(*columns)[:batch_size])
+        if not rows:
+            break
+        last = rows[-1][0]
+        rooms = Room.objects.in_bulk({row[1] for row in rows})
+        missing = {row[2] for row in rows} - materials.keys()
+        if missing:
+            materials.update(MATERIAL_MODELS[kind].objects.in_bulk(missing))
+        # Rows whose room or material was deleted mid-run are skipped.
+        rows = [row for row in rows if row[1] in rooms and row[2] in materials]
+        if not rows:
+            continue
+        row_rooms = [rooms[row[1]] for row in rows]
+        row_materials = [materials[row[2]] for row in rows]
+        waste = np.array([row[4] for row in rows], dtype=np.float64) if has_waste else None
+        results, new_cents = _new_results(kind, row_rooms, row_materials, waste, rules)
+
+        updates = []
+        for index, row in enumerate(rows):
+            stored = row[5:] if has_waste else row[4:]
+            new_hash = hasher.inputs(kind, row_rooms[index], row_materials[index], row[4] if has_waste else None)
+            if tuple(stored) == results[index] and row[3] == new_hash:
+                continue
+            delta = int(new_cents[index]) - estimation.to_cents(stored[-1])
+            report['delta'] += delta
+            report['rooms'][row[1]] += delta
+            updates.append([
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(prepare, (*results[index], new_hash))
+            ] + [row[0]])
+        report['rows'] += len(rows)
+        report['changed'] += len(updates)
+        if updates and not dry_run:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, updates)
+
+    report['delta'] = estimation.cents_to_decimal(report['delta'])
+    report['rooms'] = {
+        room_id: estimation.cents_to_decimal(cents) for room_id, cents in report['rooms'].items() if cents
+    }
+    report['buildings'] = building_deltas(report['rooms']) if report['rooms'] else {}
+    return report
+
+
+def recompute_for(instance, dry_run=False):
+    """Recompute every calculation that depends on a room or material."""
+    reports = []
+    for kind in KINDS_FOR_MODEL[type(instance)]:
+        if isinstance(instance, Room):
+            lookup = 'room_id'
+        else:
+            lookup = f'{history.CALCULATIONS[kind][1]}_id'
+        reports.append(recompute(kind, dry_run=dry_run, **{lookup: instance.pk}))
+    return reports
+
+
+def _merge(total, report):
+    total['rows'] += report['rows']
+    total['changed'] += report['changed']
+    total['delta'] += report['delta']
+    for key in ('rooms', 'buildings'):
+        for pk, delta in report[key].items():
+            total[key][pk] = total[key].get(pk, 0) + delta
+    return total
+
+
+def recompute_materials(kind, material_ids, dry_run=False, chunk_size=1000):
+    """``recompute`` for many materials, a bounded ``IN`` list at a time."""
+    lookup = f'{history.CALCULATIONS[kind][1]}_id__in'
+    material_ids = sorted(material_ids)
+    total = {
+        'kind': kind, 'rows': 0, 'changed': 0, 'delta': estimation.cents_to_decimal(0), 'rooms': {}, 'buildings': {},
+    }
+    for start in range(0, len(material_ids), chunk_size):
+        _merge(total, recompute(kind, dry_run=dry_run, **{lookup: material_ids[start:start + chunk_size]}))
+    return total
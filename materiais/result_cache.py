@@ -0,0 +1,88 @@
+"""Memoized material requirement results.
+
+Results live in the ``estimates`` cache alias (LRU-evicting local memory
+by default, see ``CACHES`` in settings). Keys are derived from the room and
+material inputs plus a per-object version counter that is bumped whenever
+the row is saved or deleted, so edits never serve a stale result.
+"""
+import hashlib
+
+from django.core.cache import caches
+
+from . import wiring
+
+CACHE_ALIAS = 'estimates'
+
+INPUT_FIELDS = {
+    'room': ('length', 'width', 'quantity', 'room_type', 'polygon'),
+    'tile': (
+        'length', 'width', 'pieces_per_box', 'price_per_box', 'waste_percentage',
+        'joint_width', 'orientation',
+    ),
+    'plywood': ('length', 'width', 'price_per_sheet', 'waste_percentage'),
+    'electriccomponent': ('component_type', 'unit_price', 'default_quantity'),
+}
+
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(instance):
+    return f'version:{instance._meta.model_name}:{instance.pk}'
+
+
+def _inputs(instance):
+    return tuple(getattr(instance, field) for field in INPUT_FIELDS[instance._meta.model_name])
+
+
+def _result_key(material, room, versions):
+    kind = material._meta.model_name
+    payload = repr((
+        room.pk, versions.get(_version_key(room), 0), _inputs(room),
+        material.pk, versions.get(_version_key(material), 0), _inputs(material),
+        # Electrical results also depend on the wiring rules.
+        wiring.version() if kind == 'electriccomponent' else None,
+    ))
+    return f'result:{kind}:{hashlib.sha1(payload.encode()).hexdigest()}'
+
+
+def cached_requirements(material, room):
+    """Return ``material.calculate_requirements(room)``, memoized."""
+    cache = _cache()
+    versions = cache.get_many([_version_key(room), _version_key(material)])
+    key = _result_key(material, room, versions)
+    result = cache.get(key)
+    if result is not None:
+        _stats['hits'] += 1
+        return result
+    _stats['misses'] += 1
+    result = material.calculate_requirements(room)
+    cache.set(key, result)
+    return result
+
+
+def invalidate(instance):
+    """Drop every cached result that involves ``instance``."""
+    cache = _cache()
+    key = _version_key(instance)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def stats():
+    lookups = _stats['hits'] + _stats['misses']
+    return {
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'hit_ratio': _stats['hits'] / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    _stats['hits'] = 0
+    _stats['misses'] = 0
@@ -0,0 +1,130 @@
+"""What-if comparison of material choices per room type.
+
+A scenario picks one tile and one plywood for each room type (a "slot" is
+one room type and one material kind). Every candidate is priced against
+every room in one matrix per kind, and summing a room type's rows gives
+the cost of each option in its slot. Slots are independent, so a
+scenario's cost is the sum of its choices and the cheapest scenarios can
+be listed best-first from the sorted slots without pricing every
+combination: only the neighbours of scenarios already listed go on the
+heap.
+
+An option that ``limit`` cheaper options in its slot beat can never be
+part of the cheapest ``limit`` scenarios (swapping it for any of them is
+cheaper), so each slot is cut to its ``limit`` cheapest options first.
+Nothing is written to the database.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from .estimation import cents_to_decimal, electrical_matrix, plywood_matrix, room_columns, tile_matrix
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+
+# Choices under this room type apply to room types without their own entry.
+ANY_ROOM_TYPE = '*'
+
+KINDS = {
+    'tile': (tile_matrix, ('total_boxes', 'total_pieces')),
+    'plywood': (plywood_matrix, ('total_sheets',)),
+}
+
+
+def _slots(rooms, choices):
+    """``(room_type, kind, room_rows, materials)`` for every slot with options."""
+    groups = {}
+    for index, room in enumerate(rooms):
+        groups.setdefault(room.room_type, []).append(index)
+    slots = []
+    for room_type, rows in sorted(groups.items()):
+        options = choices.get(room_type, choices.get(ANY_ROOM_TYPE, {}))
+        for kind in KINDS:
+            if options.get(kind):
+                slots.append((room_type, kind, np.array(rows), list(options[kind])))
+    return slots
+
+
+def _priced_slots(columns, slots, limit):
+    """Each slot's ``limit`` cheapest options, as ``(room_type, kind, cents, rows, count)``."""
+    priced = []
+    for kind, (engine, quantities) in KINDS.items():
+        kind_slots = [slot for slot in slots if slot[1] == kind]
+        if not kind_slots:
+            continue
+        # One matrix over every room and every distinct candidate of this kind.
+        materials = list({material.pk: material for slot in kind_slots for material in slot[3]}.values())
+        column = {material.pk: j for j, material in enumerate(materials)}
+        matrix = engine(columns, materials)
+        for room_type, _, rows, options in kind_slots:
+            index = [column[material.pk] for material in options]
+            totals = {key: matrix[key][rows][:, index].sum(axis=0) for key in ('total_cost_cents', *quantities)}
+            order = np.lexsort((index, totals['total_cost_cents']))[:limit]
+            priced.append((room_type, kind, totals['total_cost_cents'][order], [
+                {
+                    'id': options[j].pk,
+                    'name': options[j].name,
+                    'total_cost': cents_to_decimal(totals['total_cost_cents'][j]),
+                    **{key: int(totals[key][j]) for key in quantities},
+                }
+                for j in order
+            ], len(options)))
+    # Room type order, tiles before plywood, regardless of pricing order.
+    kinds = list(KINDS)
+    priced.sort(key=lambda slot: (slot[0], kinds.index(slot[1])))
+    return priced
+
+
+def _cheapest(costs, limit):
+    """The ``limit`` smallest sums of one entry per ascending ``costs`` array.
+
+    A combination is only reached by raising its picks in slot order (the
+    ``last`` slot raised and later ones), so each is pushed at most once.
+    """
+    costs = [cost.tolist() for cost in costs]
+    heap = [(sum(cost[0] for cost in costs), (0,) * len(costs), 0)]
+    while heap and limit:
+        total, picks, last = heapq.heappop(heap)
+        yield total, picks
+        limit -= 1
+        for slot in range(last, len(costs)):
+            pick = picks[slot]
+            if pick + 1 < len(costs[slot]):
+                step = costs[slot][pick + 1] - costs[slot][pick]
+                heapq.heappush(heap, (total + step, picks[:slot] + (pick + 1,) + picks[slot + 1:], slot))
+
+
+def compare(rooms, choices, components=(), rules=None, limit=DEFAULT_LIMIT):
+    """The ``limit`` cheapest material scenarios for ``rooms``, cheapest first.
+
+    ``choices`` maps a room type (or ``ANY_ROOM_TYPE``) to
+    ``{'tile': [tiles], 'plywood': [plywoods]}``. ``components`` are priced
+    for every room and added to every scenario alike.
+    """
+    rooms = list(rooms)
+    limit = max(1, min(limit, MAX_LIMIT))
+    columns = room_columns(rooms)
+    slots = _priced_slots(columns, _slots(rooms, choices), limit)
+    fixed = 0
+    if components and rooms:
+        fixed = int(electrical_matrix(columns, components, rules)['total_cost_cents'].sum())
+
+    options = {}
+    for room_type, kind, _, rows, _ in slots:
+        options.setdefault(room_type, {})[kind] = rows
+    scenarios = []
+    if slots:
+        ids = [[row['id'] for row in slot[3]] for slot in slots]
+        for rank, (total, picks) in enumerate(_cheapest([slot[2] for slot in slots], limit), 1):
+            picked = {}
+            for (room_type, kind, *_), slot_ids, pick in zip(slots, ids, picks):
+                picked.setdefault(room_type, {})[kind] = slot_ids[pick]
+            scenarios.append({'rank': rank, 'total_cost': cents_to_decimal(total + fixed), 'choices': picked})
+    return {
+        'combinations': math.prod(slot[4] for slot in slots) if slots else 0,
+        'components_cost': cents_to_decimal(fixed),
+        'options': options,
+        'scenarios': scenarios,
+    }
@@ -0,0 +1,179 @@
+"""Cheapest-material search.
+
+Ranks every tile or plywood in the catalogue by its total cost over a set
+of rooms. The filters are applied in SQL (the filtered columns are
+indexed) and only the columns the cost math needs are fetched, as plain
+tuples rather than model instances.
+
+Tile costs depend on the layout, so tiles are priced in blocks in order of
+an area-based lower bound on their cost; once the N-th best exact cost is
+below the bound of the next block, the remaining tiles cannot make the top
+N and are never laid out. Plywood costs are closed-form, so every plywood
+is priced.
+"""
+import numpy as np
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+
+from .estimation import cents_to_decimal, plywood_matrix, room_columns, tile_matrix, with_waste
+from .layout import GAP_TOLERANCE
+from .models import Plywood, Tile
+
+# Room x material pairs priced per block at most. Blocks start small and
+# double, so a good top N is found early and prunes the rest.
+BLOCK_PAIRS = 250000
+FIRST_BLOCK = 256
+DEFAULT_LIMIT = 10
+
+_TILE_FIELDS = ('pk', 'name', 'length', 'width', 'pieces_per_box', 'price_cents',
+                'waste_percentage', 'joint_width', 'orientation')
+_PLYWOOD_FIELDS = ('pk', 'name', 'length', 'width', 'price_cents', 'waste_percentage')
+
+
+def _filtered(queryset, price_field, min_length=None, max_length=None, min_width=None,
+              max_width=None, max_price=None, min_pieces_per_box=None, max_pieces_per_box=None):
+    lookups = {
+        'length__gte': min_length,
+        'length__lte': max_length,
+        'width__gte': min_width,
+        'width__lte': max_width,
+        f'{price_field}__lte': max_price,
+        'pieces_per_box__gte': min_pieces_per_box,
+        'pieces_per_box__lte': max_pieces_per_box,
+    }
+    return queryset.filter(**{lookup: value for lookup, value in lookups.items() if value is not None})
+
+
+def _priced(queryset, price_field):
+    # Cents are computed in SQL, which skips the per-row Decimal conversion.
+    return queryset.annotate(price_cents=Cast(Round(F(price_field) * 100), IntegerField()))
+
+
+def _columns(rows, fields):
+    """Turn ``values_list`` rows into the column dict the estimation engine uses."""
+    values = list(zip(*rows)) if rows else [()] * len(fields)
+    columns = dict(zip(fields, values))
+    result = {
+        'pk': np.array(columns['pk'], dtype=np.int64),
+        'name': list(columns['name']),
+        'length': np.array(columns['length'], dtype=np.float64),
+        'width': np.array(columns['width'], dtype=np.float64),
+        'price_cents': np.array(columns['price_cents'], dtype=np.int64),
+        'waste_percentage': np.array(columns['waste_percentage'], dtype=np.float64),
+    }
+    if 'pieces_per_box' in columns:
+        result['pieces_per_box'] = np.array(columns['pieces_per_box'], dtype=np.int64)
+        result['joint_width'] = np.array(columns['joint_width'], dtype=np.float64)
+        result['orientation'] = np.array(columns['orientation'], dtype=str)
+    return result
+
+
+def _take(columns, index):
+    return {key: value[index] for key, value in columns.items() if isinstance(value, np.ndarray)}
+
+
+def _tile_lower_bound(rooms, tiles):
+    """Cost (cents) no tile layout can beat, per tile.
+
+    Every tile, whole or cut into strips, covers at most its own area plus
+    one joint on two sides, and uncovered slivers are at most
+    ``GAP_TOLERANCE`` wide. Rounding up the pooled area of all rooms never
+    exceeds rounding up each room, so one row per tile is enough.
+    """
+    length = np.maximum(rooms['length'] * 1000 - GAP_TOLERANCE, 0)
+    width = np.maximum(rooms['width'] * 1000 - GAP_TOLERANCE, 0)
+    area = (length * width * rooms['quantity']).sum()
+    cover = (tiles['length'] * 10 + tiles['joint_width']) * (tiles['width'] * 10 + tiles['joint_width'])
+    # The small slack keeps float rounding from overshooting the exact count.
+    pieces = np.ceil(area / cover * (1 - 1e-6)).astype(np.int64)
+    total_pieces = with_waste(pieces, tiles['waste_percentage'])
+    boxes = -(-total_pieces // tiles['pieces_per_box'])
+    return boxes * tiles['price_cents']
+
+
+def _price(rooms, materials, index, engine):
+    result = engine(rooms, _take(materials, index))
+    return {key: value.sum(axis=0) for key, value in result.items() if key != 'is_cable'}
+
+
+def _merge(best, index, totals, limit):
+    """Keep the ``limit`` cheapest of ``best`` plus a newly priced block."""
+    index = np.concatenate([best['index'], index])
+    totals = {key: np.concatenate([best['totals'][key], value]) for key, value in totals.items()}
+    order = np.lexsort((index, totals['total_cost_cents']))[:limit]
+    return {'index': index[order], 'totals': {key: value[order] for key, value in totals.items()}}
+
+
+def _rank(rooms, materials, engine, limit, lower_bound=None):
+    count = len(materials['pk'])
+    best = {'index': np.zeros(0, dtype=np.int64), 'totals': None}
+    if lower_bound is None:
+        order = np.arange(count)
+    else:
+        order = np.argsort(lower_bound, kind='stable')
+    largest = max(1, BLOCK_PAIRS // len(rooms['length']))
+    step = min(largest, max(FIRST_BLOCK, 4 * limit))
+    start = 0
+    while start < count:
+        index = order[start:start + step]
+        if (lower_bound is not None and len(best['index']) >= limit
+                and lower_bound[index[0]] > best['totals']['total_cost_cents'][-1]):
+            break
+        totals = _price(rooms, materials, index, engine)
+        if best['totals'] is None:
+            best['totals'] = {key: value[:0] for key, value in totals.items()}
+        best = _merge(best, index, totals, limit)
+        start += step
+        step = min(largest, 2 * step)
+    return best
+
+
+def _results(materials, best, quantities, unit_price):
+    if best['totals'] is None:
+        return []
+    rows = []
+    for position, index in enumerate(best['index']):
+        row = {
+            'id': int(materials['pk'][index]),
+            'name': materials['name'][index],
+            'length': float(materials['length'][index]),
+            'width': float(materials['width'][index]),
+            unit_price: cents_to_decimal(materials['price_cents'][index]),
+            'total_cost': cents_to_decimal(best['totals']['total_cost_cents'][position]),
+        }
+        for key in quantities:
+            row[key] = int(best['totals'][key][position])
+        rows.append(row)
+    return rows
+
+
+def cheapest_tiles(rooms, limit=DEFAULT_LIMIT, **filters):
+    """The ``limit`` cheapest tiles for ``rooms``, cheapest first.
+
+    ``filters`` are ``min_length``/``max_length``/``min_width``/``max_width``
+    (cm), ``max_price`` (per box) and ``min_pieces_per_box``/``max_pieces_per_box``.
+    """
+    rooms = room_columns(rooms)
+    queryset = _priced(_filtered(Tile.objects.all(), 'price_per_box', **filters), 'price_per_box')
+    rows = list(queryset.values_list(*_TILE_FIELDS))
+    tiles = _columns(rows, _TILE_FIELDS)
+    if not rows or not len(rooms['length']):
+        return []
+    best = _rank(rooms, tiles, tile_matrix, limit, _tile_lower_bound(rooms, tiles))
+    return _results(tiles, best, ('total_boxes', 'total_pieces'), 'price_per_box')
+
+
+def cheapest_plywoods(rooms, limit=DEFAULT_LIMIT, **filters):
+    """The ``limit`` cheapest plywoods for ``rooms``, cheapest first.
+
+    ``filters`` are ``min_length``/``max_length``/``min_width``/``max_width``
+    (m) and ``max_price`` (per sheet).
+    """
+    rooms = room_columns(rooms)
+    queryset = _priced(_filtered(Plywood.objects.all(), 'price_per_sheet', **filters), 'price_per_sheet')
+    rows = list(queryset.values_list(*_PLYWOOD_FIELDS))
+    plywoods = _columns(rows, _PLYWOOD_FIELDS)
+    if not rows or not len(rooms['length']):
+        return []
+    best = _rank(rooms, plywoods, plywood_matrix, limit)
+    return _results(plywoods, best, ('total_sheets',), 'price_per_sheet')
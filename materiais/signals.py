@@ -0,0 +1,108 @@
+import functools
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import catalogue, repricing, result_cache, snapshot, wiring
+from .models import ElectricComponent, Plywood, Room, Tile, WiringRule
+
+
+def _inputs(instance):
+    return tuple(getattr(instance, field) for field in result_cache.INPUT_FIELDS[instance._meta.model_name])
+
+
+@receiver([post_save, post_delete], sender=Room)
+@receiver([post_save, post_delete], sender=Tile)
+@receiver([post_save, post_delete], sender=Plywood)
+@receiver([post_save, post_delete], sender=ElectricComponent)
+def invalidate_cached_results(sender, instance, **kwargs):
+    result_cache.invalidate(instance)
+
+
+@receiver([post_save, post_delete], sender=Tile)
+@receiver([post_save, post_delete], sender=Plywood)
+@receiver([post_save, post_delete], sender=ElectricComponent)
+def bump_catalogue_version(sender, instance, **kwargs):
+    catalogue.bump_version()
+
+
+@receiver([post_save, post_delete], sender=Room)
+def bump_rooms_version(sender, instance, **kwargs):
+    snapshot.bump_rooms_version()
+
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=Tile)
+@receiver(pre_save, sender=Plywood)
+@receiver(pre_save, sender=ElectricComponent)
+def remember_inputs(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    fields = result_cache.INPUT_FIELDS[sender._meta.model_name]
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(field in loaded for field in fields):
+        instance._stored_inputs = tuple(loaded[field] for field in fields)
+    else:
+        # Built by hand or loaded with deferred fields: read the row.
+        instance._stored_inputs = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Tile)
+@receiver(post_save, sender=Plywood)
+@receiver(post_save, sender=ElectricComponent)
+def recompute_dependents(sender, instance, created, raw=False, **kwargs):
+    # Only edits to calculation inputs touch stored calculations.
+    stored = getattr(instance, '_stored_inputs', None)
+    inputs = _inputs(instance)
+    if not raw:
+        # The next save of this instance compares against what was saved now.
+        instance.remember_values(result_cache.INPUT_FIELDS[sender._meta.model_name], inputs)
+    if created or raw or stored is None or stored == inputs:
+        return
+    # After commit: the save is not held up by the repricing, and a
+    # rolled-back edit reprices nothing.
+    transaction.on_commit(functools.partial(repricing.recompute_for, instance))
+
+
+@receiver(pre_save, sender=WiringRule)
+def remember_wiring_pair(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._stored_pair = sender.objects.filter(pk=instance.pk).values_list(
+        'room_type', 'component_type'
+    ).first()
+
+
+@receiver([post_save, post_delete], sender=WiringRule)
+def reload_wiring_rules(sender, instance, **kwargs):
+    wiring.bump_version()
+    # A rule moved to another room or component type also changes the
+    # calculations of the pair it left.
+    pairs = {(instance.room_type, instance.component_type)}
+    if getattr(instance, '_stored_pair', None):
+        pairs.add(instance._stored_pair)
+    transaction.on_commit(functools.partial(_reprice_wiring_pairs, sorted(pairs)))
+
+
+def _reprice_wiring_pairs(pairs):
+    rules = wiring.rule_table()
+    for room_type, component_type in pairs:
+        repricing.recompute(
+            'electrical',
+            rules=rules,
+            room__room_type=room_type,
+            component__component_type=component_type,
+        )
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,68 @@
+"""In-process snapshot of rooms and materials for live recalculation.
+
+The calculation forms ask ``/calculations/<kind>/preview/`` for the result
+whenever the room, material or waste percentage changes. The rows come
+from a per-process dict that is filled on first use and dropped as a
+whole when the catalogue or rooms counter (see ``versions``) changes, so
+a warm preview does not query the database. The counters live in the
+database, so rooms or materials changed by another process (an import
+command, another worker) retire the snapshot here too.
+"""
+import copy
+
+from . import catalogue, versions
+from .models import ElectricComponent, Plywood, Room, Tile
+from .result_cache import cached_requirements
+
+MATERIALS = {'tile': Tile, 'plywood': Plywood, 'electrical': ElectricComponent}
+
+_snapshot = {'versions': None, 'rows': {}}
+
+
+def rooms_version():
+    return versions.token(versions.ROOMS)
+
+
+def bump_rooms_version():
+    versions.bump(versions.ROOMS)
+
+
+def _rows():
+    versions = (catalogue.version(), rooms_version())
+    if versions != _snapshot['versions']:
+        _snapshot['versions'] = versions
+        _snapshot['rows'] = {}
+    return _snapshot['rows']
+
+
+def get(model, pk):
+    """The ``model`` row with ``pk`` from the snapshot, or ``None``."""
+    rows = _rows()
+    key = (model, pk)
+    if key not in rows:
+        # Missing rows are remembered too, so bad ids do not query again.
+        rows[key] = model.objects.filter(pk=pk).first()
+    return rows[key]
+
+
+def requirements(room, material, waste_percentage=None):
+    """``calculate_requirements`` with an optional waste percentage override."""
+    if waste_percentage is not None and waste_percentage != getattr(material, 'waste_percentage', None):
+        material = copy.copy(material)
+        material.waste_percentage = waste_percentage
+    return cached_requirements(material, room)
+
+
+def preview(kind, room_id, material_id, waste_percentage=None):
+    """Requirements of one room and material, or ``None`` if either is unknown."""
+    room = get(Room, room_id)
+    material = get(MATERIALS[kind], material_id)
+    if room is None or material is None:
+        return None
+    if kind == 'electrical':
+        waste_percentage = None
+    result = requirements(room, material, waste_percentage)
+    if kind != 'electrical':
+        result = {**result, 'waste_percentage': material.waste_percentage if waste_percentage is None
+                  else waste_percentage}
+    return result
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from ..models import ElectricComponent, Plywood, Room, Tile
+
+
+def make_room(name='Room', length=2.5, width=2.5, quantity=1, room_type='bedroom', **kwargs):
+    return Room.objects.create(
+        name=name, length=length, width=width, quantity=quantity, room_type=room_type, **kwargs
+    )
+
+
+def make_tile(name='Tile', length=30, width=30, pieces_per_box=10, price_per_box='25.00', **kwargs):
+    kwargs.setdefault('waste_percentage', 0)
+    kwargs.setdefault('joint_width', 0)
+    return Tile.objects.create(
+        name=name, length=length, width=width, pieces_per_box=pieces_per_box,
+        price_per_box=Decimal(price_per_box), **kwargs
+    )
+
+
+def make_plywood(name='Plywood', length=2.44, width=1.22, price_per_sheet='40.00', waste_percentage=0):
+    return Plywood.objects.create(
+        name=name, length=length, width=width, price_per_sheet=Decimal(price_per_sheet),
+        waste_percentage=waste_percentage,
+    )
+
+
+def make_component(name='Socket', component_type='socket', unit_price='3.00', default_quantity=2, unit='unit'):
+    return ElectricComponent.objects.create(
+        name=name, component_type=component_type, unit_price=Decimal(unit_price),
+        default_quantity=default_quantity, unit=unit,
+    )
@@ -0,0 +1,76 @@
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import TileCalculation
+from .factories import make_component, make_plywood, make_room, make_tile
+
+
+class ApiTests(TestCase):
+    def post(self, name, payload):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        return self.client.post(reverse(f'materiais:{name}'), body, content_type='application/json')
+
+    def test_estimate_rejects_bad_payloads(self):
+        tile = make_tile()
+        cases = [
+            ('not json', 'body'),
+            ([1, 2], 'body'),
+            ({'rooms': []}, 'rooms'),
+            ({'rooms': [{'id': 'x'}]}, 'rooms'),
+            ({'rooms': [{'id': 999999}]}, 'rooms'),
+            ({'rooms': ['room']}, 'rooms[0]'),
+            ({'rooms': [{'length': -1, 'width': 2, 'room_type': 'bedroom'}]}, 'rooms[0]'),
+            ({'rooms': [{'length': 3, 'width': 2, 'room_type': 'bedroom'}], 'tiles': [tile.pk, 999999]}, 'tiles'),
+            ({'rooms': [{'length': 3, 'width': 2, 'room_type': 'bedroom'}], 'tiles': 'all'}, 'tiles'),
+        ]
+        for payload, key in cases:
+            with self.subTest(payload=payload):
+                response = self.post('api_estimate', payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(key, response.json()['errors'])
+
+    def test_estimate_prices_inline_and_stored_rooms(self):
+        room, tile, plywood = make_room(), make_tile(), make_plywood()
+        cable = make_component('Cable', 'cable', '1.50', unit='m')
+        response = self.post('api_estimate', {
+            'rooms': [{'id': room.pk}, {'length': 2.5, 'width': 2.5, 'room_type': 'bedroom'}],
+            'tiles': [tile.pk], 'plywoods': [plywood.pk], 'components': [cable.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        first, second = data['estimates']
+        self.assertEqual(first['tiles'], second['tiles'])
+        self.assertEqual(first['tiles'][0]['total_cost'], str(tile.calculate_requirements(room)['total_cost']))
+        self.assertEqual(first['components'][0]['quantity'], 3.5)
+        self.assertEqual(Decimal(data['bill_of_materials']['total_cost']),
+                         2 * sum(Decimal(line['total_cost']) for line in
+                                 first['tiles'] + first['plywoods'] + first['components']))
+
+    def test_catalogue_pages_by_key(self):
+        tiles = [make_tile(f'Tile {i}') for i in range(5)]
+        url = reverse('materiais:api_catalogue', args=['tiles'])
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual([item['id'] for item in first['results']], [tile.pk for tile in tiles[:3]])
+        second = self.client.get(url, {'limit': 3, 'after': first['next']}).json()
+        self.assertEqual([item['id'] for item in second['results']], [tile.pk for tile in tiles[3:]])
+        self.assertIsNone(second['next'])
+
+    def test_catalogue_rejects_bad_queries(self):
+        self.assertEqual(self.client.get(reverse('materiais:api_catalogue', args=['bricks'])).status_code, 404)
+        response = self.client.get(reverse('materiais:api_catalogue', args=['tiles']), {'limit': 'many'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit', response.json()['errors'])
+
+    def test_calculation_history_filters_by_room(self):
+        rooms, tile = [make_room('A'), make_room('B')], make_tile()
+        for room in rooms * 2:
+            TileCalculation.objects.create(room=room, tile=tile, total_boxes=1, total_pieces=10,
+                                           total_cost=Decimal('25.00'), waste_percentage=0)
+        url = reverse('materiais:api_calculation_history', args=['tiles'])
+        results = self.client.get(url, {'room': rooms[0].pk}).json()['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual({item['room_id'] for item in results}, {rooms[0].pk})
+        self.assertGreater(results[0]['id'], results[1]['id'])
@@ -0,0 +1,101 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .. import benchmarks
+from ..layout import tile_layout
+
+
+def result(median_ms, queries=3):
+    return {'median_ms': median_ms, 'min_ms': median_ms, 'queries': queries, 'peak_kib': 10.0}
+
+
+class CompareTests(SimpleTestCase):
+    def test_slower_median_and_extra_queries_regress(self):
+        baseline = {'a': result(10), 'b': result(10), 'c': result(10)}
+        current = {'a': result(11.9), 'b': result(12.1), 'c': result(5, queries=4), 'new': result(99)}
+        self.assertEqual(benchmarks.compare(current, baseline), [
+            ('b', '10.0 ms -> 12.1 ms'),
+            ('c', '3 -> 4 queries'),
+        ])
+        self.assertEqual(benchmarks.compare(current, baseline, tolerance=0.5), [('c', '3 -> 4 queries')])
+
+
+class RunTests(TestCase):
+    def test_cases_on_a_small_dataset(self):
+        benchmarks.build_dataset(rooms=5, tiles=5, plywoods=5, components=5, calculations=30)
+        results = benchmarks.run(repeat=1, only=['requirements.tile', 'form.', 'view.room_list'])
+        self.assertEqual(sorted(results), [
+            'form.electrical_calculation', 'form.plywood_calculation', 'form.tile_calculation',
+            'requirements.tile', 'view.room_list', 'view.room_list.cached',
+        ])
+        for measured in results.values():
+            self.assertEqual(set(measured), {'median_ms', 'min_ms', 'queries', 'peak_kib'})
+        self.assertEqual(results['requirements.tile']['queries'], 0)
+        # Validating a form looks up the chosen room and material.
+        self.assertGreater(results['form.tile_calculation']['queries'], 0)
+        # The warm page still reads its rows but not the totals.
+        self.assertLess(results['view.room_list.cached']['queries'], results['view.room_list']['queries'])
+        self.assertGreater(results['view.room_list.cached']['queries'], 0)
+
+    def test_timed_calls_start_without_cached_layouts(self):
+        sizes = []
+
+        def case():
+            sizes.append(tile_layout.cache_info().currsize)
+            tile_layout(3, 3, 1, 30, 30, 0, 'auto')
+        benchmarks.measure(case, repeat=3)
+        self.assertEqual(sizes, [sizes[0], 0, 0, 0, 0])
+
+    def test_invalid_form_data_fails_the_case(self):
+        with self.assertRaises(RuntimeError):
+            benchmarks.cases()['form.tile_calculation']()
+
+    def test_view_cases_are_cold_unless_cached(self):
+        cases = benchmarks.cases()
+        cache.set('marker', 1)
+        cases['view.tile_list.cached']()
+        self.assertEqual(cache.get('marker'), 1)
+        cases['view.tile_list']()
+        self.assertIsNone(cache.get('marker'))
+
+
+# The command sets up its own test database; here the suite's one is reused.
+@mock.patch('materiais.management.commands.benchmark.teardown_test_environment')
+@mock.patch('materiais.management.commands.benchmark.setup_test_environment')
+@mock.patch.object(connection.creation, 'destroy_test_db')
+@mock.patch.object(connection.creation, 'create_test_db')
+@mock.patch.object(benchmarks, 'build_dataset', return_value=benchmarks.SIZES)
+class BenchmarkCommandTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.baseline = Path(self.directory.name, 'baseline.json')
+        self.baseline.write_text(json.dumps({'results': {'view.room_list': result(10)}}), encoding='utf-8')
+
+    def benchmark(self, **options):
+        stderr = io.StringIO()
+        call_command('benchmark', baseline=str(self.baseline), stdout=io.StringIO(), stderr=stderr, **options)
+        return stderr.getvalue()
+
+    def test_regression_fails_the_command(self, *mocks):
+        with mock.patch.object(benchmarks, 'run', return_value={'view.room_list': result(20)}):
+            with self.assertRaises(CommandError):
+                self.benchmark()
+            self.assertIn('No regressions', self.benchmark(tolerance=1.5))
+
+    def test_output_can_serve_as_the_next_baseline(self, *mocks):
+        output = Path(self.directory.name, 'results.json')
+        with mock.patch.object(benchmarks, 'run', return_value={'view.room_list': result(9)}):
+            self.assertIn('No regressions', self.benchmark(output=str(output)))
+        document = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual(document['results'], {'view.room_list': result(9)})
+        self.assertEqual(document['meta']['sizes'], benchmarks.SIZES)
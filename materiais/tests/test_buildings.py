@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import buildings, estimation
+from ..models import Building, Floor, FloorUnit, UnitTemplate
+from .factories import make_component, make_plywood, make_room, make_tile
+
+
+class BuildingEstimateTests(TestCase):
+    def setUp(self):
+        self.flat = UnitTemplate.objects.create(name='Flat')
+        self.studio = UnitTemplate.objects.create(name='Studio')
+        self.flat_rooms = [
+            make_room('Bedroom', 3.15, 3.0, unit_template=self.flat),
+            make_room('Bath', 2.1, 1.8, room_type='bathroom', unit_template=self.flat),
+        ]
+        self.studio_rooms = [make_room('Studio', 4.5, 3.2, room_type='living_room', unit_template=self.studio)]
+        make_room('Standalone')
+        self.building = Building.objects.create(name='Tower')
+        typical = Floor.objects.create(building=self.building, name='Typical', repeat=4)
+        ground = Floor.objects.create(building=self.building, name='Ground')
+        FloorUnit.objects.create(floor=typical, unit_template=self.flat, quantity=2)
+        FloorUnit.objects.create(floor=typical, unit_template=self.studio, quantity=1)
+        FloorUnit.objects.create(floor=ground, unit_template=self.studio, quantity=3)
+        self.materials = {
+            'tiles': [make_tile(waste_percentage=3)], 'plywoods': [make_plywood()],
+            'components': [make_component(), make_component('Cable', 'cable', '1.37', unit='m')],
+        }
+
+    def test_unit_counts(self):
+        self.assertEqual(buildings.unit_counts(self.building), {self.flat.pk: 8, self.studio.pk: 7})
+
+    def test_matches_every_unit_priced_separately(self):
+        result = buildings.estimate(self.building, **self.materials)
+        expanded = self.flat_rooms * 8 + self.studio_rooms * 7
+        expected = estimation.bill_of_materials(expanded, **self.materials)
+        self.assertEqual(result['total_cost'], expected['total_cost'])
+        self.assertEqual(
+            [(item['id'], item['quantity']) for item in result['items']],
+            [(item['id'], item['quantity']) for item in expected['items']],
+        )
+        self.assertEqual(result['units'], 15)
+        flat, studio = result['templates']
+        self.assertEqual((flat['units'], studio['units']), (8, 7))
+        self.assertEqual(flat['total_cost'], flat['unit_cost'] * 8)
+        self.assertEqual(flat['total_cost'] + studio['total_cost'], result['total_cost'])
+
+    def test_view_query_count_does_not_grow_with_floors(self):
+        url = reverse('materiais:building_estimate')
+        query = {'building': self.building.pk, 'tile': self.materials['tiles'][0].pk, 'format': 'json'}
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url, query).status_code, 200)
+        for i in range(10):
+            floor = Floor.objects.create(building=self.building, name=f'Floor {i}')
+            FloorUnit.objects.create(floor=floor, unit_template=self.flat)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(url, query).json()['units'], 25)
+        self.assertEqual(len(many), len(few))
+
+    def test_room_count_includes_quantity(self):
+        template = UnitTemplate.objects.create(name='Duplex')
+        make_room('Bedroom', quantity=2, unit_template=template)
+        make_room('Bath', room_type='bathroom', unit_template=template)
+        building = Building.objects.create(name='Tower')
+        floor = Floor.objects.create(building=building, name='Typical', repeat=3)
+        FloorUnit.objects.create(floor=floor, unit_template=template, quantity=2)
+        result = buildings.estimate(building)
+        self.assertEqual(result['units'], 6)
+        self.assertEqual(result['room_count'], 18)
+        self.assertEqual(result['templates'][0]['rooms'], 3)
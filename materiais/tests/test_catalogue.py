@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import catalogue
+from .factories import make_tile
+
+
+class CatalogueCachingTests(TestCase):
+    def setUp(self):
+        # The version lives in the cache, which outlives each test's rollback.
+        cache.clear()
+        self.tile = make_tile()
+
+    def assertRevalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.tile.price_per_box = Decimal('30.00')
+        self.tile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_api_catalogue(self):
+        response = self.assertRevalidates(reverse('materiais:api_catalogue', args=['tiles']))
+        self.assertEqual(response.json()['results'][0]['price_per_box'], '30.00')
+
+    def test_cached_list_page(self):
+        response = self.assertRevalidates(reverse('materiais:tile_list'))
+        self.assertContains(response, '30.00')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('materiais:tile_list')), '30.00')
+
+    def test_new_material_retires_cached_page(self):
+        self.client.get(reverse('materiais:tile_list'))
+        make_tile('Brand new tile')
+        self.assertContains(self.client.get(reverse('materiais:tile_list')), 'Brand new tile')
+
+    def test_deleted_material_bumps_the_version(self):
+        before = catalogue.version()
+        self.tile.delete()
+        self.assertGreater(catalogue.version(), before)
+
+
+class CreateViewTests(TestCase):
+    def test_create_redirects_to_the_list(self):
+        forms = {
+            'room': {'name': 'Study', 'length': '3', 'width': '2.5', 'quantity': '1', 'room_type': 'bedroom'},
+            'tile': {
+                'name': 'Slate', 'length': '30', 'width': '30', 'pieces_per_box': '10', 'price_per_box': '25.00',
+                'waste_percentage': '3', 'joint_width': '3', 'orientation': 'auto',
+            },
+            'plywood': {'name': 'Birch', 'length': '2.44', 'width': '1.22', 'price_per_sheet': '40.00',
+                        'waste_percentage': '5'},
+            'electric_component': {'name': 'Switch', 'unit_price': '4.00', 'unit': 'un',
+                                   'component_type': 'switch', 'default_quantity': '1'},
+        }
+        for name, data in forms.items():
+            with self.subTest(name):
+                response = self.client.post(reverse(f'materiais:{name}_create'), data)
+                self.assertRedirects(response, reverse(f'materiais:{name}_list'))
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from .. import cutting
+from ..models import Plywood, Room
+
+
+class CuttingTests(SimpleTestCase):
+    def setUp(self):
+        self.plywood = Plywood(name='Sheet', length=2.44, width=1.22, price_per_sheet=Decimal('40.00'))
+
+    def test_whole_sheets_need_no_cutting(self):
+        room = Room(pk=1, name='A', length=4.88, width=1.22, quantity=1)
+        result = cutting.optimize([room], self.plywood)
+        self.assertEqual((result['full_sheets'], result['cut_sheets'], result['total_sheets']), (2, 0, 2))
+        self.assertEqual(result['total_cost'], Decimal('80.00'))
+
+    def test_offcuts_are_shared_between_rooms(self):
+        rooms = [Room(pk=1, name='A', length=1.22, width=1.22, quantity=1),
+                 Room(pk=2, name='B', length=1.22, width=1.22, quantity=1)]
+        result = cutting.optimize(rooms, self.plywood)
+        self.assertEqual(result['total_sheets'], 1)
+        self.assertTrue(result['exact'])
+        self.assertEqual(result['utilization'], 1.0)
+        self.assertEqual({panel['room'] for panel in result['plans'][0]['panels']}, {1, 2})
+
+    def test_panels_fit_on_their_sheet(self):
+        rooms = [Room(pk=i, name=str(i), length=1.0 + i / 10, width=0.7 + i / 20, quantity=2) for i in range(1, 6)]
+        result = cutting.optimize(rooms, self.plywood)
+        self.assertEqual(sum(len(plan['panels']) for plan in result['plans']), 10)
+        for plan in result['plans']:
+            cells = set()
+            for panel in plan['panels']:
+                self.assertLessEqual(panel['x'] + panel['length'], 2440)
+                self.assertLessEqual(panel['y'] + panel['width'], 1220)
+                # Sampled on a 10 mm grid, no two panels overlap.
+                covered = {(x, y) for x in range(panel['x'], panel['x'] + panel['length'], 10)
+                           for y in range(panel['y'], panel['y'] + panel['width'], 10)}
+                self.assertFalse(cells & covered)
+                cells |= covered
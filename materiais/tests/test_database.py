@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+
+class SqliteTuningTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        # 1 is NORMAL; the in-memory test database cannot switch to WAL itself.
+        self.assertEqual(self.pragma('synchronous'), 1)
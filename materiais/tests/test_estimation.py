@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import estimation
+from ..models import Room, WiringRule
+from .factories import make_component, make_plywood, make_room, make_tile
+
+
+class EstimationTests(TestCase):
+    def setUp(self):
+        # Wiring rules created here are rolled back, so their version must be too.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.rooms = [
+            make_room('Bedroom', 3.15, 3.0),
+            make_room('Kitchen', 4.2, 2.75, quantity=2, room_type='kitchen'),
+            make_room('Lounge', 5.0, 4.0, room_type='living_room'),
+        ]
+        self.tiles = [
+            make_tile('Square', waste_percentage=3),
+            make_tile('Plank', 60, 15, pieces_per_box=8, price_per_box='19.99'),
+        ]
+        self.plywoods = [make_plywood(waste_percentage=5), make_plywood('Small', 1.2, 0.6, '9.95')]
+        self.components = [
+            make_component(),
+            make_component('Cable', 'cable', '1.37', default_quantity=1, unit='m'),
+        ]
+
+    def test_batch_matches_scalar(self):
+        tiles = estimation.tile_matrix(self.rooms, self.tiles)
+        plywoods = estimation.plywood_matrix(self.rooms, self.plywoods)
+        components = estimation.electrical_matrix(self.rooms, self.components)
+        for i, room in enumerate(self.rooms):
+            for j, tile in enumerate(self.tiles):
+                result = tile.calculate_requirements(room)
+                self.assertEqual(result['total_pieces'], tiles['total_pieces'][i, j])
+                self.assertEqual(result['total_boxes'], tiles['total_boxes'][i, j])
+                self.assertEqual(result['total_cost'], estimation.cents_to_decimal(tiles['total_cost_cents'][i, j]))
+            for j, plywood in enumerate(self.plywoods):
+                result = plywood.calculate_requirements(room)
+                self.assertEqual(result['total_sheets'], plywoods['total_sheets'][i, j])
+                self.assertEqual(
+                    result['total_cost'], estimation.cents_to_decimal(plywoods['total_cost_cents'][i, j])
+                )
+            for j, component in enumerate(self.components):
+                result = component.calculate_requirements(room)
+                self.assertEqual(result['quantity'], components['quantity'][i, j])
+                self.assertEqual(
+                    result['total_cost'], estimation.cents_to_decimal(components['total_cost_cents'][i, j])
+                )
+
+    def test_scalar_path_uses_python_ints(self):
+        WiringRule.objects.create(room_type='kitchen', component_type='cable', fixed_length=1.5, area_factor=0.35)
+        WiringRule.objects.create(room_type='living_room', component_type='socket', perimeter_factor=0.3)
+        rooms = self.rooms + [
+            make_room('Hall', polygon=[[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]], length=None, width=None),
+            Room(name='Unsaved', length=3.3, width=2.1, quantity=3, room_type='kitchen'),
+        ]
+        plywoods = estimation.plywood_matrix(rooms, self.plywoods)
+        components = estimation.electrical_matrix(rooms, self.components)
+        for i, room in enumerate(rooms):
+            for j, plywood in enumerate(self.plywoods):
+                result = estimation.plywood_requirements(room, plywood)
+                self.assertIs(type(result['total_sheets']), int)
+                self.assertEqual(result['total_sheets'], plywoods['total_sheets'][i, j])
+                self.assertEqual(
+                    result['total_cost'], estimation.cents_to_decimal(plywoods['total_cost_cents'][i, j])
+                )
+            for j, component in enumerate(self.components):
+                result = estimation.electrical_requirements(room, component)
+                self.assertIs(type(result['quantity']), float if component.component_type == 'cable' else int)
+                self.assertEqual(result['quantity'], components['quantity'][i, j])
+                self.assertEqual(
+                    result['total_cost'], estimation.cents_to_decimal(components['total_cost_cents'][i, j])
+                )
+
+    def test_pairs_match_matrix_diagonal(self):
+        rooms, tiles = self.rooms[:2], self.tiles
+        matrix = estimation.tile_matrix(rooms, tiles)
+        pairs = estimation.tile_pairs(rooms, tiles)
+        self.assertEqual(list(pairs['total_boxes']), [matrix['total_boxes'][0, 0], matrix['total_boxes'][1, 1]])
+
+    def test_tile_requirements(self):
+        # 8 x 8 full tiles, 17 cut pieces from 6 tiles, 73 with 3% breakage.
+        result = self.tiles[0].calculate_requirements(make_room())
+        self.assertEqual(result, {
+            'full_pieces': 64, 'cut_pieces': 17, 'total_pieces': 73, 'total_boxes': 8,
+            'total_cost': Decimal('200.00'),
+        })
+
+    def test_electrical_defaults(self):
+        kitchen = make_room(room_type='kitchen')
+        self.assertEqual(make_component().calculate_requirements(kitchen), {'quantity': 2, 'total_cost': Decimal('6.00')})
+        # Cable runs half the 10 m perimeter, except in bedrooms and living rooms.
+        cable = make_component('Cable', 'cable', '1.50', unit='m')
+        self.assertEqual(cable.calculate_requirements(kitchen), {'quantity': 5.0, 'total_cost': Decimal('7.50')})
+        self.assertEqual(cable.calculate_requirements(make_room()), {'quantity': 3.5, 'total_cost': Decimal('5.25')})
+
+    def test_cable_cost_is_rounded_to_the_cent(self):
+        cable = make_component('Cable', 'cable', '1.37', unit='m')
+        self.assertEqual(cable.calculate_requirements(make_room())['total_cost'], Decimal('4.80'))
+
+    def test_waste_is_rounded_up_in_integers(self):
+        # In floats 50 * 1.1 is 55.000000000000007, which rounds up to 56.
+        self.assertEqual(list(estimation.with_waste([50, 100, 100, 7], [10, 3, 0, 0.1])), [55, 103, 100, 8])
+
+    def test_plywood_sheets_cover_area_and_waste(self):
+        room = make_room('Exact', 2.44, 1.22)
+        self.assertEqual(make_plywood('No waste').calculate_requirements(room)['total_sheets'], 1)
+        self.assertEqual(make_plywood('Waste', waste_percentage=5).calculate_requirements(room)['total_sheets'], 2)
+
+    def test_electrical_count_without_float_rounding(self):
+        # 1.12 x 6.25 m² is 7.000000000000001 in floating point.
+        WiringRule.objects.create(room_type='bedroom', component_type='socket', area_factor=1.12, default_count=0)
+        result = make_component(unit_price='2.00').calculate_requirements(make_room())
+        self.assertEqual(result, {'quantity': 7, 'total_cost': Decimal('14.00')})
+
+    def test_cable_half_cents_round_up(self):
+        # 0.5 m at 0.01 per metre is half a cent.
+        WiringRule.objects.create(room_type='kitchen', component_type='cable', fixed_length=0.5)
+        cable = make_component('Cable', 'cable', '0.01', unit='m')
+        self.assertEqual(cable.calculate_requirements(make_room(room_type='kitchen'))['total_cost'], Decimal('0.01'))
+
+    def test_bill_quantities_are_exact_sums(self):
+        rooms = [make_room(f'Room {i}', 0.1, 0.1, room_type='kitchen') for i in range(3)]
+        cable = make_component('Cable', 'cable', '1.00', unit='m')
+        # Each room needs 0.2 m; three of them are 0.6 m, not 0.6000000000000001.
+        bill = estimation.bill_of_materials(rooms, components=[cable])
+        self.assertEqual(bill['items'][0]['quantity'], 0.6)
+
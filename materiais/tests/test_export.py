@@ -0,0 +1,55 @@
+import csv
+import io
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import export
+from ..estimation import cents_to_decimal
+from ..models import TileCalculation
+from .factories import make_room, make_tile
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        rooms = [make_room('Bedroom'), make_room('Kitchen, east', room_type='kitchen'), make_room('Hall')]
+        tile = make_tile()
+        for index, room in enumerate(rooms * 3):
+            TileCalculation.objects.create(
+                room=room, tile=tile, total_boxes=index + 0.5, total_pieces=10 * index,
+                total_cost=Decimal(index * 1000) + Decimal('0.99'), waste_percentage=3,
+            )
+
+    def test_csv(self):
+        response = self.client.get(reverse('materiais:export_calculations', args=['tile']))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], [name for name, _, _ in export.EXPORTS['tile'][1]])
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[2][3], 'Kitchen, east')
+        self.assertEqual(rows[9][-1], '8000.99')
+
+    def test_columnar_round_trip(self):
+        data = b''.join(export.columnar_chunks('tile', chunk_size=2, row_group_size=4))
+        groups = list(export.read_columnar(io.BytesIO(data)))
+        self.assertEqual([len(group['id']) for group in groups], [4, 4, 1])
+        expected = list(export.rows('tile'))
+        columns = [name for name, _, _ in export.EXPORTS['tile'][1]]
+        decoded = [row for group in groups for row in zip(*(group[name] for name in columns))]
+        for row, original in zip(decoded, expected):
+            record = dict(zip(columns, row))
+            self.assertEqual(record['id'], original[0])
+            self.assertEqual(record['room'], original[3])
+            self.assertEqual(record['total_boxes'], original[6])
+            self.assertEqual(cents_to_decimal(record['total_cost']), original[-1])
+        self.assertEqual(len(decoded), 9)
+
+    def test_truncated_file(self):
+        data = b''.join(export.columnar_chunks('tile'))
+        with self.assertRaises(ValueError):
+            list(export.read_columnar(io.BytesIO(data[:-10])))
+
+    def test_unknown_kind(self):
+        response = self.client.get(reverse('materiais:export_calculations', args=['paint']))
+        self.assertEqual(response.status_code, 404)
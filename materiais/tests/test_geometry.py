@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import cutting, geometry
+from ..estimation import room_columns
+from ..forms import RoomForm
+from ..models import Room
+from .factories import make_plywood, make_room, make_tile
+
+L_SHAPE = [[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]]
+OCTAGON = [[1, 0], [2, 0], [3, 1], [3, 2], [2, 3], [1, 3], [0, 2], [0, 1]]
+
+
+class GeometryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_polygon_metrics(self):
+        self.assertEqual(geometry.polygon_metrics(geometry.parse_polygon(L_SHAPE)), (12.0, 16.0))
+        self.assertEqual(geometry.parse_polygon('0 0; 1 0; 1 1; 0 0'), [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)])
+
+    def test_bad_polygons(self):
+        for value in ('0 0; 1 1', [[0, 0], [1, 'x'], [2, 2]], 'nan 0; 1 0; 1 1'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                geometry.parse_polygon(value)
+
+    def test_equivalent_rectangle(self):
+        self.assertEqual(geometry.equivalent_rectangle(12.0, 16.0), (6.0, 2.0))
+        # Too compact for a rectangle: the square of the same area.
+        self.assertEqual(geometry.equivalent_rectangle(16.0, 15.0), (4.0, 4.0))
+
+    def test_outlined_room_keeps_its_dimensions(self):
+        room = make_room('Hall', polygon=L_SHAPE, length=4, width=4)
+        room.refresh_from_db()
+        self.assertEqual((room.floor_area, room.floor_perimeter), (12.0, 16.0))
+        self.assertEqual((room.length, room.width), (4.0, 4.0))
+        self.assertEqual(geometry.layout_dimensions(room), (6.0, 2.0))
+
+        room.polygon = None
+        room.save()
+        self.assertEqual((room.floor_area, room.floor_perimeter), (16.0, 16.0))
+        self.assertEqual(geometry.layout_dimensions(room), (4.0, 4.0))
+
+    def test_outline_without_dimensions(self):
+        room = make_room('Hall', polygon=L_SHAPE, length=None, width=None)
+        room.refresh_from_db()
+        self.assertIsNone(room.length)
+        self.assertEqual(str(room), 'Hall (12.0m²)')
+        self.assertEqual(geometry.layout_dimensions(room), (6.0, 2.0))
+
+    def test_rectangle_stores_its_geometry(self):
+        room = make_room(length=3.15, width=3)
+        self.assertEqual((room.floor_area, room.floor_perimeter), (9.45, 12.3))
+        self.assertIsNone(room.polygon)
+
+    def test_estimates_use_the_outline(self):
+        # Too compact for a rectangle with the same perimeter: laid out as a square.
+        room = make_room('Octagon', polygon=OCTAGON, length=3, width=3)
+        columns = room_columns(Room.objects.all())
+        self.assertEqual(columns['area'][0], 7.0)
+        self.assertEqual(columns['perimeter'][0], 9.657)
+        self.assertEqual((columns['length'][0], columns['width'][0]), (2.646, 2.646))
+        plywood = make_plywood('Sheet', 1, 1, '10.00', waste_percentage=0)
+        self.assertEqual(plywood.calculate_requirements(room)['total_sheets'], 7)
+
+    def test_form_takes_an_outline(self):
+        form = RoomForm(data={'name': 'Hall', 'quantity': 1, 'room_type': 'living_room',
+                              'polygon': '0 0; 4 0; 4 2; 2 2; 2 4; 0 4'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().floor_area, 12.0)
+
+        form = RoomForm(data={'name': 'Line', 'quantity': 1, 'room_type': 'living_room',
+                              'polygon': '0 0; 4 0'})
+        self.assertIn('polygon', form.errors)
+        form = RoomForm(data={'name': 'Nothing', 'quantity': 1, 'room_type': 'living_room'})
+        self.assertFalse(form.is_valid())
+
+    def test_layout_uses_the_equivalent_rectangle(self):
+        hall = make_room('Hall', polygon=L_SHAPE, length=4, width=4, quantity=2)
+        rectangle = make_room('Rectangle', length=6, width=2, quantity=2)
+        other = make_room('Other', polygon=OCTAGON, length=None, width=None)
+        from_queryset = room_columns(Room.objects.order_by('pk'))
+        from_instances = room_columns([hall, rectangle, other])
+        for key, values in from_instances.items():
+            self.assertEqual(from_queryset[key].tolist(), values.tolist())
+        self.assertEqual(from_queryset['length'].tolist()[:2], [6.0, 6.0])
+
+        tile = make_tile(orientation='lengthwise')
+        self.assertEqual(tile.calculate_requirements(hall), tile.calculate_requirements(rectangle))
+        plywood = make_plywood()
+        self.assertEqual(cutting.optimize([hall], plywood)['total_sheets'],
+                         cutting.optimize([rectangle], plywood)['total_sheets'])
@@ -0,0 +1,101 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import estimation, history, jobs
+from ..models import TileCalculation
+from .factories import make_room, make_tile
+
+
+class HistoryTestCase(TestCase):
+    def setUp(self):
+        self.room = make_room()
+        self.tile = make_tile(waste_percentage=3)
+
+    def calculation(self, **overrides):
+        result = self.tile.calculate_requirements(self.room)
+        fields = {
+            'room': self.room, 'tile': self.tile, 'total_boxes': result['total_boxes'],
+            'total_pieces': result['total_pieces'], 'total_cost': result['total_cost'],
+            'waste_percentage': self.tile.waste_percentage,
+        }
+        fields.update(overrides)
+        return TileCalculation(**fields)
+
+
+class CalculationHistoryTests(HistoryTestCase):
+    def test_save_stamps_the_inputs(self):
+        calculation = self.calculation()
+        calculation.save()
+        self.assertEqual(calculation.input_hash, history.input_hash(self.calculation()))
+        self.assertNotEqual(calculation.input_hash, history.input_hash(self.calculation(waste_percentage=5)))
+
+    def test_resubmitted_form_reuses_the_stored_row(self):
+        calculation = self.calculation()
+        data = {
+            'room': self.room.pk, 'tile': self.tile.pk, 'total_boxes': calculation.total_boxes,
+            'total_pieces': calculation.total_pieces, 'total_cost': calculation.total_cost,
+            'waste_percentage': calculation.waste_percentage,
+        }
+        for _ in range(2):
+            response = self.client.post(reverse('materiais:tile_calculation_create'), data)
+            self.assertRedirects(response, reverse('materiais:tile_list'))
+        self.assertEqual(TileCalculation.objects.count(), 1)
+
+    def test_rerun_job_writes_nothing_new(self):
+        for _ in range(2):
+            jobs.submit([self.room.pk], [self.tile.pk])
+            jobs.work(burst=True)
+        self.assertEqual(TileCalculation.objects.count(), 1)
+
+
+class CompactCalculationsTests(HistoryTestCase):
+    def setUp(self):
+        super().setUp()
+        # Rows from before hashing: bulk_create skips save(), so they have no hash.
+        TileCalculation.objects.bulk_create([
+            self.calculation(), self.calculation(), self.calculation(),
+            self.calculation(total_cost=Decimal('1.00')), self.calculation(total_cost=Decimal('1.00')),
+        ])
+        self.pks = list(TileCalculation.objects.order_by('pk').values_list('pk', flat=True))
+
+    def compact(self, *args):
+        stdout = io.StringIO()
+        call_command('compact_calculations', 'tile', *args, batch_size=2, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_backfill_and_dedup(self):
+        output = self.compact()
+        self.assertIn('hashed 5 rows, removed 3 duplicates and 0 superseded rows', output)
+        kept = TileCalculation.objects.order_by('pk')
+        self.assertEqual([row.pk for row in kept], [self.pks[0], self.pks[3]])
+        current, stale = kept
+        self.assertEqual(current.input_hash, history.input_hash(self.calculation()))
+        # A result the current inputs no longer give keeps a stored-value hash.
+        self.assertTrue(stale.input_hash.startswith(history.LEGACY))
+        self.assertIn('hashed 0 rows, removed 0 duplicates', self.compact())
+
+    def test_prune_superseded(self):
+        self.compact('--prune-superseded')
+        self.assertEqual(list(TileCalculation.objects.values_list('pk', flat=True)), [self.pks[3]])
+
+    def test_dry_run_changes_nothing(self):
+        output = self.compact('--dry-run', '--prune-superseded')
+        self.assertIn('hashed 5 rows, would remove 3 duplicates and 1 superseded rows', output)
+        self.assertEqual(TileCalculation.objects.filter(input_hash='').count(), 5)
+
+    def test_waste_override_is_priced_with_its_own_waste(self):
+        TileCalculation.objects.all().delete()
+        room = make_room('Large', 5, 4)
+        result = estimation.tile_requirements(room, make_tile(waste_percentage=15))
+        TileCalculation.objects.bulk_create([TileCalculation(
+            room=room, tile=self.tile, total_boxes=result['total_boxes'], total_pieces=result['total_pieces'],
+            total_cost=result['total_cost'], waste_percentage=15,
+        )])
+        self.assertNotEqual(result['total_pieces'], self.tile.calculate_requirements(room)['total_pieces'])
+        self.compact()
+        row = TileCalculation.objects.get()
+        self.assertEqual(row.input_hash, history.input_hash(row))
@@ -0,0 +1,51 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import estimation
+from .factories import make_component, make_plywood, make_room, make_tile
+
+
+class BillOfMaterialsTests(TestCase):
+    def setUp(self):
+        self.rooms = [make_room('Bedroom', 3.15, 3.0), make_room('Kitchen', 4.2, 2.75, 2, 'kitchen')]
+        self.tile = make_tile(waste_percentage=3)
+        self.plywood = make_plywood(waste_percentage=5)
+        self.components = [make_component(), make_component('Cable', 'cable', '1.37', 1, 'm')]
+
+    def test_totals_are_exact_sums(self):
+        bill = estimation.bill_of_materials(self.rooms, [self.tile], [self.plywood], self.components)
+        self.assertEqual(len(bill['items']), 4)
+        self.assertEqual(bill['total_cost'], sum(item['total_cost'] for item in bill['items']))
+        self.assertEqual(bill['total_cost'], sum(room['total_cost'] for room in bill['rooms']))
+        for room, line in zip(self.rooms, bill['rooms']):
+            expected = (
+                self.tile.calculate_requirements(room)['total_cost']
+                + self.plywood.calculate_requirements(room)['total_cost']
+                + sum(c.calculate_requirements(room)['total_cost'] for c in self.components)
+            )
+            self.assertEqual(line['total_cost'], expected)
+
+    def query(self, rooms):
+        return {
+            'rooms': [room.pk for room in rooms], 'tile': self.tile.pk, 'plywood': self.plywood.pk,
+            'components': [c.pk for c in self.components], 'format': 'json',
+        }
+
+    def test_query_count_does_not_grow_with_rooms(self):
+        url = reverse('materiais:house_estimate')
+        rooms = self.rooms + [make_room(f'Room {i}') for i in range(20)]
+        # The first request after a change also reads the shared versions.
+        self.client.get(url, self.query(self.rooms))
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url, self.query(self.rooms)).status_code, 200)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url, self.query(rooms))
+        self.assertEqual(len(response.json()['rooms']), 22)
+        self.assertEqual(len(many), len(few))
+
+    def test_unknown_room_is_rejected(self):
+        response = self.client.get(reverse('materiais:house_estimate'), {'rooms': [999], 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rooms', response.json()['errors'])
@@ -0,0 +1,66 @@
+import io
+import json
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Tile
+from .factories import make_tile
+
+
+class ImportCatalogueTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, text):
+        path = Path(self.directory.name, name)
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+
+    def run_import(self, kind, path, **options):
+        stdout = io.StringIO()
+        call_command('import_catalogue', kind, path, stdout=stdout, stderr=io.StringIO(), **options)
+        return stdout.getvalue()
+
+    def test_bad_rows_are_rejected(self):
+        rows = [
+            json.dumps({'name': 'Good', 'length': 30, 'width': 30, 'pieces_per_box': 10, 'price_per_box': '20.00'}),
+            json.dumps({'name': 'Negative', 'length': -30, 'width': 30, 'pieces_per_box': 10, 'price_per_box': '1'}),
+            json.dumps({'name': 'Wasteful', 'length': 30, 'width': 30, 'pieces_per_box': 10,
+                        'price_per_box': '1', 'waste_percentage': 150}),
+            '[1, 2]',
+            '"tile"',
+            '{not json',
+        ]
+        path = self.write('tiles.jsonl', '\n'.join(rows) + '\n')
+        rejects = Path(self.directory.name, 'rejects.jsonl')
+        output = self.run_import('tile', path, rejects=str(rejects))
+        self.assertIn('1 created, 0 updated, 0 unchanged, 5 rejected', output)
+        self.assertEqual(list(Tile.objects.values_list('name', flat=True)), ['Good'])
+        rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+        self.assertEqual([row['line'] for row in rejected], [2, 3, 4, 5, 6])
+        self.assertIn('length', rejected[0]['errors'])
+        self.assertIn('waste_percentage', rejected[1]['errors'])
+        self.assertEqual(rejected[2]['errors'], {'__all__': ['Expected an object.']})
+        self.assertEqual(rejected[3]['errors'], {'__all__': ['Expected an object.']})
+
+    def test_rows_are_upserted_by_name(self):
+        tile = make_tile('Good', price_per_box='20.00')
+        # Columns missing from the file fall back to the model defaults.
+        Tile.objects.create(name='Same', length=30, width=30, pieces_per_box=10, price_per_box=Decimal('20.00'))
+        path = self.write('tiles.csv', 'name,length,width,pieces_per_box,price_per_box\n'
+                                       'Good,30,30,10,40.00\nSame,30,30,10,20.00\nNew,20,20,25,15.50\n')
+        output = self.run_import('tile', path, chunk_size=2)
+        self.assertIn('1 created, 1 updated, 1 unchanged, 0 rejected', output)
+        tile.refresh_from_db()
+        self.assertEqual(tile.price_per_box, Decimal('40.00'))
+        self.assertEqual(Tile.objects.count(), 3)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            self.run_import('tile', str(Path(self.directory.name, 'missing.csv')))
@@ -0,0 +1,72 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Room
+
+
+class ImportRoomsCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, text):
+        path = Path(self.directory.name, name)
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+
+    def test_import_is_all_or_nothing(self):
+        path = self.write('rooms.csv', 'name,length,width,quantity,room_type,polygon\n'
+                                       'Bed,3,4,1,bedroom,\n'
+                                       'L,,,1,living_room,0 0; 4 0; 4 2; 2 2; 2 4; 0 4\n'
+                                       'Bad,3,4,1,garage,\n')
+        with self.assertRaises(CommandError):
+            call_command('import_rooms', path, stderr=io.StringIO())
+        self.assertFalse(Room.objects.exists())
+
+        call_command('import_rooms', path, skip_invalid=True, stdout=io.StringIO(),
+                     stderr=io.StringIO())
+        rooms = {room.name: room for room in Room.objects.all()}
+        self.assertEqual(set(rooms), {'Bed', 'L'})
+        self.assertEqual((rooms['L'].floor_area, rooms['L'].floor_perimeter), (12.0, 16.0))
+        self.assertEqual(len(rooms['L'].polygon), 6)
+
+    def test_rejects_file(self):
+        path = self.write('rooms.jsonl', '{"length": 3, "width": 3, "room_type": "bedroom"}\n'
+                                         '{"length": 3, "room_type": "bedroom"}\n{oops\n')
+        rejects = Path(self.directory.name, 'rejects.jsonl')
+        call_command('import_rooms', path, skip_invalid=True, rejects=str(rejects),
+                     stdout=io.StringIO())
+        self.assertEqual(Room.objects.get().name, 'Room 1')
+        rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+        self.assertEqual([row['line'] for row in rejected], [2, 3])
+        self.assertIn('width', rejected[0]['errors'])
+
+    def test_non_objects_are_rejected(self):
+        path = self.write('rooms.jsonl', '{"length": 3, "width": 3, "room_type": "bedroom"}\n[3, 3]\n')
+        rejects = Path(self.directory.name, 'rejects.jsonl')
+        call_command('import_rooms', path, skip_invalid=True, rejects=str(rejects),
+                     stdout=io.StringIO())
+        self.assertEqual(Room.objects.count(), 1)
+        self.assertEqual(json.loads(rejects.read_text())['line'], 2)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_rooms', str(Path(self.directory.name, 'none.csv')))
+
+
+class RoomImportViewTests(TestCase):
+    def test_upload_creates_rooms(self):
+        upload = SimpleUploadedFile('rooms.json', json.dumps({'rooms': [
+            {'name': 'Bath', 'length': 2, 'width': 2, 'room_type': 'bathroom'},
+        ]}).encode())
+        response = self.client.post(reverse('materiais:room_import'), {'file': upload})
+        self.assertRedirects(response, reverse('materiais:room_list'))
+        self.assertEqual(Room.objects.get().name, 'Bath')
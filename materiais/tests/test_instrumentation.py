@@ -0,0 +1,109 @@
+import asyncio
+import re
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import instrumentation, result_cache
+from .factories import make_room, make_tile
+
+
+def sample(text, name, **labels):
+    """Value of one sample in the Prometheus text output."""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = '^' + re.escape(f'{name}{{{label_text}}}' if labels else name) + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+@override_settings(INSTRUMENTATION={'ENABLED': True})
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        caches[result_cache.CACHE_ALIAS].clear()
+        self.room, self.tile = make_room(), make_tile()
+
+    def estimate(self):
+        return self.client.get(reverse('materiais:house_estimate'), {
+            'rooms': [self.room.pk], 'tile': self.tile.pk, 'format': 'json',
+        })
+
+    def test_requests_queries_and_sections_are_recorded(self):
+        self.estimate()
+        self.estimate()
+        self.client.get(reverse('materiais:house_estimate'), {'rooms': [999], 'format': 'json'})
+        self.client.force_login(get_user_model().objects.create_user('ops', is_staff=True))
+        text = self.client.get(reverse('materiais:metrics')).content.decode()
+        view = 'materiais:house_estimate'
+        self.assertEqual(sample(text, 'http_requests_total', view=view, method='GET', status='200'), 2)
+        self.assertEqual(sample(text, 'http_requests_total', view=view, method='GET', status='400'), 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view=view), 3)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', view=view, le='+Inf'), 3)
+        self.assertGreater(sample(text, 'db_queries_total', view=view), 0)
+        self.assertIsNotNone(sample(text, 'estimate_cache_hits_total'))
+
+    def test_timed_sections(self):
+        # The calculation form prices the submitted pair while binding.
+        self.client.post(reverse('materiais:tile_calculation_create'), {'room': self.room.pk, 'tile': self.tile.pk})
+        # Calls outside a request are not recorded.
+        self.tile.calculate_requirements(self.room)
+        text = instrumentation.render()
+        labels = {'view': 'materiais:tile_calculation_create', 'section': 'tile.calculate_requirements'}
+        self.assertEqual(sample(text, 'section_calls_total', **labels), 1)
+        self.assertGreater(sample(text, 'section_seconds_total', **labels), 0)
+
+    async def test_async_views_stay_async(self):
+        await self.async_client.get(reverse('materiais:api_catalogue', args=['tiles']))
+        text = instrumentation.render()
+        view = 'materiais:api_catalogue'
+        self.assertEqual(sample(text, 'http_requests_total', view=view, method='GET', status='200'), 1)
+        self.assertGreater(sample(text, 'db_queries_total', view=view), 0)
+
+        async def view_function(request):
+            return HttpResponse()
+        middleware = instrumentation.InstrumentationMiddleware(view_function)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            options = {'ENABLED': True, 'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_SLOWER_THAN_MS': 0,
+                       'PROFILE_DIR': directory}
+            with override_settings(INSTRUMENTATION=options):
+                self.client.get(reverse('materiais:room_list'))
+            profiles = list(Path(directory).glob('*.prof'))
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('materiais_room_list', profiles[0].name)
+        self.assertEqual(instrumentation.registry.profiles, 1)
+
+
+class DisabledInstrumentationTests(TestCase):
+    def test_metrics_are_not_served(self):
+        self.assertEqual(self.client.get(reverse('materiais:metrics')).status_code, 404)
+
+
+@override_settings(INSTRUMENTATION={'ENABLED': True, 'METRICS_TOKEN': 's3cret'})
+class MetricsAccessTests(TestCase):
+    def get(self, **headers):
+        return self.client.get(reverse('materiais:metrics'), headers=headers)
+
+    def test_bearer_token(self):
+        self.assertEqual(self.get(authorization='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.get(authorization='Bearer wrong').status_code, 403)
+        self.assertEqual(self.get().status_code, 403)
+
+    def test_staff_users(self):
+        user = get_user_model().objects.create_user('user')
+        self.client.force_login(user)
+        self.assertEqual(self.get().status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(INSTRUMENTATION={'ENABLED': True})
+    def test_no_token_means_staff_only(self):
+        self.assertEqual(self.get(authorization='Bearer ').status_code, 403)
@@ -0,0 +1,99 @@
+import json
+import os
+from unittest import mock
+
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import jobs
+from ..models import EstimateChunk, PlywoodCalculation, TileCalculation
+from .factories import make_plywood, make_room, make_tile
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.rooms = [make_room(f'Room {i}', 2 + i / 10, 3) for i in range(5)]
+        self.tiles = [make_tile('A'), make_tile('B', 60, 60)]
+        self.plywood = make_plywood()
+
+    def submit(self, chunk_size=2):
+        return jobs.submit(
+            [room.pk for room in self.rooms], [tile.pk for tile in self.tiles], [self.plywood.pk],
+            chunk_size=chunk_size,
+        )
+
+    def test_work_prices_every_room(self):
+        job = self.submit()
+        self.assertEqual(job.total_chunks, 3)
+        self.assertEqual(jobs.work(burst=True), 3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(jobs.progress(job)['progress'], 1.0)
+        self.assertEqual(TileCalculation.objects.count(), 10)
+        self.assertEqual(PlywoodCalculation.objects.count(), 5)
+        calculation = TileCalculation.objects.get(room=self.rooms[3], tile=self.tiles[1])
+        self.assertEqual(calculation.total_cost,
+                         self.tiles[1].calculate_requirements(self.rooms[3])['total_cost'])
+
+    def test_claim_hands_out_each_chunk_once(self):
+        self.submit()
+        claimed = [jobs.claim() for _ in range(3)]
+        self.assertEqual(len({chunk.pk for chunk in claimed}), 3)
+        self.assertIsNone(jobs.claim())
+        self.assertEqual(claimed[0].job.status, 'pending')
+        claimed[0].job.refresh_from_db()
+        self.assertEqual(claimed[0].job.status, 'running')
+
+    def test_reclaimed_chunk_is_written_once(self):
+        self.submit(chunk_size=5)
+        stale = jobs.claim()
+        EstimateChunk.objects.filter(pk=stale.pk).update(claimed_at=stale.claimed_at - jobs.STALE_AFTER * 2)
+        fresh = jobs.claim()
+        self.assertEqual((fresh.pk, fresh.attempts), (stale.pk, 2))
+        # The first worker finishing late must not duplicate the results.
+        self.assertFalse(jobs.run(stale))
+        self.assertEqual(TileCalculation.objects.count(), 0)
+        self.assertTrue(jobs.run(fresh))
+        self.assertFalse(jobs.run(fresh))
+        self.assertEqual(TileCalculation.objects.count(), 10)
+
+    def test_failed_chunk_is_retried_then_fails_the_job(self):
+        job = self.submit(chunk_size=5)
+        for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+            chunk = jobs.claim()
+            self.assertEqual(chunk.attempts, attempt)
+            jobs.fail(chunk, 'boom')
+        self.assertIsNone(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'boom'))
+        self.assertEqual(jobs.progress(job)['failed_chunks'], 1)
+
+    def test_api_submits_and_reports_progress(self):
+        response = self.client.post(
+            reverse('materiais:api_submit_job'),
+            json.dumps({'rooms': 'all', 'tiles': [self.tiles[0].pk]}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        jobs.work(burst=True)
+        status = self.client.get(reverse('materiais:api_job_status', args=[job_id])).json()
+        self.assertEqual((status['status'], status['rooms'], status['progress']), ('done', 5, 1.0))
+        self.assertEqual(self.client.get(reverse('materiais:api_job_status', args=[job_id + 1])).status_code, 404)
+
+
+def _child_state():
+    return os.getpid(), apps.ready
+
+
+class WorkerPoolTests(SimpleTestCase):
+    def test_init_worker_drops_inherited_connections(self):
+        with mock.patch('materiais.jobs.connections') as connections:
+            jobs.init_worker()
+        connections.close_all.assert_called_once_with()
+
+    def test_children_start_with_django_set_up(self):
+        with jobs.worker_pool(1) as pool:
+            pid, ready = pool.submit(_child_state).result()
+        self.assertNotEqual(pid, os.getpid())
+        self.assertTrue(ready)
@@ -0,0 +1,75 @@
+import importlib
+
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+
+from .. import versions
+from ..forms import TileForm
+from ..layout import tile_layout, tile_layout_arrays
+from ..models import Tile
+from .factories import make_tile
+
+
+class LayoutTests(SimpleTestCase):
+    def test_whole_tiles(self):
+        layout = tile_layout(3.0, 3.0, 1, 30, 30)
+        self.assertEqual((layout.full_pieces, layout.cut_pieces, layout.pieces), (100, 0, 100))
+
+    def test_cut_strips_share_tiles(self):
+        # Ten 15 cm strips along the far edge, two from each tile.
+        layout = tile_layout(3.15, 3.0, 1, 30, 30)
+        self.assertEqual((layout.full_pieces, layout.cut_pieces, layout.pieces), (100, 10, 105))
+
+    def test_cuts_are_pooled_across_copies(self):
+        one = tile_layout(3.15, 3.0, 1, 30, 30)
+        three = tile_layout(3.15, 3.0, 3, 30, 30)
+        self.assertEqual(three.full_pieces, 3 * one.full_pieces)
+        self.assertEqual(three.pieces, 300 + 15)
+
+    def test_joints_reduce_full_tiles(self):
+        # 300 mm tiles with a 3 mm joint: 2997 mm holds only 9 full tiles along each side.
+        layout = tile_layout(3.0, 3.0, 1, 30, 30, 3.0)
+        self.assertEqual(layout.full_pieces, 81)
+
+    def test_auto_orientation_picks_fewer_pieces(self):
+        auto = tile_layout(3.0, 1.0, 1, 60, 15, 0.0, 'auto')
+        for orientation in ('lengthwise', 'crosswise'):
+            self.assertLessEqual(auto.pieces, tile_layout(3.0, 1.0, 1, 60, 15, 0.0, orientation).pieces)
+
+    def test_arrays_match_scalar(self):
+        rooms = [(3.15, 3.0, 1), (4.2, 2.75, 2), (1.1, 0.9, 1)]
+        result = tile_layout_arrays(
+            [r[0] for r in rooms], [r[1] for r in rooms], [r[2] for r in rooms], 60, 15, 2.0, 'auto'
+        )
+        for index, room in enumerate(rooms):
+            layout = tile_layout(*room, 60, 15, 2.0, 'auto')
+            self.assertEqual(layout.pieces, result['pieces'][index])
+            self.assertEqual(layout.orientation, result['orientation'][index])
+
+    def test_zero_sized_tiles_are_rejected(self):
+        with self.assertRaises(ValueError):
+            tile_layout(3.0, 3.0, 1, 0, 30)
+        with self.assertRaises(ValueError):
+            tile_layout_arrays([3.0, 3.0], [3.0, 3.0], [1, 1], [30, 30], [30, 0])
+
+
+class TileDimensionTests(TestCase):
+    def test_form_rejects_zero_sized_tiles(self):
+        form = TileForm(data={'name': 'Flat', 'length': 0, 'width': 30, 'pieces_per_box': 10,
+                              'price_per_box': '20.00', 'waste_percentage': 3, 'joint_width': 3,
+                              'orientation': 'auto'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['length'], ['Must be greater than zero.'])
+
+
+class TileWasteDefaultMigrationTests(TestCase):
+    def test_tiles_at_the_old_default_move_to_the_new_one(self):
+        old, custom = make_tile('Old', waste_percentage=10), make_tile('Custom', waste_percentage=7)
+        versions.bump(versions.CATALOGUE)
+        before = versions.current(versions.CATALOGUE)[0]
+        migration = importlib.import_module('materiais.migrations.0013_tile_waste_default')
+        migration.move_tiles_to_new_default(apps, None)
+        self.assertEqual(Tile.objects.get(pk=old.pk).waste_percentage, 3)
+        self.assertEqual(Tile.objects.get(pk=custom.pk).waste_percentage, 7)
+        versions._seen['at'] = None
+        self.assertEqual(versions.current(versions.CATALOGUE)[0], before + 1)
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Room
+from .factories import make_tile
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Room.objects.bulk_create([
+            Room(name=f'Room {i}', length=3, width=3, quantity=1, room_type='bedroom') for i in range(60)
+        ])
+        self.pks = list(Room.objects.order_by('pk').values_list('pk', flat=True))
+
+    def test_room_list_pages(self):
+        first = self.client.get(reverse('materiais:room_list'))
+        self.assertEqual([room.pk for room in first.context['rooms']], self.pks[:50])
+        self.assertIsNone(first.context['previous_cursor'])
+        self.assertEqual(first.context['next_cursor'], self.pks[49])
+
+        second = self.client.get(reverse('materiais:room_list'), {'after': self.pks[49]})
+        self.assertEqual([room.pk for room in second.context['rooms']], self.pks[50:])
+        self.assertIsNone(second.context['next_cursor'])
+        self.assertEqual(second.context['previous_cursor'], self.pks[50])
+
+        back = self.client.get(reverse('materiais:room_list'), {'before': self.pks[50]})
+        self.assertEqual([room.pk for room in back.context['rooms']], self.pks[:50])
+        self.assertIsNone(back.context['previous_cursor'])
+
+    def test_bad_cursor_shows_the_first_page(self):
+        response = self.client.get(reverse('materiais:room_list'), {'after': 'x'})
+        self.assertEqual(response.context['rooms'][0].pk, self.pks[0])
+
+    def test_deep_page_costs_the_same(self):
+        # The first request also computes the room totals, cached afterwards.
+        self.client.get(reverse('materiais:room_list'))
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse('materiais:room_list'))
+        with CaptureQueriesContext(connection) as last:
+            self.client.get(reverse('materiais:room_list'), {'after': self.pks[49]})
+        self.assertEqual(len(first), len(last))
+        self.assertNotIn('COUNT(', ' '.join(query['sql'] for query in last))
+        self.assertNotIn('OFFSET', ' '.join(query['sql'] for query in last))
+
+    def test_tile_list_pages(self):
+        tiles = [make_tile(f'Tile {i}').pk for i in range(3)]
+        response = self.client.get(reverse('materiais:tile_list'), {'after': tiles[0]})
+        self.assertEqual([tile.pk for tile in response.context['tiles']], tiles[1:])
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.core.cache import cache, caches
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import result_cache, versions
+from ..forms import TileCalculationForm
+from ..models import DataVersion, Room
+from .factories import make_room, make_tile
+
+
+class PreviewTests(TestCase):
+    def setUp(self):
+        # Snapshot versions live in the cache, which outlives each test's rollback.
+        cache.clear()
+        caches[result_cache.CACHE_ALIAS].clear()
+        self.room, self.tile = make_room(), make_tile(waste_percentage=3)
+        self.url = reverse('materiais:calculation_preview', args=['tile'])
+
+    def preview(self, **params):
+        return self.client.get(self.url, {'room': self.room.pk, 'material': self.tile.pk, **params})
+
+    def test_matches_the_calculation(self):
+        result = self.preview().json()
+        expected = self.tile.calculate_requirements(self.room)
+        self.assertEqual(result['total_pieces'], expected['total_pieces'])
+        self.assertEqual(Decimal(result['total_cost']), expected['total_cost'])
+        self.assertEqual(result['waste_percentage'], 3)
+
+    def test_waste_override(self):
+        self.tile.waste_percentage = 20
+        expected = self.tile.calculate_requirements(self.room)
+        result = self.preview(waste_percentage='20').json()
+        self.assertEqual((result['total_pieces'], result['waste_percentage']), (expected['total_pieces'], 20))
+
+    def test_warm_preview_runs_no_queries(self):
+        self.preview()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.preview().status_code, 200)
+
+    def test_room_edit_refreshes_the_snapshot(self):
+        before = self.preview().json()['total_pieces']
+        self.room.length = 5
+        self.room.save()
+        self.assertGreater(self.preview().json()['total_pieces'], before)
+
+    @override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+    def test_room_changed_by_another_process_refreshes_the_snapshot(self):
+        before = self.preview().json()['total_pieces']
+        # An import in another process: rows updated, shared rooms counter bumped.
+        Room.objects.filter(pk=self.room.pk).update(length=5)
+        DataVersion.objects.filter(name=versions.ROOMS).update(value=F('value') + 1)
+        cache.clear()
+        self.assertGreater(self.preview().json()['total_pieces'], before)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.preview(room='x').status_code, 400)
+        self.assertEqual(self.preview(waste_percentage='lots').status_code, 400)
+        self.assertEqual(self.preview(material=999999).status_code, 404)
+        self.assertEqual(self.client.get(reverse('materiais:calculation_preview', args=['paint'])).status_code, 404)
+
+    def test_waste_out_of_range_is_rejected(self):
+        for waste in ('nan', 'inf', '-150', '101'):
+            with self.subTest(waste=waste):
+                self.assertEqual(self.preview(waste_percentage=waste).status_code, 400)
+        self.assertEqual(self.preview(waste_percentage='100').json()['waste_percentage'], 100)
+
+
+class RecalculatedFormTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.room, self.tile = make_room(), make_tile(waste_percentage=3)
+
+    def test_posted_results_are_recomputed(self):
+        form = TileCalculationForm(data={
+            'room': self.room.pk, 'tile': self.tile.pk, 'total_boxes': 1, 'total_pieces': 1, 'total_cost': '0.01',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        calculation = form.save()
+        expected = self.tile.calculate_requirements(self.room)
+        self.assertEqual(calculation.total_pieces, expected['total_pieces'])
+        self.assertEqual(calculation.total_cost, expected['total_cost'])
+        self.assertEqual(calculation.waste_percentage, 3)
+
+    def test_bad_waste_is_rejected(self):
+        form = TileCalculationForm(data={'room': self.room.pk, 'tile': self.tile.pk, 'waste_percentage': -150})
+        self.assertFalse(form.is_valid())
+        self.assertIn('waste_percentage', form.errors)
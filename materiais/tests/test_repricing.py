@@ -0,0 +1,178 @@
+import copy
+import io
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import repricing
+from ..models import (
+    Building, ElectricalCalculation, Floor, FloorUnit, Tile, TileCalculation, UnitTemplate, WiringRule,
+)
+from .factories import make_component, make_room, make_tile
+
+
+def tile_calculation(room, tile, waste_percentage=None):
+    """Store the result for ``tile``, optionally priced with another waste."""
+    priced = copy.copy(tile)
+    if waste_percentage is not None:
+        priced.waste_percentage = waste_percentage
+    result = priced.calculate_requirements(room)
+    return TileCalculation.objects.create(
+        room=room, tile=tile, total_boxes=result['total_boxes'], total_pieces=result['total_pieces'],
+        total_cost=result['total_cost'], waste_percentage=priced.waste_percentage,
+    )
+
+
+class RepricingTests(TestCase):
+    def setUp(self):
+        # Wiring rules created here are rolled back, so their version must be too.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.room, self.tile = make_room(), make_tile()
+        self.calculation = tile_calculation(self.room, self.tile)
+
+    def stored(self, calculation):
+        return type(calculation).objects.get(pk=calculation.pk)
+
+    def save(self, instance):
+        """Save ``instance`` and run the repricing scheduled for after the commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_material_edit_reprices_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.tile.price_per_box = Decimal('50.00')
+            self.tile.save()
+            # Nothing is rewritten before the transaction commits.
+            self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost * 2)
+
+    def test_rolled_back_edit_reprices_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.tile.price_per_box = Decimal('50.00')
+                self.tile.save()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost)
+
+    def test_rows_keep_their_own_waste(self):
+        wasteful = tile_calculation(self.room, self.tile, waste_percentage=20)
+        self.tile.price_per_box = Decimal('50.00')
+        self.save(self.tile)
+        self.tile.waste_percentage = 20
+        expected = self.tile.calculate_requirements(self.room)
+        wasteful = self.stored(wasteful)
+        self.assertEqual((wasteful.total_pieces, wasteful.total_cost), (expected['total_pieces'], expected['total_cost']))
+
+    def test_saves_without_input_changes_do_nothing(self):
+        TileCalculation.objects.filter(pk=self.calculation.pk).update(total_cost=Decimal('1.00'))
+        self.tile.name = 'Renamed'
+        self.save(self.tile)
+        self.assertEqual(self.stored(self.calculation).total_cost, Decimal('1.00'))
+
+    def test_loaded_rows_are_not_read_again(self):
+        tile = Tile.objects.get(pk=self.tile.pk)
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            tile.name = 'Renamed'
+            tile.save()
+        self.assertEqual(callbacks, [])
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'materiais_tile' in q['sql']])
+
+        # The next save compares against what was saved, not what was loaded.
+        tile.price_per_box = Decimal('50.00')
+        self.save(tile)
+        tile.name = 'Renamed again'
+        with self.captureOnCommitCallbacks() as callbacks:
+            tile.save()
+        self.assertEqual(callbacks, [])
+
+    def test_room_edit_reprices(self):
+        self.room.length = 5.0
+        self.save(self.room)
+        self.assertGreater(self.stored(self.calculation).total_cost, self.calculation.total_cost)
+
+    def test_legacy_rows_are_left_alone(self):
+        TileCalculation.objects.filter(pk=self.calculation.pk).update(input_hash='')
+        self.tile.price_per_box = Decimal('50.00')
+        self.save(self.tile)
+        self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost)
+
+    def test_wiring_rule_reprices_electrical_rows(self):
+        component = make_component(unit_price='1.00')
+        calculation = ElectricalCalculation.objects.create(
+            room=self.room, component=component, **component.calculate_requirements(self.room)
+        )
+        self.save(WiringRule(room_type='bedroom', component_type='socket', default_count=5))
+        self.assertEqual(self.stored(calculation).quantity, 5)
+
+    def test_moved_wiring_rule_reprices_both_room_types(self):
+        component = make_component(unit_price='1.00')
+        kitchen = make_room('Kitchen', room_type='kitchen')
+        calculations = {
+            room.room_type: ElectricalCalculation.objects.create(
+                room=room, component=component, **component.calculate_requirements(room)
+            )
+            for room in (self.room, kitchen)
+        }
+        rule = WiringRule(room_type='bedroom', component_type='socket', default_count=5)
+        self.save(rule)
+        self.assertEqual(self.stored(calculations['bedroom']).quantity, 5)
+
+        rule.room_type = 'kitchen'
+        self.save(rule)
+        self.assertEqual(self.stored(calculations['bedroom']).quantity, 2)
+        self.assertEqual(self.stored(calculations['kitchen']).quantity, 5)
+
+    def test_dry_run_reports_the_delta_per_room(self):
+        other = make_room('Other')
+        tile_calculation(other, self.tile)
+        TileCalculation.objects.update(total_cost=Decimal('100.00'))
+        report = repricing.recompute('tile', dry_run=True, tile_id=self.tile.pk)
+        cost = self.calculation.total_cost
+        self.assertEqual((report['rows'], report['changed'], report['delta']), (2, 2, 2 * (cost - 100)))
+        self.assertEqual(report['rooms'], {self.room.pk: cost - 100, other.pk: cost - 100})
+        self.assertEqual(TileCalculation.objects.filter(total_cost=Decimal('100.00')).count(), 2)
+
+    def test_report_per_building(self):
+        flat = UnitTemplate.objects.create(name='Flat')
+        bedroom, bath = make_room('Bedroom', unit_template=flat), make_room('Bath', 3, 2, unit_template=flat)
+        tower, annex = Building.objects.create(name='Tower'), Building.objects.create(name='Annex')
+        FloorUnit.objects.create(floor=Floor.objects.create(building=tower, name='Typical', repeat=3),
+                                 unit_template=flat, quantity=2)
+        FloorUnit.objects.create(floor=Floor.objects.create(building=annex, name='Ground'), unit_template=flat)
+        Building.objects.create(name='Empty')
+        for room in (bedroom, bath):
+            tile_calculation(room, self.tile)
+        TileCalculation.objects.update(total_cost=Decimal('100.00'))
+        report = repricing.recompute('tile', dry_run=True)
+        flat_delta = report['rooms'][bedroom.pk] + report['rooms'][bath.pk]
+        # The standalone room is in the total but in no building.
+        self.assertEqual(report['delta'], flat_delta + report['rooms'][self.room.pk])
+        self.assertEqual(report['buildings'], {tower.pk: 6 * flat_delta, annex.pk: flat_delta})
+
+        stdout = io.StringIO()
+        call_command('recompute_calculations', 'tile', '--dry-run', stdout=stdout)
+        self.assertIn(f'By building:\n  Tower: {6 * flat_delta:+}\n  Annex: {flat_delta:+}', stdout.getvalue())
+
+    def test_command(self):
+        TileCalculation.objects.update(total_cost=Decimal('100.00'))
+        stdout = io.StringIO()
+        call_command('recompute_calculations', 'tile', stdout=stdout)
+        self.assertIn('tile: checked 1 rows, changed 1', stdout.getvalue())
+        self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost)
+
+    def test_catalogue_import_reprices(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'tiles.csv')
+            path.write_text('name,length,width,pieces_per_box,price_per_box,waste_percentage,joint_width\n'
+                            f'{self.tile.name},30,30,10,50.00,0,0\n', encoding='utf-8')
+            call_command('import_catalogue', 'tile', str(path), stdout=io.StringIO())
+        self.assertEqual(self.stored(self.calculation).total_cost, self.calculation.total_cost * 2)
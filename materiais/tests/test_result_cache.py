@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from .. import result_cache
+from .factories import make_room, make_tile
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        caches[result_cache.CACHE_ALIAS].clear()
+        result_cache.reset_stats()
+        self.room = make_room()
+        self.tile = make_tile()
+
+    def test_hit_after_miss(self):
+        first = result_cache.cached_requirements(self.tile, self.room)
+        second = result_cache.cached_requirements(self.tile, self.room)
+        self.assertEqual(first, second)
+        self.assertEqual(result_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_material_save_invalidates(self):
+        result_cache.cached_requirements(self.tile, self.room)
+        self.tile.save()
+        result_cache.cached_requirements(self.tile, self.room)
+        self.assertEqual(result_cache.stats()['misses'], 2)
+
+        self.tile.price_per_box = Decimal('30.00')
+        self.tile.save()
+        result = result_cache.cached_requirements(self.tile, self.room)
+        self.assertEqual(result['total_cost'], self.tile.calculate_requirements(self.room)['total_cost'])
+        self.assertEqual(result['total_cost'], Decimal('210.00'))
+
@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import estimation
+from ..models import Room
+from .factories import make_room
+
+
+class RoomQuerySetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.rooms = [make_room('A', 3, 2), make_room('B', 4.5, 2.5, quantity=3, room_type='kitchen')]
+
+    def test_annotations_match_the_properties(self):
+        for room in Room.objects.with_area().with_perimeter().order_by('pk'):
+            self.assertAlmostEqual(room.total_area, room.area)
+            self.assertAlmostEqual(room.total_perimeter, room.perimeter)
+
+    def test_totals(self):
+        self.assertEqual(Room.objects.totals(), {'area': 6 + 33.75, 'perimeter': 10 + 42.0})
+        self.assertEqual(Room.objects.none().totals(), {'area': 0.0, 'perimeter': 0.0})
+        self.assertEqual(Room.objects.with_area().filter(total_area__gt=10).get(), self.rooms[1])
+
+    def test_room_columns_from_a_queryset(self):
+        from_queryset = estimation.room_columns(Room.objects.order_by('pk'))
+        from_instances = estimation.room_columns(self.rooms)
+        for key, values in from_instances.items():
+            self.assertEqual(from_queryset[key].tolist(), values.tolist())
+
+    def test_room_list_totals_follow_changes(self):
+        response = self.client.get(reverse('materiais:room_list'))
+        self.assertAlmostEqual(response.context['totals']['area'], 39.75)
+        make_room('Extra', 2, 2)
+        response = self.client.get(reverse('materiais:room_list'))
+        self.assertAlmostEqual(response.context['totals']['area'], 43.75)
+
+    def test_room_list_totals_are_computed_once_per_change(self):
+        url = reverse('materiais:room_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertAlmostEqual(response.context['totals']['area'], 39.75)
+        self.assertFalse(any('SUM(' in query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,63 @@
+import itertools
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import scenarios
+from .factories import make_component, make_plywood, make_room, make_tile
+
+
+class ScenarioTests(TestCase):
+    def setUp(self):
+        self.rooms = [
+            make_room('Bedroom', 3.15, 3.0), make_room('Bedroom 2', 2.8, 2.6),
+            make_room('Kitchen', 4.2, 2.75, room_type='kitchen'),
+        ]
+        self.tiles = [make_tile(f'Tile {i}', 20 + 10 * i, 30, price_per_box=f'{15 + 7 * i}.00') for i in range(4)]
+        self.plywoods = [make_plywood(f'Sheet {i}', price_per_sheet=f'{30 + 4 * i}.00') for i in range(3)]
+        self.socket = make_component()
+
+    def test_matches_brute_force(self):
+        choices = {
+            'bedroom': {'tile': self.tiles, 'plywood': self.plywoods},
+            '*': {'tile': self.tiles[:2]},
+        }
+        result = scenarios.compare(self.rooms, choices, [self.socket], limit=5)
+        components = sum(self.socket.calculate_requirements(room)['total_cost'] for room in self.rooms)
+
+        def cost(material, rooms):
+            return sum(material.calculate_requirements(room)['total_cost'] for room in rooms)
+
+        bedrooms, kitchens = self.rooms[:2], self.rooms[2:]
+        totals = sorted(
+            cost(tile, bedrooms) + cost(plywood, bedrooms) + cost(kitchen_tile, kitchens) + components
+            for tile, plywood, kitchen_tile in itertools.product(self.tiles, self.plywoods, self.tiles[:2])
+        )
+        self.assertEqual(result['combinations'], 4 * 3 * 2)
+        self.assertEqual(result['components_cost'], components)
+        self.assertEqual([scenario['total_cost'] for scenario in result['scenarios']], totals[:5])
+        self.assertEqual([scenario['rank'] for scenario in result['scenarios']], [1, 2, 3, 4, 5])
+
+    def post(self, payload):
+        return self.client.post(reverse('materiais:api_compare_scenarios'), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_api_rejects_bad_choices(self):
+        room = {'id': self.rooms[0].pk}
+        cases = [
+            ({'rooms': [room], 'choices': {'attic': {}}}, 'choices'),
+            ({'rooms': [room], 'choices': {'bedroom': []}}, 'choices.bedroom'),
+            ({'rooms': [room], 'choices': {'bedroom': {'tiles': [999999]}}}, 'tiles'),
+            ({'rooms': [room], 'choices': {'bedroom': {}}, 'limit': 'ten'}, 'limit'),
+        ]
+        for payload, key in cases:
+            with self.subTest(payload=payload):
+                response = self.post(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(key, response.json()['errors'])
+
+    def test_api_ranks_cheapest_first(self):
+        cheap, dear = make_tile('Cheap', price_per_box='10.00'), make_tile('Dear', price_per_box='50.00')
+        response = self.post({'rooms': [{'id': self.rooms[0].pk}], 'choices': {'*': {'tiles': [dear.pk, cheap.pk]}}})
+        self.assertEqual([s['choices']['bedroom']['tile'] for s in response.json()['scenarios']], [cheap.pk, dear.pk])
@@ -0,0 +1,61 @@
+import random
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import search
+from ..estimation import tile_matrix
+from .factories import make_plywood, make_room, make_tile
+
+
+def brute_force(materials, rooms):
+    costs = [(sum(m.calculate_requirements(room)['total_cost'] for room in rooms), m.pk) for m in materials]
+    return sorted(costs)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        generator = random.Random(11)
+        self.rooms = [make_room('Bedroom', 3.15, 3.0), make_room('Kitchen', 4.2, 2.75, 2, 'kitchen')]
+        self.tiles = [
+            make_tile(f'Tile {i}', generator.randint(10, 80), generator.randint(10, 80),
+                      pieces_per_box=generator.randint(4, 20),
+                      price_per_box=f'{generator.randint(500, 9000) / 100:.2f}',
+                      waste_percentage=generator.choice([0, 3, 5]), joint_width=generator.choice([0, 2, 3]))
+            for i in range(120)
+        ]
+
+    def test_pruned_tiles_match_brute_force(self):
+        priced = []
+
+        def engine(rooms, tiles):
+            priced.append(len(tiles['length']))
+            return tile_matrix(rooms, tiles)
+
+        with mock.patch.object(search, 'FIRST_BLOCK', 8), mock.patch.object(search, 'tile_matrix', engine):
+            results = search.cheapest_tiles(self.rooms, limit=5)
+        expected = brute_force(self.tiles, self.rooms)[:5]
+        self.assertEqual([(row['total_cost'], row['id']) for row in results], expected)
+        # The lower bound stopped the search before the whole catalogue was laid out.
+        self.assertLess(sum(priced), len(self.tiles))
+
+    def test_filters_are_applied(self):
+        results = search.cheapest_tiles(self.rooms, limit=100, max_length=40, max_price=Decimal('30'))
+        expected = brute_force(
+            [tile for tile in self.tiles if tile.length <= 40 and tile.price_per_box <= 30], self.rooms
+        )
+        self.assertEqual([(row['total_cost'], row['id']) for row in results], expected)
+
+    def test_plywoods_match_brute_force(self):
+        plywoods = [make_plywood(f'Sheet {i}', 1.2 + i / 10, 0.6 + i / 20, f'{10 + 3 * i}.00', i % 3)
+                    for i in range(12)]
+        results = search.cheapest_plywoods(self.rooms, limit=4)
+        self.assertEqual([(row['total_cost'], row['id']) for row in results], brute_force(plywoods, self.rooms)[:4])
+
+    def test_view(self):
+        response = self.client.get(reverse('materiais:material_search'), {
+            'rooms': [room.pk for room in self.rooms], 'kind': 'tile', 'limit': 3, 'format': 'json',
+        })
+        self.assertEqual(len(response.json()['results']), 3)
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import versions
+from ..models import DataVersion
+from .factories import make_tile
+
+
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class VersionTests(TestCase):
+    def setUp(self):
+        versions._seen['at'] = None
+        self.addCleanup(versions._seen.update, at=None)
+
+    def test_counter_survives_a_cleared_cache(self):
+        make_tile()
+        before = versions.token(versions.CATALOGUE)
+        cache.clear()
+        self.assertEqual(versions.token(versions.CATALOGUE), before)
+        self.assertGreater(versions.current(versions.CATALOGUE)[0], 0)
+
+    def test_bump_from_another_process_is_seen(self):
+        versions.bump(versions.CATALOGUE)
+        before = versions.token(versions.CATALOGUE)
+        # What another process's bump looks like from here: only the row changes.
+        DataVersion.objects.filter(name=versions.CATALOGUE).update(value=F('value') + 1)
+        self.assertNotEqual(versions.token(versions.CATALOGUE), before)
+
+    def test_etag_is_stable_until_the_catalogue_changes(self):
+        url = reverse('materiais:tile_list')
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        make_tile()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from .. import estimation, versions, wiring
+from ..models import DataVersion, WiringRule
+from .factories import make_component, make_room
+
+
+class WiringRuleTests(TestCase):
+    def setUp(self):
+        # Rules created here are rolled back, so the version must be too.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.cable = make_component('Cable', 'cable', '1.00', default_quantity=1, unit='m')
+        self.socket = make_component()
+
+    def test_seeded_rules_keep_the_old_cable_runs(self):
+        self.assertEqual(self.cable.calculate_requirements(make_room())['quantity'], 3.5)
+        self.assertEqual(self.cable.calculate_requirements(make_room(room_type='living_room'))['quantity'], 4.5)
+        # Other room types run cable along half the perimeter.
+        self.assertEqual(self.cable.calculate_requirements(make_room(room_type='kitchen'))['quantity'], 5.0)
+
+    def test_new_rule_applies_without_restart(self):
+        kitchen = make_room(room_type='kitchen', quantity=2)
+        self.assertEqual(self.socket.calculate_requirements(kitchen)['quantity'], 4)
+        rule = WiringRule.objects.create(room_type='kitchen', component_type='socket', perimeter_factor=0.4,
+                                         default_count=1)
+        # One socket plus 0.4 per metre of the 10 m perimeter, per copy.
+        self.assertEqual(self.socket.calculate_requirements(kitchen), {'quantity': 10, 'total_cost': Decimal('30.00')})
+        rule.delete()
+        self.assertEqual(self.socket.calculate_requirements(kitchen)['quantity'], 4)
+
+    def test_matrix_uses_one_table(self):
+        rooms = [make_room(), make_room(room_type='kitchen'), make_room(room_type='balcony')]
+        table = wiring.rule_table()
+        result = estimation.electrical_matrix(rooms, [self.cable, self.socket], rules=table)
+        self.assertEqual(result['quantity'][:, 0].tolist(), [3.5, 5.0, 5.0])
+        self.assertEqual(result['quantity'][:, 1].tolist(), [2, 2, 2])
+        self.assertIs(wiring.rule_table(), table)
+
+    @override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+    def test_rule_saved_by_another_process_reloads_the_table(self):
+        kitchen = make_room(room_type='kitchen')
+        wiring.bump_version()
+        self.assertEqual(self.socket.calculate_requirements(kitchen)['quantity'], 2)
+        # Another process writes the rule and bumps the shared counter; this
+        # process's cache knows nothing of it.
+        WiringRule.objects.bulk_create([WiringRule(room_type='kitchen', component_type='socket', default_count=5)])
+        DataVersion.objects.filter(name=versions.WIRING).update(value=F('value') + 1)
+        cache.clear()
+        self.assertEqual(self.socket.calculate_requirements(kitchen)['quantity'], 5)
@@ -1,14 +1,18 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'materiais'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('house-estimate/', views.house_estimate, name='house_estimate'),
+    path('building-estimate/', views.building_estimate, name='building_estimate'),
+    path('material-search/', views.material_search, name='material_search'),
     
     # Room URLs
     path('rooms/', views.RoomListView.as_view(), name='room_list'),
     path('rooms/create/', views.RoomCreateView.as_view(), name='room_create'),
+    path('rooms/import/', views.room_import, name='room_import'),
     
     # Tile URLs
     path('tiles/', views.TileListView.as_view(), name='tile_list'),
@@ -34,4 +38,25 @@ urlpatterns = [
     path('electrical-calculations/create/', 
          views.ElectricalCalculationCreateView.as_view(), 
          name='electrical_calculation_create'),
+
+    # JSON API
+    path('api/estimate/', api.estimate, name='api_estimate'),
+    path('api/scenarios/', api.compare_scenarios, name='api_compare_scenarios'),
+    path('api/catalogue/<str:kind>/', api.catalogue, name='api_catalogue'),
+    path('api/calculations/<str:kind>/', api.calculation_history, name='api_calculation_history'),
+    path('api/jobs/', api.submit_job, name='api_submit_job'),
+    path('api/jobs/<int:pk>/', api.job_status, name='api_job_status'),
+
+    # Prometheus metrics (materiais.instrumentation)
+    path('metrics/', views.metrics, name='metrics'),
+
+    # Live result for the calculation forms
+    path('calculations/<str:kind>/preview/',
+         views.calculation_preview,
+         name='calculation_preview'),
+
+    # Exports
+    path('calculations/<str:kind>/export/',
+         views.export_calculations,
+         name='export_calculations'),
 ] 
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Change counters shared by every process.
+
+The catalogue, the rooms and the wiring rules each have a ``DataVersion``
+row. Changing one of them bumps its row in the same database, so every
+server process, worker and management command sees the change, and a
+counter never starts again from 0 when a cache is cleared or a process
+restarts. ``token`` adds the time of the bump, so a bump that was rolled
+back and then made again does not reuse a token either; it is what cache
+keys and ETags are built from.
+
+Reading the counters is one small query. A process reuses what it read
+for ``settings.DATA_VERSION_CHECK_INTERVAL`` seconds (default 1; 0 reads
+on every call), so loops that price thousands of rooms do not query per
+room. A change made in another process is seen within that interval; a
+change made in this one is seen at once.
+"""
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+CATALOGUE = 'catalogue'
+ROOMS = 'rooms'
+WIRING = 'wiring'
+
+_seen = {'at': None, 'rows': {}}
+
+
+def _interval():
+    return getattr(settings, 'DATA_VERSION_CHECK_INTERVAL', 1.0)
+
+
+def _fresh():
+    return _seen['at'] is not None and time.monotonic() - _seen['at'] < _interval()
+
+
+def _remember(rows):
+    _seen['rows'] = {row.name: (row.value, row.updated_at) for row in rows}
+    _seen['at'] = time.monotonic()
+
+
+def current(name):
+    """``(value, updated_at)`` of the ``name`` counter; ``(0, None)`` before its first bump."""
+    if not _fresh():
+        _remember(DataVersion.objects.all())
+    return _seen['rows'].get(name, (0, None))
+
+
+async def acurrent(name):
+    """``current()`` for async views."""
+    if not _fresh():
+        _remember([row async for row in DataVersion.objects.all()])
+    return _seen['rows'].get(name, (0, None))
+
+
+def _token(value, updated_at):
+    return f'{value}-{updated_at.timestamp():.6f}' if updated_at else f'{value}'
+
+
+def token(name):
+    """A string that changes whenever the ``name`` counter is bumped."""
+    return _token(*current(name))
+
+
+async def atoken(name):
+    return _token(*await acurrent(name))
+
+
+def bump(name):
+    now = timezone.now()
+    if not DataVersion.objects.filter(name=name).update(value=F('value') + 1, updated_at=now):
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(name=name, value=1, updated_at=now)
+        except IntegrityError:
+            # Created by another process in the meantime.
+            DataVersion.objects.filter(name=name).update(value=F('value') + 1, updated_at=now)
+    # Read the new value on the next call, here and (after commit) everywhere else.
+    _seen['at'] = None
@@ -1,29 +1,104 @@
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from .models import (
-    Room, Tile, TileCalculation,
+    MAX_WASTE_PERCENTAGE, Room, Tile, TileCalculation,
     Plywood, PlywoodCalculation,
     ElectricComponent, ElectricalCalculation
 )
 from .forms import (
-    RoomForm, TileForm, TileCalculationForm,
+    RoomForm, RoomImportForm, TileForm, TileCalculationForm,
     PlywoodForm, PlywoodCalculationForm,
-    ElectricComponentForm, ElectricalCalculationForm
+    ElectricComponentForm, ElectricalCalculationForm,
+    BuildingEstimateForm, HouseEstimateForm, MaterialSearchForm
 )
+from . import buildings, catalogue, cutting, export, floorplan, history, instrumentation, search, snapshot
+from .estimation import bill_of_materials
 
-class RoomListView(ListView):
+class KeysetPaginationMixin:
+    """Cursor pagination on the primary key for list views.
+
+    ``?after=<pk>`` and ``?before=<pk>`` select a page with an indexed range
+    and a LIMIT, so a page costs the same at any depth and there is no
+    ``COUNT(*)`` or ``OFFSET``.
+    """
+    page_size = 50
+
+    def _cursor(self, name):
+        try:
+            return int(self.request.GET[name])
+        except (KeyError, ValueError):
+            return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        after, before = self._cursor('after'), self._cursor('before')
+        if before is not None:
+            rows = list(queryset.filter(pk__lt=before).order_by('-pk')[:self.page_size + 1])
+            has_previous, has_next = len(rows) > self.page_size, True
+            rows = rows[:self.page_size][::-1]
+        else:
+            if after is not None:
+                queryset = queryset.filter(pk__gt=after)
+            rows = list(queryset.order_by('pk')[:self.page_size + 1])
+            has_previous, has_next = after is not None, len(rows) > self.page_size
+            rows = rows[:self.page_size]
+        self.previous_cursor = rows[0].pk if rows and has_previous else None
+        self.next_cursor = rows[-1].pk if rows and has_next else None
+        return rows
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['previous_cursor'] = self.previous_cursor
+        context['next_cursor'] = self.next_cursor
+        return context
+
+class CalculationCreateMixin:
+    """Reuse the stored calculation when the same inputs are submitted again."""
+
+    def form_valid(self, form):
+        existing = history.existing(form.instance)
+        if existing is not None:
+            self.object = existing
+            return HttpResponseRedirect(self.get_success_url())
+        return super().form_valid(form)
+
+class RoomListView(KeysetPaginationMixin, ListView):
     model = Room
     template_name = 'materiais/room_list.html'
     context_object_name = 'rooms'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # A full-table aggregate; reused until a room changes.
+        context['totals'] = cache.get_or_set(f'rooms:totals:{snapshot.rooms_version()}', Room.objects.totals)
+        return context
+
 class RoomCreateView(CreateView):
     model = Room
     form_class = RoomForm
     template_name = 'materiais/room_form.html'
-    success_url = reverse_lazy('room_list')
+    success_url = reverse_lazy('materiais:room_list')
 
-class TileListView(ListView):
+def room_import(request):
+    form = RoomImportForm(request.POST or None, request.FILES or None)
+    report = None
+    if form.is_valid():
+        data = form.cleaned_data
+        report = floorplan.intake_file(
+            data['file'], data['format'] or None,
+            unit_template=data['unit_template'], skip_invalid=data['skip_invalid'],
+        )
+        if report['created'] and not report['rejected']:
+            return redirect('materiais:room_list')
+    return render(request, 'materiais/room_import.html', {'form': form, 'report': report})
+
+@method_decorator(catalogue.cached_page, name='dispatch')
+class TileListView(KeysetPaginationMixin, ListView):
     model = Tile
     template_name = 'materiais/tile_list.html'
     context_object_name = 'tiles'
@@ -32,15 +107,16 @@ class TileCreateView(CreateView):
     model = Tile
     form_class = TileForm
     template_name = 'materiais/tile_form.html'
-    success_url = reverse_lazy('tile_list')
+    success_url = reverse_lazy('materiais:tile_list')
 
-class TileCalculationCreateView(CreateView):
+class TileCalculationCreateView(CalculationCreateMixin, CreateView):
     model = TileCalculation
     form_class = TileCalculationForm
     template_name = 'materiais/tile_calculation_form.html'
-    success_url = reverse_lazy('tile_calculation_list')
+    success_url = reverse_lazy('materiais:tile_list')
 
-class PlywoodListView(ListView):
+@method_decorator(catalogue.cached_page, name='dispatch')
+class PlywoodListView(KeysetPaginationMixin, ListView):
     model = Plywood
     template_name = 'materiais/plywood_list.html'
     context_object_name = 'plywoods'
@@ -49,15 +125,16 @@ class PlywoodCreateView(CreateView):
     model = Plywood
     form_class = PlywoodForm
     template_name = 'materiais/plywood_form.html'
-    success_url = reverse_lazy('plywood_list')
+    success_url = reverse_lazy('materiais:plywood_list')
 
-class PlywoodCalculationCreateView(CreateView):
+class PlywoodCalculationCreateView(CalculationCreateMixin, CreateView):
     model = PlywoodCalculation
     form_class = PlywoodCalculationForm
     template_name = 'materiais/plywood_calculation_form.html'
-    success_url = reverse_lazy('plywood_calculation_list')
+    success_url = reverse_lazy('materiais:plywood_list')
 
-class ElectricComponentListView(ListView):
+@method_decorator(catalogue.cached_page, name='dispatch')
+class ElectricComponentListView(KeysetPaginationMixin, ListView):
     model = ElectricComponent
     template_name = 'materiais/electric_component_list.html'
     context_object_name = 'components'
@@ -66,13 +143,104 @@ class ElectricComponentCreateView(CreateView):
     model = ElectricComponent
     form_class = ElectricComponentForm
     template_name = 'materiais/electric_component_form.html'
-    success_url = reverse_lazy('electric_component_list')
+    success_url = reverse_lazy('materiais:electric_component_list')
 
-class ElectricalCalculationCreateView(CreateView):
+class ElectricalCalculationCreateView(CalculationCreateMixin, CreateView):
     model = ElectricalCalculation
     form_class = ElectricalCalculationForm
     template_name = 'materiais/electrical_calculation_form.html'
-    success_url = reverse_lazy('electrical_calculation_list')
+    success_url = reverse_lazy('materiais:electric_component_list')
 
+@catalogue.cached_page
 def home(request):
-    return render(request, 'materiais/home.html') 
\ No newline at end of file
+    return render(request, 'materiais/home.html') 
+
+def house_estimate(request):
+    # Form validation fetches each selection with a single query, so the
+    # number of queries does not depend on how many rooms are selected.
+    form = HouseEstimateForm(request.GET or None)
+    estimate = None
+    if form.is_valid():
+        data = form.cleaned_data
+        estimate = bill_of_materials(
+            data['rooms'],
+            tiles=[data['tile']] if data['tile'] else [],
+            plywoods=[data['plywood']] if data['plywood'] else [],
+            components=data['components'],
+        )
+        if data['plywood'] and data['optimize_plywood']:
+            # Project-wide sheet count with offcuts shared between rooms.
+            estimate['plywood_cutting'] = cutting.optimize(data['rooms'], data['plywood'])
+        if request.GET.get('format') == 'json':
+            return JsonResponse(estimate)
+    elif request.GET.get('format') == 'json':
+        return JsonResponse({'errors': form.errors}, status=400)
+    return render(request, 'materiais/house_estimate.html', {'form': form, 'estimate': estimate})
+
+def building_estimate(request):
+    form = BuildingEstimateForm(request.GET or None)
+    estimate = None
+    if form.is_valid():
+        data = form.cleaned_data
+        estimate = buildings.estimate(
+            data['building'],
+            tiles=[data['tile']] if data['tile'] else [],
+            plywoods=[data['plywood']] if data['plywood'] else [],
+            components=data['components'],
+        )
+        if request.GET.get('format') == 'json':
+            return JsonResponse(estimate)
+    elif request.GET.get('format') == 'json':
+        return JsonResponse({'errors': form.errors}, status=400)
+    return render(request, 'materiais/building_estimate.html', {'form': form, 'estimate': estimate})
+
+def material_search(request):
+    form = MaterialSearchForm(request.GET or None)
+    results = None
+    if form.is_valid():
+        rank = search.cheapest_tiles if form.cleaned_data['kind'] == 'tile' else search.cheapest_plywoods
+        results = rank(
+            form.cleaned_data['rooms'],
+            limit=form.cleaned_data['limit'] or search.DEFAULT_LIMIT,
+            **form.filters(),
+        )
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'results': results})
+    elif request.GET.get('format') == 'json':
+        return JsonResponse({'errors': form.errors}, status=400)
+    return render(request, 'materiais/material_search.html', {'form': form, 'results': results})
+
+def calculation_preview(request, kind):
+    # Served from the in-process snapshot; a warm call runs no queries.
+    if kind not in snapshot.MATERIALS:
+        raise Http404('Unknown calculation type')
+    try:
+        room_id = int(request.GET['room'])
+        material_id = int(request.GET['material'])
+        waste = request.GET.get('waste_percentage')
+        waste = float(waste) if waste not in (None, '') else None
+        # Also rejects nan and inf, like the form's validators.
+        if waste is not None and not 0 <= waste <= MAX_WASTE_PERCENTAGE:
+            raise ValueError(waste)
+    except (KeyError, ValueError):
+        return JsonResponse({'errors': 'Expected integer room and material and a waste_percentage '
+                                       f'between 0 and {MAX_WASTE_PERCENTAGE}.'}, status=400)
+    result = snapshot.preview(kind, room_id, material_id, waste)
+    if result is None:
+        raise Http404('Unknown room or material')
+    return JsonResponse(result)
+
+def export_calculations(request, kind):
+    fmt = request.GET.get('format', 'csv')
+    if kind not in export.EXPORTS or fmt not in export.FORMATS:
+        raise Http404('Unknown export')
+    response = StreamingHttpResponse(export.chunks(kind, fmt), content_type=export.content_type(fmt))
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(kind, fmt)}"'
+    return response
+
+def metrics(request):
+    if not instrumentation.enabled():
+        raise Http404('Instrumentation is disabled')
+    if not instrumentation.can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(instrumentation.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
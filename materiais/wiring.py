@@ -0,0 +1,99 @@
+"""In-process lookup table of wiring rules.
+
+``WiringRule`` rows are loaded once into dense NumPy arrays indexed by
+(room type, component type), with the built-in defaults filled in where no
+rule exists. Saving or deleting a rule bumps the wiring counter in
+``versions``, which lives in the database, so every process (and every
+worker or management command) reloads its table once it sees the new
+version.
+"""
+import numpy as np
+
+from . import versions
+from .models import COMPONENT_TYPES, ROOM_TYPES, WiringRule
+
+ROOM_INDEX = {value: index for index, (value, _) in enumerate(ROOM_TYPES)}
+COMPONENT_INDEX = {value: index for index, (value, _) in enumerate(COMPONENT_TYPES)}
+
+# Without a rule, cable runs half the room perimeter and other components
+# use their own default quantity.
+DEFAULT_CABLE_PERIMETER_FACTOR = 0.5
+
+_loaded = {'version': None, 'table': None}
+
+
+def version():
+    return versions.token(versions.WIRING)
+
+
+def bump_version():
+    versions.bump(versions.WIRING)
+
+
+def _build_table(rules):
+    # One extra row/column catches types missing from the choices.
+    shape = (len(ROOM_INDEX) + 1, len(COMPONENT_INDEX) + 1)
+    table = {
+        'fixed_length': np.zeros(shape),
+        'perimeter_factor': np.zeros(shape),
+        'area_factor': np.zeros(shape),
+        'default_count': np.full(shape, np.nan),
+    }
+    table['perimeter_factor'][:, COMPONENT_INDEX['cable']] = DEFAULT_CABLE_PERIMETER_FACTOR
+    for rule in rules:
+        cell = (ROOM_INDEX[rule.room_type], COMPONENT_INDEX[rule.component_type])
+        table['fixed_length'][cell] = rule.fixed_length
+        table['perimeter_factor'][cell] = rule.perimeter_factor
+        table['area_factor'][cell] = rule.area_factor
+        if rule.default_count is not None:
+            table['default_count'][cell] = rule.default_count
+    return table
+
+
+def load_rule_table():
+    """Build a table from the database, bypassing the in-process copy."""
+    return _build_table(WiringRule.objects.all())
+
+
+def rule_table():
+    current = version()
+    if _loaded['version'] != current:
+        _loaded['table'] = load_rule_table()
+        _loaded['version'] = current
+    return _loaded['table']
+
+
+async def arule_table():
+    """``rule_table()`` for async views."""
+    current = await versions.atoken(versions.WIRING)
+    if _loaded['version'] != current:
+        _loaded['table'] = _build_table([rule async for rule in WiringRule.objects.all()])
+        _loaded['version'] = current
+    return _loaded['table']
+
+
+def codes(values, index):
+    """Map an array of type strings to table indices, keeping its shape."""
+    values = np.asarray(values)
+    uniques, inverse = np.unique(values, return_inverse=True)
+    lookup = np.array([index.get(value, len(index)) for value in uniques], dtype=np.intp)
+    return lookup[inverse].reshape(values.shape)
+
+
+def lookup(table, room_types, component_types):
+    """Broadcast rule parameters for arrays of room and component types."""
+    rows = codes(room_types, ROOM_INDEX)
+    columns = codes(component_types, COMPONENT_INDEX)
+    return {key: values[rows, columns] for key, values in table.items()}
+
+
+def rule_for(table, room_type, component_type):
+    """Rule parameters for one room and component type, as Python floats.
+
+    ``default_count`` is ``None`` where the table has no count.
+    """
+    cell = (ROOM_INDEX.get(room_type, len(ROOM_INDEX)), COMPONENT_INDEX.get(component_type, len(COMPONENT_INDEX)))
+    rule = {key: float(values[cell]) for key, values in table.items()}
+    if np.isnan(rule['default_count']):
+        rule['default_count'] = None
+    return rule